@@ -0,0 +1,61 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+
+from backend.app.profiling import PROFILE_HEADER, request_profiler
+
+router = APIRouter(
+    prefix="/api/v1/admin",
+    tags=["admin"]
+)
+
+
+def require_profiling_access(x_profile_token: Optional[str] = Header(default=None, alias=PROFILE_HEADER)):
+    """
+    Profiles are readable with the profiling token; without a configured token only when
+    profiling is enabled for every request (local use).
+    """
+    if not request_profiler.available:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if request_profiler.token and not request_profiler.authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+
+def _get_profile(profile_id: str):
+    try:
+        return request_profiler.store.get(profile_id)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.get("/profiles", dependencies=[Depends(require_profiling_access)])
+def list_profiles():
+    """Retained request profiles, slowest first."""
+    return [record.summary() for record in request_profiler.store.list()]
+
+
+@router.delete("/profiles", status_code=204, dependencies=[Depends(require_profiling_access)])
+def clear_profiles():
+    request_profiler.store.clear()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_profiling_access)])
+def get_profile(profile_id: str):
+    """Summary of a profile and its functions with the most cumulative time."""
+    record = _get_profile(profile_id)
+    return {**record.summary(), "top_functions": record.top_functions}
+
+
+@router.get("/profiles/{profile_id}/flamegraph", dependencies=[Depends(require_profiling_access)])
+def get_profile_flamegraph(profile_id: str):
+    """Collapsed stacks in microseconds, for flamegraph.pl, speedscope or inferno."""
+    with open(_get_profile(profile_id).folded_path) as folded:
+        return PlainTextResponse(folded.read())
+
+
+@router.get("/profiles/{profile_id}/pstats", dependencies=[Depends(require_profiling_access)])
+def get_profile_pstats(profile_id: str):
+    """The raw cProfile dump, readable with pstats, snakeviz or gprof2dot."""
+    record = _get_profile(profile_id)
+    return FileResponse(record.pstats_path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
@@ -0,0 +1,123 @@
+import os
+from functools import lru_cache
+from typing import Optional
+
+from pydantic import BaseModel
+
+ENV_PREFIX = "HIRAM_"
+
+
+class Settings(BaseModel):
+    """
+    Application settings. Every field can be overridden with an environment
+    variable named HIRAM_<FIELD_NAME>, e.g. HIRAM_PRICING_CACHE_SIZE=50000.
+    """
+    # Database, defaults to the project's sqlite.db; any SQLAlchemy URL (e.g. PostgreSQL) works
+    database_url: Optional[str] = None
+    # Connection pool of file / server databases
+    database_pool_size: int = 10
+    database_max_overflow: int = 20
+    database_pool_timeout: float = 30.0
+    # Seconds before server connections are recycled
+    database_pool_recycle: int = 1_800
+    # SQLite pragmas set on every new connection; a negative cache size is in KiB
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout: float = 30.0
+    sqlite_cache_size: int = -65_536
+    sqlite_mmap_size: int = 268_435_456
+
+    # Pricing kernels: "auto" (Numba when installed), "numba" or "numpy"; compiled at startup when warmup is on
+    pricing_kernel_backend: str = "auto"
+    pricing_kernel_warmup: bool = True
+
+    # Pricing cache
+    pricing_cache_size: int = 100_000
+    pricing_cache_ttl: Optional[float] = 600.0
+    # Round request inputs to this many significant digits before pricing, None disables it
+    pricing_cache_significant_digits: Optional[int] = None
+
+    # 2-D pricing grids: total cell cap, cap for single-document JSON, cells computed per block
+    grid_max_points: int = 4_000_000
+    grid_json_max_points: int = 250_000
+    grid_block_points: int = 65_536
+    # Cell cap of American grids, each cell being a lattice
+    grid_lattice_max_points: int = 10_000
+    # Work cap of lattice-priced grids and sweeps, in node-steps: a lattice of N steps costs N^2
+    lattice_max_node_steps: int = 400_000_000
+    # Work cap of Monte Carlo sweeps, which simulate every point: points x paths
+    mc_max_path_count: int = 50_000_000
+
+    # Local market data store: "yfinance", or "fixture" to read recorded files
+    market_data_provider: str = "yfinance"
+    market_data_fixture_dir: Optional[str] = None
+    # Seconds before stored history / info are considered stale and refreshed
+    market_data_history_ttl: float = 900.0
+    market_data_info_ttl: float = 86_400.0
+    market_data_history_years: int = 5
+
+    # Refetch stale history / info when a request reads it; turn off when the refresh scheduler runs
+    market_data_refresh_on_read: bool = True
+
+    # End-of-day refresh of the reference universe (in-process scheduler or worker entry point)
+    refresh_scheduler_enabled: bool = False
+    refresh_run_at: str = "16:30"
+    refresh_timezone: str = "America/New_York"
+    refresh_batch_size: int = 50
+    refresh_concurrency: int = 4
+    refresh_timeout: float = 60.0
+    refresh_max_retries: int = 3
+    # Seconds before the first retry, doubled on each further one
+    refresh_backoff: float = 2.0
+
+    # Technical indicators: cached (symbol, indicator) series, and the index beta is measured against
+    indicators_cache_size: int = 4_096
+    indicators_benchmark: str = "^GSPC"
+
+    # Covariance / correlation matrices: cached estimator states, and the largest symbol set
+    covariance_cache_size: int = 256
+    covariance_max_symbols: int = 500
+
+    # Multi-symbol stock data endpoint
+    stocks_fetch_concurrency: int = 8
+    stocks_fetch_timeout: float = 15.0
+    stocks_batch_max_symbols: int = 100
+
+    # Portfolio revaluation: seconds spots are cached, and the inputs options are priced with
+    portfolio_spot_ttl: Optional[float] = 60.0
+    portfolio_risk_free_rate: float = 0.05
+    portfolio_default_volatility: float = 0.2
+    # Price options with each underlying's realized volatility over this many days, when set
+    portfolio_realized_volatility_window: Optional[int] = None
+    # VaR / ES results cached per portfolio, as-of date and parameters
+    portfolio_risk_cache_size: int = 256
+    portfolio_risk_cache_ttl: Optional[float] = 900.0
+
+    # Seconds before the cached reference symbol snapshot is rebuilt from the database
+    reference_cache_ttl: Optional[float] = 300.0
+
+    # Request / stage latency histograms and cache ratios at /metrics (Prometheus text format)
+    metrics_enabled: bool = False
+
+    # cProfile of pricer / stocks requests: every request when enabled, otherwise those sending
+    # the token in X-Profile-Token (which the admin profile endpoints also require)
+    profiling_enabled: bool = False
+    profiling_token: Optional[str] = None
+    # Slowest profiles kept, and where their .prof / .folded artifacts are written (a temp dir by default)
+    profiling_keep: int = 20
+    profiling_dir: Optional[str] = None
+
+    @classmethod
+    def from_env(cls):
+        values = {}
+        for name in cls.model_fields:
+            value = os.getenv(ENV_PREFIX + name.upper())
+            if value is None:
+                continue
+            values[name] = None if value.strip().lower() in ("", "none", "null") else value
+        return cls(**values)
+
+
+@lru_cache
+def get_settings() -> Settings:
+    return Settings.from_env()
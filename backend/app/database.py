@@ -1,7 +1,21 @@
 import os
-from sqlalchemy import create_engine
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, URL, make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from backend.app.config import Settings, get_settings
+from backend.app.metrics import metrics
+
+SQLITE_JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+SQLITE_SYNCHRONOUS = {"off", "normal", "full", "extra"}
+# Async driver used for each backend when the URL names none
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg", "mysql": "aiomysql"}
+
 
 def get_database_url(db_path="sqlite.db"):
     """
@@ -19,14 +33,130 @@ def get_database_url(db_path="sqlite.db"):
 
     return f"sqlite:///{db_full_path}"
 
-# SQLite database URL
-SQLALCHEMY_DATABASE_URL = get_database_url()
+
+def _is_sqlite_memory(database: Optional[str]) -> bool:
+    return not database or database == ":memory:" or database.startswith("file::memory:")
+
+
+def _set_sqlite_pragmas(engine: Engine, settings: Settings, in_memory: bool):
+    journal_mode = settings.sqlite_journal_mode.lower()
+    synchronous = settings.sqlite_synchronous.lower()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f"Unsupported SQLite journal mode: {settings.sqlite_journal_mode}")
+    if synchronous not in SQLITE_SYNCHRONOUS:
+        raise ValueError(f"Unsupported SQLite synchronous level: {settings.sqlite_synchronous}")
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.sqlite_busy_timeout * 1000)}",
+        f"PRAGMA synchronous = {synchronous}",
+        f"PRAGMA cache_size = {int(settings.sqlite_cache_size)}",
+        "PRAGMA temp_store = memory",
+    ]
+    if not in_memory:
+        # WAL is persistent in the file, mmap only helps file-backed databases
+        pragmas.insert(0, f"PRAGMA journal_mode = {journal_mode}")
+        pragmas.append(f"PRAGMA mmap_size = {int(settings.sqlite_mmap_size)}")
+
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def create_database_engine(url: Optional[str] = None, settings: Optional[Settings] = None) -> Engine:
+    """
+    Engine for `url` (HIRAM_DATABASE_URL, or the project's sqlite.db).
+
+    SQLite connections get the configured pragmas on connect: WAL journal so readers do
+    not block the writer, a busy timeout instead of immediate "database is locked"
+    errors, and larger page cache / mmap. File databases use a QueuePool of reused
+    connections, in-memory ones a StaticPool so every session sees the same database.
+    Other backends (e.g. PostgreSQL) get a pre-pinged, recycled QueuePool.
+    """
+    settings = settings or get_settings()
+    url = make_url(url or settings.database_url or get_database_url())
+
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            url,
+            poolclass=QueuePool,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=True
+        )
+
+    in_memory = _is_sqlite_memory(url.database)
+    connect_args = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout}
+    if in_memory:
+        engine = create_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_engine(
+            url,
+            connect_args=connect_args,
+            poolclass=QueuePool,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout
+        )
+    _set_sqlite_pragmas(engine, settings, in_memory)
+    return engine
+
+
+def to_async_url(url) -> URL:
+    """`url` with its backend's async driver, e.g. sqlite:// -> sqlite+aiosqlite://."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if url.get_driver_name() == ASYNC_DRIVERS.get(backend):
+        return url
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver known for {backend} databases")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def create_async_database_engine(url: Optional[str] = None, settings: Optional[Settings] = None):
+    """Async counterpart of `create_database_engine`, with the same pools and SQLite pragmas."""
+    # Imported here so sync-only scripts do not need the async drivers installed
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    settings = settings or get_settings()
+    url = to_async_url(url or settings.database_url or get_database_url())
+
+    if url.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle,
+            pool_pre_ping=True
+        )
+
+    in_memory = _is_sqlite_memory(url.database)
+    connect_args = {"timeout": settings.sqlite_busy_timeout}
+    if in_memory:
+        engine = create_async_engine(url, connect_args=connect_args, poolclass=StaticPool)
+    else:
+        engine = create_async_engine(
+            url,
+            connect_args=connect_args,
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout
+        )
+    _set_sqlite_pragmas(engine.sync_engine, settings, in_memory)
+    return engine
+
 
 # Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL,
-    connect_args={"check_same_thread": False}  # Only needed for SQLite
-)
+engine = create_database_engine()
+metrics.instrument_engine(engine)
+SQLALCHEMY_DATABASE_URL = engine.url.render_as_string(hide_password=True)
 
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -41,3 +171,25 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+@lru_cache
+def get_async_session_factory():
+    """Session factory of the async engine, created on first use."""
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+
+    async_engine = create_async_database_engine()
+    metrics.instrument_engine(async_engine.sync_engine)
+    return async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """Dependency to get an async database session."""
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    if get_async_session_factory.cache_info().currsize:
+        await get_async_session_factory().kw["bind"].dispose()
+        get_async_session_factory.cache_clear()
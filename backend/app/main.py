@@ -1,3 +1,4 @@
+import asyncio
 import uvicorn
 from uvicorn.config import LOGGING_CONFIG
 import logging
@@ -6,14 +7,40 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.app.pricer.router import router as pricer_router
-from backend.app.stocks.router import router as stocks_router
+from backend.app.admin.router import router as admin_router
+from backend.app.pricer.monte_carlo import shutdown_executor
+from backend.app.portfolios.router import router as portfolios_router
+from backend.app.pricer.router import router as pricer_router, kernel_registry
+from backend.app.config import get_settings
+from backend.app.database import dispose_async_engine, engine
+from backend.app.metrics import CONTENT_TYPE, MetricsMiddleware, metrics
+from backend.app.stocks.router import router as stocks_router, stock_data_loader, refresh_scheduler
 
 LOGGING_CONFIG["formatters"]["access"]["fmt"] = '%(asctime)s - %(levelname)s - %(client_addr)s - "%(request_line)s" %(status_code)s'
 
-app = FastAPI(debug=True)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.pricing_kernel_warmup:
+        # Compile the pricing kernels before serving, off the event loop
+        timings = await asyncio.to_thread(kernel_registry.warm)
+        logging.getLogger(__name__).info("Pricing kernels warmed (%s backend): %s", kernel_registry.backend, timings)
+    if settings.refresh_scheduler_enabled:
+        refresh_scheduler.start()
+    yield
+    await refresh_scheduler.stop()
+    shutdown_executor()
+    stock_data_loader.shutdown()
+    engine.dispose()
+    await dispose_async_engine()
+
+
+app = FastAPI(debug=True, lifespan=lifespan)
 
 origins = [
     "http://localhost:5173",
@@ -27,13 +54,24 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Outermost, so request latency includes the CORS handling
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/", tags=["root"])
 async def read_root() -> dict:
     return {"Hello": "World"}
 
+
+@app.get("/metrics", tags=["root"], include_in_schema=False)
+def read_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (HIRAM_METRICS_ENABLED)")
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
 app.include_router(pricer_router)
 app.include_router(stocks_router)
+app.include_router(portfolios_router)
+app.include_router(admin_router)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level="debug", access_log=True)
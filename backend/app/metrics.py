@@ -0,0 +1,266 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Request latency is recorded by `MetricsMiddleware`, per route template, method and
+status. Hot paths time their stages (market data fetch, DataFrame processing, pricing
+kernels, DB queries, serialization) with `metrics.stage(name)` or the `metrics.timed`
+decorator. Cache hit ratios are read from the caches' own counters when /metrics is
+scraped.
+
+With metrics disabled, `stage` returns a shared no-op context manager, `timed` calls
+straight through and the middleware forwards requests untouched, so instrumented code
+pays one attribute check.
+"""
+import bisect
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.app.config import get_settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+NAMESPACE = "hiram"
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# TTLCache.stats() counters exposed per cache
+CACHE_COUNTERS = ("hits", "misses", "evictions", "expirations")
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = f"{NAMESPACE}_{name}"
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series: Dict[Tuple[str, ...], object] = {}
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        with self._lock:
+            self._series[labels] = self._series.get(labels, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = list(self._series.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}" for labels, value in series
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str):
+        with self._lock:
+            self._series[labels] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; each series is [count per bucket..., count above the last bound, sum]."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels: str):
+        position = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[position] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = [(labels, list(values)) for labels, values in self._series.items()]
+        lines = self.header()
+        for labels, values in series:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), values[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(values[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {cumulative}")
+        return lines
+
+
+class _Stage:
+    __slots__ = ("histogram", "name", "start")
+
+    def __init__(self, histogram: Histogram, name: str):
+        self.histogram = histogram
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, self.name)
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+NOOP_STAGE = _NoopStage()
+
+
+class MetricsRegistry:
+    """Request, stage and cache metrics of the application, rendered on demand."""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.request_seconds = Histogram(
+            "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route", "status")
+        )
+        self.requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served.")
+        self.stage_seconds = Histogram("stage_duration_seconds", "Time spent in instrumented stages.", ("stage",))
+        self._metrics = [self.request_seconds, self.requests_in_flight, self.stage_seconds]
+        self._caches: Dict[str, Callable[[], Dict]] = {}
+
+    def stage(self, name: str):
+        """Context manager timing a block as stage `name`."""
+        return _Stage(self.stage_seconds, name) if self.enabled else NOOP_STAGE
+
+    def timed(self, name: str):
+        """Decorator timing every call of a function as stage `name`."""
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with _Stage(self.stage_seconds, name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def register_cache(self, name: str, stats: Callable[[], Dict]):
+        """Expose a cache through its `stats()` (TTLCache counters), read at scrape time."""
+        self._caches[name] = stats
+
+    def instrument_engine(self, engine):
+        """Time every statement of a SQLAlchemy engine as the `db_query` stage."""
+        if not self.enabled:
+            return
+        from sqlalchemy import event
+
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+        def after(conn, cursor, statement, parameters, context, executemany):
+            self.stage_seconds.observe(time.perf_counter() - conn.info["query_start"].pop(), "db_query")
+
+        event.listen(engine, "before_cursor_execute", before)
+        event.listen(engine, "after_cursor_execute", after)
+
+    def _cache_lines(self) -> Iterable[str]:
+        if not self._caches:
+            return []
+        stats = {name: read() for name, read in self._caches.items()}
+        lines = []
+        for counter in CACHE_COUNTERS:
+            name = f"{NAMESPACE}_cache_{counter}_total"
+            lines += [f"# HELP {name} Cache {counter}.", f"# TYPE {name} counter"]
+            lines += [f'{name}{{cache="{_escape(cache)}"}} {values.get(counter, 0)}' for cache, values in stats.items()]
+        for gauge, key in (("size", "size"), ("hit_ratio", "hit_ratio")):
+            name = f"{NAMESPACE}_cache_{gauge}"
+            lines += [f"# HELP {name} Cache {gauge.replace('_', ' ')}.", f"# TYPE {name} gauge"]
+            lines += [
+                f'{name}{{cache="{_escape(cache)}"}} {_format_value(values.get(key) or 0.0)}' for cache, values in stats.items()
+            ]
+        return lines
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        lines += self._cache_lines()
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording each HTTP request's latency under its route template
+    (e.g. /api/v1/stocks/{symbol}/data), so symbols do not multiply the series.
+    """
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        self.app = app
+        self.registry = registry or metrics
+
+    async def __call__(self, scope, receive, send):
+        registry = self.registry
+        if scope["type"] != "http" or not registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            registry.request_seconds.observe(
+                time.perf_counter() - start, scope["method"], getattr(route, "path", "unmatched"), str(status)
+            )
+            registry.requests_in_flight.dec()
+
+
+metrics = MetricsRegistry(enabled=get_settings().metrics_enabled)
@@ -1,17 +1,139 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+import logging
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, ForeignKey, Index, inspect, select, table, text
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from backend.app.database import Base
 
-class ReferenceStock(Base):
-    __tablename__ = "reference_stocks"
+logger = logging.getLogger(__name__)
+
+
+class Asset(Base):
+    """Base row of every instrument; `asset_type` is 'stock', 'option' or 'bond'."""
+    __tablename__ = "assets"
+
+    asset_id = Column(Integer, primary_key=True, autoincrement=True)
+    asset_type = Column(String, nullable=False)
+    ticker = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(String)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+
+    __table_args__ = (Index("idx_assets_type", "asset_type"),)
+
+    def __repr__(self):
+        return f"<Asset {self.asset_id} {self.asset_type} {self.ticker}>"
+
+
+class Stock(Base):
+    __tablename__ = "stocks"
+
+    stock_id = Column(Integer, primary_key=True, autoincrement=True)
+    asset_id = Column(Integer, ForeignKey("assets.asset_id", ondelete="CASCADE"), nullable=False)
+    current_price = Column(Float, nullable=False)
+    sector = Column(String)
+    market_cap = Column(Float)
+    dividend_yield = Column(Float)
+    last_updated = Column(DateTime, server_default=func.current_timestamp())
 
-    id = Column(Integer, primary_key=True)
-    symbol = Column(String)
-    security_name = Column(String)
-    gics_sector = Column(String)
-    gics_sub_sector = Column(String)
-    market_index = Column(String)
+    asset = relationship(Asset)
 
+    __table_args__ = (Index("idx_stocks_asset", "asset_id"),)
 
     def __repr__(self):
-        return f"<Stock {self.symbol}: {self.security_name} {self.gics_sector} {self.gics_sub_sector}>"
+        return f"<Stock {self.asset_id}: {self.current_price}>"
+
+
+class Option(Base):
+    __tablename__ = "options"
+
+    option_id = Column(Integer, primary_key=True, autoincrement=True)
+    asset_id = Column(Integer, ForeignKey("assets.asset_id", ondelete="CASCADE"), nullable=False)
+    underlying_asset_id = Column(Integer, ForeignKey("assets.asset_id"), nullable=False)
+    strike_price = Column(Float, nullable=False)
+    expiration_date = Column(Date, nullable=False)
+    option_type = Column(String, nullable=False)
+    contract_size = Column(Integer, default=100)
+    last_price = Column(Float)
+
+    asset = relationship(Asset, foreign_keys=[asset_id])
+    underlying = relationship(Asset, foreign_keys=[underlying_asset_id])
+
+    __table_args__ = (
+        Index("idx_options_asset", "asset_id"),
+        Index("idx_options_underlying", "underlying_asset_id"),
+    )
+
+    def __repr__(self):
+        return f"<Option {self.asset_id}: {self.option_type} {self.strike_price} {self.expiration_date}>"
+
+
+class Portfolio(Base):
+    __tablename__ = "portfolios"
+
+    portfolio_id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, nullable=False)
+    name = Column(String, nullable=False)
+    description = Column(String)
+    created_at = Column(DateTime, server_default=func.current_timestamp())
+    last_updated = Column(DateTime, server_default=func.current_timestamp())
+
+    positions = relationship("PortfolioPosition", back_populates="portfolio")
+
+    def __repr__(self):
+        return f"<Portfolio {self.portfolio_id}: {self.name}>"
+
+
+class PortfolioPosition(Base):
+    __tablename__ = "portfolio_positions"
+
+    position_id = Column(Integer, primary_key=True, autoincrement=True)
+    portfolio_id = Column(Integer, ForeignKey("portfolios.portfolio_id", ondelete="CASCADE"), nullable=False)
+    asset_id = Column(Integer, ForeignKey("assets.asset_id"), nullable=False)
+    quantity = Column(Float, nullable=False)
+    entry_price = Column(Float, nullable=False)
+    entry_date = Column(Date, server_default=func.current_date())
+    notes = Column(String)
+
+    portfolio = relationship(Portfolio, back_populates="positions")
+    asset = relationship(Asset)
+
+    __table_args__ = (Index("idx_portfolio_positions", "portfolio_id", "asset_id"),)
+
+    def __repr__(self):
+        return f"<PortfolioPosition {self.position_id}: {self.quantity} x asset {self.asset_id} @ {self.entry_price}>"
+
+
+PORTFOLIO_TABLES = [Asset.__table__, Stock.__table__, Option.__table__, Portfolio.__table__, PortfolioPosition.__table__]
+
+
+def _replace_legacy_options_table(bind):
+    """
+    Older databases have an `options` table with a different layout (symbol, price, volume).
+    It is recreated with the tables-creation.sql layout when it is empty, otherwise left alone.
+    """
+    inspector = inspect(bind)
+    if not inspector.has_table(Option.__tablename__):
+        return True
+    if "underlying_asset_id" in {column["name"] for column in inspector.get_columns(Option.__tablename__)}:
+        return True
+
+    with bind.begin() as connection:
+        if connection.execute(select(func.count()).select_from(table(Option.__tablename__))).scalar():
+            logger.warning("The options table has the legacy layout and holds rows, option legs cannot be valued")
+            return False
+        connection.execute(text(f"DROP TABLE {Option.__tablename__}"))
+    return True
+
+
+def ensure_portfolio_schema(bind):
+    """
+    Create missing portfolio tables, and the indexes the position query relies on for
+    databases created from tables-creation.sql before those indexes were added.
+    """
+    tables = PORTFOLIO_TABLES if _replace_legacy_options_table(bind) else \
+        [t for t in PORTFOLIO_TABLES if t is not Option.__table__]
+    Base.metadata.create_all(bind=bind, tables=tables)
+    for portfolio_table in tables:
+        for index in portfolio_table.indexes:
+            index.create(bind=bind, checkfirst=True)
@@ -1,15 +1,89 @@
-from sqlalchemy.orm import Session, InstrumentedAttribute
-from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional, Dict
-from backend.app.stocks.model import ReferenceStock
+from typing import TYPE_CHECKING, List, Optional
 
-class StockRepository:
+from sqlalchemy import select, func
+from sqlalchemy.orm import Session, aliased
+
+from backend.app.portfolios.model import Asset, Option, Portfolio, PortfolioPosition, Stock
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Columns of a position row, in the order `get_position_rows` selects them
+POSITION_COLUMNS = (
+    "position_id",
+    "asset_id",
+    "asset_type",
+    "ticker",
+    "quantity",
+    "entry_price",
+    "underlying",
+    "strike",
+    "expiration",
+    "option_type",
+    "contract_size",
+    "last_price",
+    "current_price",
+    "dividend_yield",
+)
+
+
+def _position_rows_query(portfolio_id: int):
+    underlying = aliased(Asset)
+    stock = aliased(Stock)
+    return select(
+        PortfolioPosition.position_id,
+        PortfolioPosition.asset_id,
+        Asset.asset_type,
+        Asset.ticker,
+        PortfolioPosition.quantity,
+        PortfolioPosition.entry_price,
+        underlying.ticker,
+        Option.strike_price,
+        Option.expiration_date,
+        Option.option_type,
+        Option.contract_size,
+        Option.last_price,
+        stock.current_price,
+        stock.dividend_yield,
+    ) \
+        .join(Asset, Asset.asset_id == PortfolioPosition.asset_id) \
+        .outerjoin(Option, Option.asset_id == Asset.asset_id) \
+        .outerjoin(underlying, underlying.asset_id == Option.underlying_asset_id) \
+        .outerjoin(stock, stock.asset_id == func.coalesce(Option.underlying_asset_id, Asset.asset_id)) \
+        .where(PortfolioPosition.portfolio_id == portfolio_id) \
+        .order_by(PortfolioPosition.position_id)
+
+
+class PortfolioRepository:
     def __init__(self, db: Session):
         self.db = db
 
+    def get_portfolios(self) -> List[Portfolio]:
+        return self.db.execute(select(Portfolio).order_by(Portfolio.portfolio_id)).scalars().all()
+
+    def get_portfolio(self, portfolio_id: int) -> Optional[Portfolio]:
+        return self.db.get(Portfolio, portfolio_id)
 
-    def get_all_stocks_symbols_and_names(self):
+    def get_position_rows(self, portfolio_id: int) -> List[tuple]:
         """
-         Retrieve all stocks symbols and security names
-         """
-        return [{"symbol": stock.symbol, "security_name": stock.security_name} for stock in self.db.query(ReferenceStock).all()]
+        Every position of a portfolio with its asset, option terms and underlying, in a
+        single query. Stock fields (`current_price`, `dividend_yield`) are the asset's own
+        for stock positions and the underlying's for option positions.
+        """
+        return self.db.execute(_position_rows_query(portfolio_id)).all()
+
+
+class AsyncPortfolioRepository:
+    """`PortfolioRepository` over an async session."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_portfolios(self) -> List[Portfolio]:
+        return (await self.db.execute(select(Portfolio).order_by(Portfolio.portfolio_id))).scalars().all()
+
+    async def get_portfolio(self, portfolio_id: int) -> Optional[Portfolio]:
+        return await self.db.get(Portfolio, portfolio_id)
+
+    async def get_position_rows(self, portfolio_id: int) -> List[tuple]:
+        return (await self.db.execute(_position_rows_query(portfolio_id))).all()
@@ -0,0 +1,127 @@
+from typing import Dict, Sequence
+
+import numpy as np
+from scipy.special import ndtri
+from scipy.stats import norm
+
+from backend.app.pricer.black_scholes import black_scholes_batch, GREEKS
+from backend.app.portfolios.valuation import DAYS_PER_YEAR, PositionBook
+
+# Scenario x position cells revalued per Black-Scholes call, bounding peak memory
+SCENARIO_BLOCK_CELLS = 1_000_000
+
+
+def underlying_index(book: PositionBook, underlyings: Sequence[str]) -> np.ndarray:
+    """Column of each position's underlying in `underlyings`, -1 when it has none."""
+    columns = {symbol: i for i, symbol in enumerate(underlyings)}
+    return np.array([columns.get(symbol, -1) for symbol in book.underlying], dtype=np.int64)
+
+
+def underlying_exposures(positions: Dict[str, np.ndarray], columns: np.ndarray, num_underlyings: int):
+    """Position Greeks summed per underlying column, with each underlying's spot."""
+    valid = np.array([e is None for e in positions["error"]], dtype=bool) & (columns >= 0)
+    exposures = {
+        greek: np.bincount(columns[valid], weights=positions[greek][valid], minlength=num_underlyings)
+        for greek in GREEKS
+    }
+    exposures["spot"] = np.zeros(num_underlyings)
+    exposures["spot"][columns[valid]] = positions["spot"][valid]
+    return exposures
+
+
+def full_revaluation_pnl(
+        book: PositionBook,
+        positions: Dict[str, np.ndarray],
+        columns: np.ndarray,
+        spot_returns: np.ndarray,
+        vol_shifts: np.ndarray,
+        rate: float,
+        horizon_days: float = 1.0,
+        block_cells: int = SCENARIO_BLOCK_CELLS
+) -> np.ndarray:
+    """
+    Portfolio P&L of every scenario, revaluing each option leg under it.
+
+    `spot_returns` and `vol_shifts` are (scenarios, underlyings) matrices of relative spot
+    moves and additive volatility moves; `columns` maps positions to underlyings. Stocks
+    are linear, so their P&L is one matrix-vector product. Option legs are priced as a
+    (scenarios, legs) broadcast in blocks of scenarios, at the maturity left after
+    `horizon_days`; legs expiring within the horizon are worth their intrinsic value.
+    """
+    num_scenarios = spot_returns.shape[0]
+    pnl = np.zeros(num_scenarios)
+    valid = np.array([e is None for e in positions["error"]], dtype=bool) & (columns >= 0)
+    units = book.quantity * book.multiplier
+
+    stock = valid & (book.asset_type == "stock")
+    if stock.any():
+        pnl += spot_returns[:, columns[stock]] @ (units[stock] * positions["spot"][stock])
+
+    option = np.flatnonzero(valid & (book.asset_type == "option"))
+    if option.size == 0:
+        return pnl
+
+    spot = positions["spot"][option]
+    strike = book.strike[option]
+    is_call = book.is_call[option]
+    maturity = np.maximum(positions["maturity"][option] - horizon_days / DAYS_PER_YEAR, 0.0)
+    live = maturity > 0
+    leg_columns = columns[option]
+
+    rows_per_block = max(1, block_cells // option.size)
+    for start in range(0, num_scenarios, rows_per_block):
+        block = slice(start, start + rows_per_block)
+        shocked_spot = spot * (1.0 + spot_returns[block][:, leg_columns])
+        shocked_vol = np.maximum(positions["volatility"][option] + vol_shifts[block][:, leg_columns], 1e-6)
+
+        price = black_scholes_batch(
+            spot=shocked_spot,
+            strike=strike,
+            maturity=np.where(live, maturity, 1.0),
+            rate=rate,
+            dividend=book.dividend_yield[option],
+            volatility=shocked_vol,
+            is_call=is_call
+        )["price"]
+        intrinsic = np.maximum(np.where(is_call, shocked_spot - strike, strike - shocked_spot), 0.0)
+        price = np.where(live, price, intrinsic)
+
+        pnl[block] = (price - positions["mark"][option]) @ units[option]
+    return pnl
+
+
+def delta_gamma_pnl(
+        exposures: Dict[str, np.ndarray],
+        spot_returns: np.ndarray,
+        vol_shifts: np.ndarray,
+        horizon_days: float = 1.0
+) -> np.ndarray:
+    """
+    Second-order approximation of every scenario's P&L from per-underlying Greeks:
+    delta dS + gamma dS^2 / 2 + vega dVol + theta dt, as matrix products over underlyings.
+    """
+    spot_moves = spot_returns * exposures["spot"]
+    return (
+        spot_moves @ exposures["delta"]
+        + 0.5 * (spot_moves ** 2) @ exposures["gamma"]
+        + vol_shifts @ exposures["vega"]
+        + exposures["theta"].sum() * horizon_days / DAYS_PER_YEAR
+    )
+
+
+def historical_var_es(pnl: np.ndarray, confidence: float):
+    """Loss quantile and mean loss beyond it, both as positive amounts."""
+    losses = -np.asarray(pnl, dtype=float)
+    var = float(np.quantile(losses, confidence))
+    es = float(losses[losses >= var].mean())
+    return var, es
+
+
+def parametric_var_es(dollar_delta: np.ndarray, covariance: np.ndarray, confidence: float, horizon_days: float = 1.0):
+    """
+    Delta-normal VaR and ES: portfolio P&L is taken as zero-mean normal with variance
+    D' S D, where D holds the dollar deltas and S the daily return covariance.
+    """
+    sigma = float(np.sqrt(max(dollar_delta @ covariance @ dollar_delta, 0.0) * horizon_days))
+    z = float(ndtri(confidence))
+    return z * sigma, sigma * float(norm.pdf(z)) / (1.0 - confidence), sigma
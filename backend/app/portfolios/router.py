@@ -1,30 +1,92 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List, Dict
-from backend.app.database import get_db
-from backend.app.stocks.service import StocksService
+from datetime import date
+from functools import partial
+from typing import List, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+
+from backend.app.cache import TTLCache
+from backend.app.config import get_settings
+from backend.app.metrics import metrics
+from backend.app.portfolios.schema import PortfolioSummary, VaRMethod, RevaluationMode, StressRequest
+from backend.app.portfolios.service import PortfolioService, SpotCache
+from backend.app.serialization import NumpyJSONResponse
+from backend.app.stocks.router import indicator_service, market_data_store
 
 router = APIRouter(
-    prefix="/api/v1/stocks",
-    tags=["stocks"]
+    prefix="/api/v1/portfolios",
+    tags=["portfolios"]
+)
+
+settings = get_settings()
+volatility_source = None
+if settings.portfolio_realized_volatility_window:
+    volatility_source = partial(
+        indicator_service.latest_realized_volatility, window=settings.portfolio_realized_volatility_window
+    )
+
+portfolio_service = PortfolioService(
+    spot_cache=SpotCache(market_data_store, ttl=settings.portfolio_spot_ttl),
+    risk_free_rate=settings.portfolio_risk_free_rate,
+    default_volatility=settings.portfolio_default_volatility,
+    risk_cache=TTLCache(maxsize=settings.portfolio_risk_cache_size, ttl=settings.portfolio_risk_cache_ttl),
+    volatility_source=volatility_source
 )
+metrics.register_cache("portfolio_spots", portfolio_service.spot_cache.stats)
+metrics.register_cache("portfolio_risk", portfolio_service.risk_cache.stats)
 
 
-@router.get("/reference/data/symbols", response_model=List[Dict[str, str]])
-def get_stocks_data(db: Session = Depends(get_db)):
+@router.get("", response_model=List[PortfolioSummary])
+async def get_portfolios():
     try:
-        stocks_service = StocksService(db)
-        result = stocks_service.get_all_stocks_symbols_and_names()
-        return result
+        return await portfolio_service.get_portfolios_async()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{symbol}/data")
-def get_stocks_data(symbol: str):
+
+@router.get("/{portfolio_id}/valuation", response_class=NumpyJSONResponse)
+async def get_portfolio_valuation(portfolio_id: int, as_of: Optional[date] = None):
+    """
+    Revalue every position against the last stored closes. Positions are returned as
+    columns; rows that cannot be valued carry an error and are left out of the totals.
+    """
     try:
-        stocks_service = StocksService()
-        result = stocks_service.get_stock_data_by_symbol(symbol)
-        return result
+        return NumpyJSONResponse(content=await portfolio_service.value_portfolio_async(portfolio_id, as_of=as_of))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@router.get("/{portfolio_id}/risk", response_class=NumpyJSONResponse)
+def get_portfolio_risk(
+        portfolio_id: int,
+        method: VaRMethod = VaRMethod.HISTORICAL,
+        mode: RevaluationMode = RevaluationMode.FULL,
+        confidence: float = Query(default=0.99, gt=0.5, lt=1.0),
+        lookback_days: Optional[int] = Query(default=None, gt=1),
+        as_of: Optional[date] = None
+):
+    """One-day Value-at-Risk and Expected Shortfall over the underlyings' stored daily returns."""
+    try:
+        return NumpyJSONResponse(content=portfolio_service.portfolio_risk(
+            portfolio_id, as_of=as_of, method=method, mode=mode, confidence=confidence, lookback_days=lookback_days
+        ))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{portfolio_id}/stress", response_class=NumpyJSONResponse)
+def stress_portfolio(portfolio_id: int, stress_request: StressRequest):
+    """Instantaneous P&L of the portfolio under each spot / volatility shock scenario."""
+    try:
+        return NumpyJSONResponse(content=portfolio_service.stress_test(portfolio_id, stress_request))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
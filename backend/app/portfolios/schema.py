@@ -1,18 +1,42 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
-from datetime import datetime
+from enum import Enum
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
+from datetime import date
 
-class StockBase(BaseModel):
-    symbol: str
-    name: Optional[str] = None
-    current_price: Optional[float] = None
 
-class StockCreate(StockBase):
-    pass
-
-class Stock(StockBase):
-    id: int
-    last_updated: datetime
+class PortfolioSummary(BaseModel):
+    portfolio_id: int
+    user_id: int
+    name: str
+    description: Optional[str] = None
 
     # Enable ORM mode for compatibility with SQLAlchemy
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class VaRMethod(str, Enum):
+    HISTORICAL = "historical"
+    PARAMETRIC = "parametric"
+
+
+class RevaluationMode(str, Enum):
+    # Reprice every option leg under every scenario
+    FULL = "full"
+    # Second-order Taylor expansion from the current Greeks
+    DELTA_GAMMA = "delta_gamma"
+
+
+class StressScenario(BaseModel):
+    name: str
+    # Relative spot move applied to every underlying, e.g. -0.2 for a 20% drop
+    spot_shock: float = Field(default=0.0, gt=-1.0)
+    # Per-underlying relative spot moves, replacing `spot_shock` for those symbols
+    spot_shocks: Dict[str, float] = Field(default_factory=dict)
+    # Additive volatility move, e.g. 0.1 for +10 vol points
+    vol_shock: float = 0.0
+
+
+class StressRequest(BaseModel):
+    scenarios: List[StressScenario] = Field(min_length=1, max_length=1_000)
+    as_of: Optional[date] = None
+    mode: RevaluationMode = RevaluationMode.FULL
@@ -1,184 +1,315 @@
-from typing import List, Dict, Optional, Any
-from sqlalchemy.orm import Session
-from backend.app.stocks.repository import StockRepository
-from backend.app.database import get_db
-from hiram_pricing.stock import Stock
+import asyncio
+from datetime import date
+from typing import Callable, Dict, Iterable, List, Mapping, Optional
+
 import numpy as np
 import pandas as pd
-from fastapi import status
-from fastapi.responses import JSONResponse
-
-
-def calculate_performance(hist, days):
-    try:
-        start_date = hist['Date'].max() - pd.Timedelta(days=days)
-        filtered_hist = hist[hist['Date'] >= start_date]
-
-        # Check if we have enough data
-        if len(filtered_hist) < 2:
-            return None
-
-        first_val = filtered_hist['cumulative_return'].iloc[0]
-        last_val = filtered_hist['cumulative_return'].iloc[-1]
-
-        if first_val is None or last_val is None:
-            return None
-
-        performance = ((last_val - first_val) * 100)
-        if isinstance(performance, (np.float64, np.float32)):
-            performance = float(performance)
-
-        if performance is not None and np.isfinite(performance):
-            return round(performance, 2)
-        return None
-
-    except Exception as e:
-        print(f"Error calculating performance for {days} days: {e}")
-        return None
-
-
-
-def calculate_ytd_performance(hist):
-    try:
-        if hist['Date'].dt.tz is not None:
-            hist['Date'] = hist['Date'].dt.tz_localize(None)
-
-        current_year = hist['Date'].dt.year.max()
-        if pd.isna(current_year):
-            return None
-
-        start_of_year = pd.Timestamp(year=current_year, month=1, day=1)
-        filtered_hist = hist[hist['Date'] >= start_of_year]
-
-        if len(filtered_hist) < 2:
-            return None
-
-        first_val = filtered_hist['cumulative_return'].iloc[0]
-        last_val = filtered_hist['cumulative_return'].iloc[-1]
-
-        if first_val is None or last_val is None:
-            return None
-
-        performance = ((last_val - first_val) * 100)
-        if isinstance(performance, (np.float64, np.float32)):
-            performance = float(performance)
-
-        if performance is not None and np.isfinite(performance):
-            return round(performance, 2)
-        return None
-
-    except Exception as e:
-        print(f"Error calculating YTD performance: {e}")
-        return None
-
-
-def make_json_serializable(obj: Any) -> Any:
-    """Convert NumPy types to Python native types for JSON serialization."""
-    if isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        if not np.isfinite(obj):
-            return None
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return [make_json_serializable(x) for x in obj]
-    elif isinstance(obj, pd.DataFrame):
-        return make_json_serializable(obj.to_dict('records'))
-    elif isinstance(obj, pd.Series):
-        return make_json_serializable(obj.to_dict())
-    elif isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [make_json_serializable(item) for item in obj]
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    elif obj is None or isinstance(obj, (str, int, float, bool)):
-        return obj
-    else:
-        # Fallback for other types: try to convert to string
-        try:
-            return str(obj)
-        except:
-            return None
-
-
-class StocksService:
-    def __init__(self, db: Optional[Session] = None):
-        self.db = db
-        self.stock_repository = StockRepository(db) if db else None
-
-    def get_all_stocks_symbols_and_names(self) -> List[Dict[str, str]]:
-        result = self.stock_repository.get_all_stocks_symbols_and_names()
-        return make_json_serializable(result)
-
-    def get_stock_data_by_symbol(self, symbol: str):
-        try:
-            stock = Stock(ticker=symbol)
-            hist = stock.hist.copy()  # Create an explicit copy
-
-            hist['Date'] = hist.index
-            if pd.api.types.is_datetime64_any_dtype(hist['Date']):
-                hist['Date'] = hist['Date'].dt.to_pydatetime()
-
-            # Extract only needed columns
-            hist = hist[['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends']]
-
-            # Replace NumPy NaN values with None which is JSON serializable
-            hist = hist.replace([np.nan, np.inf, -np.inf], None)
-
-            # Calculate returns
-            hist['daily_return'] = hist['Close'].pct_change()
-            hist['daily_return'] = hist['daily_return'].replace([np.nan, np.inf, -np.inf], None)
-
-            # Calculate cumulative returns
-            cumulative_return = []
-            current_cum_return = 0
-
-            for return_val in hist['daily_return']:
-                if return_val is not None:
-                    current_cum_return = (1 + current_cum_return) * (1 + return_val) - 1
-                cumulative_return.append(current_cum_return)
-
-            hist['cumulative_return'] = cumulative_return
-
-            performance = {
-                "fiveYears": calculate_performance(hist, 5 * 365),
-                "threeYears": calculate_performance(hist, 3 * 365),
-                "oneYear": calculate_performance(hist, 252),
-                "sixMonths": calculate_performance(hist, 182),
-                "oneMonth": calculate_performance(hist, 30),
-                "ytd": calculate_ytd_performance(hist)
-            }
-
-            # Remove None values for JSON compliance
-            performance = {k: v for k, v in performance.items() if v is not None}
-
-            # Extract price and ensure it's a regular Python float
-            price = None
-            if hasattr(stock, 'price') and stock.price is not None:
-                try:
-                    if isinstance(stock.price, (np.float64, np.float32)):
-                        price = float(stock.price)
-                    else:
-                        price = stock.price
-
-                    # Check if price is a finite number
-                    if not np.isfinite(price):
-                        price = None
-                except:
-                    price = None
-
-            response = {
-                "price": round(price, 2) if price is not None else None,
-                "performance": performance,
-                "hist": hist
-            }
-
-            return make_json_serializable(response)
-
-        except Exception as e:
-            print(f"Error processing {symbol}: {str(e)}")
-            return JSONResponse(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                content={"price": None, "error": str(e)}
-            )
\ No newline at end of file
+
+from backend.app.cache import TTLCache, MISSING
+from backend.app.database import SessionLocal, get_async_session_factory
+from backend.app.portfolios.model import ensure_portfolio_schema
+from backend.app.portfolios.repository import AsyncPortfolioRepository, PortfolioRepository
+from backend.app.portfolios.risk import (
+    underlying_index, underlying_exposures, full_revaluation_pnl, delta_gamma_pnl, historical_var_es, parametric_var_es
+)
+from backend.app.portfolios.schema import VaRMethod, RevaluationMode, StressRequest
+from backend.app.portfolios.valuation import PositionBook, aggregate, value_book
+from backend.app.stocks.analytics import compute_returns
+from backend.app.stocks.store import MarketDataStore
+
+# Scenarios reported with a historical VaR, worst first
+WORST_SCENARIOS = 10
+
+
+def _summary(portfolio) -> Dict:
+    return {
+        "portfolio_id": portfolio.portfolio_id,
+        "user_id": portfolio.user_id,
+        "name": portfolio.name,
+        "description": portfolio.description,
+    }
+
+
+class SpotCache:
+    """
+    Last stored close per symbol from the market data store, kept for `ttl` seconds
+    so a revaluation only reads the database for symbols it has not seen recently.
+    """
+
+    def __init__(self, store: MarketDataStore, maxsize: int = 10_000, ttl: Optional[float] = 60.0):
+        self.store = store
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def _cached(self, symbols: List[str]):
+        cached = self._cache.get_many(symbols)
+        spots = {symbol: spot for symbol, spot in zip(symbols, cached) if spot is not MISSING}
+        return spots, [symbol for symbol in symbols if symbol not in spots]
+
+    def _fill(self, spots: Dict[str, Optional[float]], missing: List[str], loaded: Dict[str, float]):
+        # Unknown symbols are cached as None too, so they are not looked up on every call
+        self._cache.set_many((symbol, loaded.get(symbol)) for symbol in missing)
+        spots.update(loaded)
+        return {symbol: spot for symbol, spot in spots.items() if spot is not None}
+
+    def get_many(self, symbols: Iterable[str]) -> Dict[str, float]:
+        spots, missing = self._cached(list(dict.fromkeys(symbols)))
+        return self._fill(spots, missing, self.store.get_last_closes(missing) if missing else {})
+
+    async def get_many_async(self, symbols: Iterable[str]) -> Dict[str, float]:
+        spots, missing = self._cached(list(dict.fromkeys(symbols)))
+        return self._fill(spots, missing, await self.store.get_last_closes_async(missing) if missing else {})
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class PortfolioService:
+    def __init__(
+            self,
+            spot_cache: SpotCache,
+            session_factory=SessionLocal,
+            risk_free_rate: float = 0.05,
+            default_volatility: float = 0.2,
+            risk_cache: Optional[TTLCache] = None,
+            async_session_factory=None,
+            volatility_source: Optional[Callable[[List[str]], Dict[str, float]]] = None
+    ):
+        self.spot_cache = spot_cache
+        self.store = spot_cache.store
+        self.session_factory = session_factory
+        self._async_session_factory = async_session_factory
+        # Per-underlying volatilities (e.g. realized) used instead of `default_volatility` when given
+        self.volatility_source = volatility_source
+        self.risk_free_rate = risk_free_rate
+        self.default_volatility = default_volatility
+        self.risk_cache = risk_cache
+
+        ensure_portfolio_schema(session_factory.kw["bind"])
+
+    @property
+    def async_session_factory(self):
+        if self._async_session_factory is None:
+            self._async_session_factory = get_async_session_factory()
+        return self._async_session_factory
+
+    def get_portfolios(self) -> List[Dict]:
+        with self.session_factory() as db:
+            return [_summary(p) for p in PortfolioRepository(db).get_portfolios()]
+
+    def load_book(self, portfolio_id: int) -> PositionBook:
+        with self.session_factory() as db:
+            repository = PortfolioRepository(db)
+            if repository.get_portfolio(portfolio_id) is None:
+                raise LookupError(f"Portfolio {portfolio_id} not found")
+            return PositionBook.from_rows(repository.get_position_rows(portfolio_id))
+
+    async def get_portfolios_async(self) -> List[Dict]:
+        async with self.async_session_factory() as db:
+            portfolios = await AsyncPortfolioRepository(db).get_portfolios()
+        return [_summary(p) for p in portfolios]
+
+    async def load_book_async(self, portfolio_id: int) -> PositionBook:
+        async with self.async_session_factory() as db:
+            repository = AsyncPortfolioRepository(db)
+            if await repository.get_portfolio(portfolio_id) is None:
+                raise LookupError(f"Portfolio {portfolio_id} not found")
+            return PositionBook.from_rows(await repository.get_position_rows(portfolio_id))
+
+    def value_portfolio(
+            self,
+            portfolio_id: int,
+            as_of: Optional[date] = None,
+            volatilities: Optional[Mapping[str, float]] = None
+    ) -> Dict:
+        """Positions valued as columns, with portfolio and per-underlying totals of value, P&L and Greeks."""
+        as_of = as_of or date.today()
+        _, positions = self._value(portfolio_id, as_of, volatilities)
+        return self._valuation_result(portfolio_id, as_of, positions)
+
+    async def value_portfolio_async(
+            self,
+            portfolio_id: int,
+            as_of: Optional[date] = None,
+            volatilities: Optional[Mapping[str, float]] = None
+    ) -> Dict:
+        """`value_portfolio` with the position and spot queries on the async engine."""
+        as_of = as_of or date.today()
+        book = await self.load_book_async(portfolio_id)
+        spots = await self._spots_async(book.underlying, as_of)
+        # Large books take tens of milliseconds to price: keep that off the event loop
+        positions = await asyncio.to_thread(self._value_book, book, spots, as_of, volatilities)
+        return self._valuation_result(portfolio_id, as_of, positions)
+
+    @staticmethod
+    def _valuation_result(portfolio_id: int, as_of: date, positions: Dict[str, np.ndarray]) -> Dict:
+        return {
+            "portfolio_id": portfolio_id,
+            "as_of": as_of.isoformat(),
+            **aggregate(positions),
+            "positions": {field: values.tolist() if values.dtype == object else values
+                          for field, values in positions.items()},
+        }
+
+    def _value_book(self, book: PositionBook, spots, as_of: date, volatilities: Optional[Mapping[str, float]] = None):
+        if volatilities is None and self.volatility_source is not None:
+            underlyings = [symbol for symbol in dict.fromkeys(book.underlying) if symbol]
+            volatilities = self.volatility_source(underlyings) if underlyings else None
+        return value_book(
+            book,
+            spots=spots,
+            as_of=as_of,
+            rate=self.risk_free_rate,
+            volatility=self.default_volatility,
+            volatilities=volatilities
+        )
+
+    def _spots(self, symbols, as_of: date) -> Dict[str, float]:
+        """Spots as of `as_of`: cached latest closes for today, the last close on or before a past date."""
+        if as_of < date.today():
+            return self.store.get_last_closes(dict.fromkeys(symbols), end=as_of)
+        return self.spot_cache.get_many(symbols)
+
+    async def _spots_async(self, symbols, as_of: date) -> Dict[str, float]:
+        if as_of < date.today():
+            return await self.store.get_last_closes_async(dict.fromkeys(symbols), end=as_of)
+        return await self.spot_cache.get_many_async(symbols)
+
+    def _value(self, portfolio_id: int, as_of: date, volatilities: Optional[Mapping[str, float]] = None):
+        book = self.load_book(portfolio_id)
+        return book, self._value_book(book, self._spots(book.underlying, as_of), as_of, volatilities)
+
+    def load_returns(self, symbols: Iterable[str], as_of: date, lookback_days: Optional[int] = None):
+        """
+        Daily returns of each symbol up to `as_of`, restricted to the dates every symbol
+        has a return for, as a (dates, symbols) frame; plus why any symbol was left out.
+        """
+        symbols = list(symbols)
+        closes = self.store.get_closes(symbols)
+        closes = closes[closes.index <= pd.Timestamp(as_of)]
+
+        series, missing = {}, {}
+        for symbol in symbols:
+            close = closes[symbol].dropna() if symbol in closes.columns else ()
+            if len(close) < 2:
+                missing[symbol] = "not enough price history"
+                continue
+            daily_return, _ = compute_returns(close.to_numpy())
+            series[symbol] = pd.Series(daily_return, index=close.index)
+
+        returns = pd.DataFrame(series).dropna()
+        if lookback_days:
+            returns = returns.iloc[-lookback_days:]
+        return returns, missing
+
+    def portfolio_risk(
+            self,
+            portfolio_id: int,
+            as_of: Optional[date] = None,
+            method: VaRMethod = VaRMethod.HISTORICAL,
+            mode: RevaluationMode = RevaluationMode.FULL,
+            confidence: float = 0.99,
+            lookback_days: Optional[int] = None
+    ) -> Dict:
+        """
+        One-day VaR and Expected Shortfall at `confidence`, as positive losses. Historical
+        simulation replays every past daily return of the underlyings against today's
+        positions, revalued in full or by delta-gamma; parametric is delta-normal.
+        Results are cached per portfolio, as-of date and parameters.
+        """
+        as_of = as_of or date.today()
+        key = (portfolio_id, as_of, method, mode, confidence, lookback_days)
+        if self.risk_cache is not None:
+            cached = self.risk_cache.get(key)
+            if cached is not MISSING:
+                return cached
+
+        book, positions = self._value(portfolio_id, as_of)
+        valid = np.array([e is None for e in positions["error"]], dtype=bool)
+        returns, missing = self.load_returns(dict.fromkeys(book.underlying[valid]), as_of, lookback_days)
+        if len(returns) < 2:
+            raise ValueError("Not enough common price history across the portfolio's underlyings")
+
+        symbols = list(returns.columns)
+        columns = underlying_index(book, symbols)
+        spot_returns = returns.to_numpy()
+        exposures = underlying_exposures(positions, columns, len(symbols))
+        covered = valid & (columns >= 0)
+
+        result = {
+            "portfolio_id": portfolio_id,
+            "as_of": as_of.isoformat(),
+            "method": method.value,
+            "mode": mode.value if method == VaRMethod.HISTORICAL else None,
+            "confidence": confidence,
+            "horizon_days": 1,
+            "observations": len(returns),
+            "start": returns.index[0].strftime("%Y-%m-%d"),
+            "end": returns.index[-1].strftime("%Y-%m-%d"),
+            "market_value": float(positions["market_value"][covered].sum()),
+            "positions": int(covered.sum()),
+            "uncovered_positions": int((~covered).sum()),
+            "missing_history": missing,
+        }
+
+        if method == VaRMethod.PARAMETRIC:
+            covariance = np.atleast_2d(np.cov(spot_returns, rowvar=False))
+            var, es, sigma = parametric_var_es(exposures["delta"] * exposures["spot"], covariance, confidence)
+            result.update({"var": var, "es": es, "pnl_std": sigma})
+        else:
+            vol_shifts = np.zeros_like(spot_returns)
+            if mode == RevaluationMode.FULL:
+                pnl = full_revaluation_pnl(book, positions, columns, spot_returns, vol_shifts, self.risk_free_rate)
+            else:
+                pnl = delta_gamma_pnl(exposures, spot_returns, vol_shifts)
+            var, es = historical_var_es(pnl, confidence)
+            worst = np.argsort(pnl)[:WORST_SCENARIOS]
+            result.update({
+                "var": var,
+                "es": es,
+                "pnl_std": float(pnl.std(ddof=1)),
+                "worst_scenarios": {
+                    "date": returns.index[worst].strftime("%Y-%m-%d").tolist(),
+                    "pnl": pnl[worst],
+                },
+            })
+
+        if self.risk_cache is not None:
+            self.risk_cache.set(key, result)
+        return result
+
+    def stress_test(self, portfolio_id: int, stress_request: StressRequest) -> Dict:
+        """
+        Portfolio P&L under each user-defined scenario of spot and volatility shocks,
+        all scenarios revalued together as one (scenarios, positions) computation.
+        """
+        as_of = stress_request.as_of or date.today()
+        book, positions = self._value(portfolio_id, as_of)
+        valid = np.array([e is None for e in positions["error"]], dtype=bool)
+
+        underlyings = list(dict.fromkeys(book.underlying[valid]))
+        columns = underlying_index(book, underlyings)
+        scenarios = stress_request.scenarios
+        spot_returns = np.array(
+            [[scenario.spot_shocks.get(symbol, scenario.spot_shock) for symbol in underlyings] for scenario in scenarios],
+            dtype=float
+        ).reshape(len(scenarios), len(underlyings))
+        if (spot_returns <= -1.0).any():
+            raise ValueError("Spot shocks must be greater than -1 (a 100% drop)")
+        vol_shifts = np.repeat(np.array([[scenario.vol_shock] for scenario in scenarios]), len(underlyings), axis=1)
+
+        if stress_request.mode == RevaluationMode.FULL:
+            pnl = full_revaluation_pnl(book, positions, columns, spot_returns, vol_shifts, self.risk_free_rate, horizon_days=0)
+        else:
+            exposures = underlying_exposures(positions, columns, len(underlyings))
+            pnl = delta_gamma_pnl(exposures, spot_returns, vol_shifts, horizon_days=0)
+
+        market_value = float(positions["market_value"][valid].sum())
+        return {
+            "portfolio_id": portfolio_id,
+            "as_of": as_of.isoformat(),
+            "mode": stress_request.mode.value,
+            "market_value": market_value,
+            "scenario": [scenario.name for scenario in scenarios],
+            "pnl": pnl,
+            "pnl_pct": pnl / market_value if market_value else np.full(pnl.size, np.nan),
+        }
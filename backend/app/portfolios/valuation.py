@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Mapping, Optional
+
+import numpy as np
+
+from backend.app.pricer.black_scholes import black_scholes_batch, GREEKS
+
+DAYS_PER_YEAR = 365.0
+
+# Per-position outputs summed into the portfolio and per-underlying totals
+AGGREGATED = ("market_value", "pnl", *GREEKS)
+
+
+def _float_column(values) -> np.ndarray:
+    return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+
+@dataclass
+class PositionBook:
+    """
+    A portfolio's positions as columns. `underlying` is the ticker the position is
+    exposed to: the option's underlying for option legs, the asset's own ticker otherwise.
+    `multiplier` is the option contract size, 1 for other assets. `expiration` holds
+    date ordinals (NaN for non-option assets) so maturities are one vectorized subtraction.
+    """
+    position_id: np.ndarray
+    asset_type: np.ndarray
+    ticker: np.ndarray
+    underlying: np.ndarray
+    quantity: np.ndarray
+    entry_price: np.ndarray
+    strike: np.ndarray
+    expiration: np.ndarray
+    is_call: np.ndarray
+    multiplier: np.ndarray
+    current_price: np.ndarray
+    dividend_yield: np.ndarray
+
+    @property
+    def size(self):
+        return self.position_id.size
+
+    @classmethod
+    def from_rows(cls, rows) -> "PositionBook":
+        """Build from `PortfolioRepository.get_position_rows` rows."""
+        (position_id, _, asset_type, ticker, quantity, entry_price, underlying, strike, expiration,
+         option_type, contract_size, _, current_price, dividend_yield) = zip(*rows) if rows else ((),) * 14
+
+        asset_type = np.array(asset_type, dtype=object)
+        ticker = np.array(ticker, dtype=object)
+        is_option = asset_type == "option"
+        return cls(
+            position_id=np.array(position_id, dtype=np.int64),
+            asset_type=asset_type,
+            ticker=ticker,
+            underlying=np.where(is_option, np.array(underlying, dtype=object), ticker),
+            quantity=_float_column(quantity),
+            entry_price=_float_column(entry_price),
+            strike=_float_column(strike),
+            expiration=np.array([np.nan if d is None else d.toordinal() for d in expiration], dtype=float),
+            is_call=np.array([t == "call" for t in option_type], dtype=bool),
+            multiplier=np.where(is_option, np.nan_to_num(_float_column(contract_size), nan=100.0), 1.0),
+            current_price=_float_column(current_price),
+            dividend_yield=np.nan_to_num(_float_column(dividend_yield), nan=0.0),
+        )
+
+
+def value_book(
+        book: PositionBook,
+        spots: Mapping[str, float],
+        as_of: date,
+        rate: float,
+        volatility: float,
+        volatilities: Optional[Mapping[str, float]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Revalue every position at once. Option legs are priced in one Black-Scholes batch
+    from the underlying spot, expired legs at intrinsic value. Position Greeks are in
+    units of the underlying (delta in shares) scaled by quantity and multiplier.
+
+    `spots` falls back to the stocks table's current_price; a position whose spot is
+    unknown, or whose asset type cannot be valued, gets an error and NaN outputs.
+    """
+    size = book.size
+    error = np.full(size, None, dtype=object)
+
+    spot = np.array([spots.get(symbol, np.nan) for symbol in book.underlying], dtype=float)
+    spot = np.where(np.isfinite(spot), spot, book.current_price)
+    missing_spot = ~(spot > 0)
+    error[missing_spot] = [f"no spot for {symbol}" for symbol in book.underlying[missing_spot]]
+
+    is_stock = book.asset_type == "stock"
+    is_option = book.asset_type == "option"
+    unsupported = ~(is_stock | is_option)
+    error[unsupported] = [f"unsupported asset type {kind}" for kind in book.asset_type[unsupported]]
+
+    volatility = np.full(size, volatility, dtype=float)
+    if volatilities:
+        overrides = np.array([volatilities.get(symbol, np.nan) for symbol in book.underlying], dtype=float)
+        volatility = np.where(np.isfinite(overrides), overrides, volatility)
+
+    maturity = (book.expiration - as_of.toordinal()) / DAYS_PER_YEAR
+    live = is_option & ~missing_spot & (maturity > 0)
+    expired = is_option & ~missing_spot & (maturity <= 0)
+
+    mark = np.where(is_stock, spot, np.nan)
+    greeks = {greek: np.zeros(size) for greek in GREEKS}
+    greeks["delta"][is_stock] = 1.0
+
+    if live.any():
+        result = black_scholes_batch(
+            spot=spot[live],
+            strike=book.strike[live],
+            maturity=maturity[live],
+            rate=rate,
+            dividend=book.dividend_yield[live],
+            volatility=volatility[live],
+            is_call=book.is_call[live]
+        )
+        mark[live] = result["price"]
+        for greek in GREEKS:
+            greeks[greek][live] = result["greeks"][greek]
+
+    mark[expired] = np.where(
+        book.is_call[expired],
+        np.maximum(spot[expired] - book.strike[expired], 0.0),
+        np.maximum(book.strike[expired] - spot[expired], 0.0)
+    )
+
+    valid = np.array([e is None for e in error], dtype=bool)
+    units = np.where(valid, book.quantity * book.multiplier, np.nan)
+    return {
+        "position_id": book.position_id,
+        "ticker": book.ticker,
+        "underlying": book.underlying,
+        "asset_type": book.asset_type,
+        "quantity": book.quantity,
+        "spot": np.where(valid, spot, np.nan),
+        "mark": np.where(valid, mark, np.nan),
+        "maturity": np.where(is_option, maturity, np.nan),
+        "volatility": np.where(is_option, volatility, np.nan),
+        "market_value": units * mark,
+        "pnl": units * (mark - book.entry_price),
+        **{greek: units * values for greek, values in greeks.items()},
+        "error": error,
+    }
+
+
+def aggregate(positions: Dict[str, np.ndarray]) -> Dict:
+    """Portfolio totals and per-underlying totals of the valued positions, skipping errored rows."""
+    valid = np.array([e is None for e in positions["error"]], dtype=bool)
+    totals = {field: float(positions[field][valid].sum()) for field in AGGREGATED}
+
+    underlyings, inverse = np.unique(positions["underlying"][valid].astype(str), return_inverse=True)
+    spots = np.zeros(underlyings.size)
+    spots[inverse] = positions["spot"][valid]
+    by_underlying: Dict[str, List] = {"underlying": underlyings.tolist(), "spot": spots}
+    for field in AGGREGATED:
+        by_underlying[field] = np.bincount(inverse, weights=positions[field][valid], minlength=underlyings.size)
+    # Delta in currency: the P&L of a 1.0 (100%) move of each underlying, to first order
+    by_underlying["dollar_delta"] = by_underlying["delta"] * spots
+
+    return {
+        "count": int(valid.size),
+        "errors": int((~valid).sum()),
+        "totals": totals,
+        "by_underlying": by_underlying,
+    }
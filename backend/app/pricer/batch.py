@@ -0,0 +1,113 @@
+import numpy as np
+
+from backend.app.pricer.model import BatchPricingRequest, ModelType, OptionFamily, OptionType
+
+NUMERIC_FIELDS = ("spot", "volatility", "riskFreeRate", "dividendYield", "strike", "maturity")
+ENUM_FIELDS = {"optionFamily": OptionFamily, "optionType": OptionType, "modelType": ModelType}
+
+# Fields that must be strictly positive for the closed form to be defined
+POSITIVE_FIELDS = ("spot", "volatility", "strike", "maturity")
+
+
+class BatchColumns:
+    """Columnar view of a batch: float64 arrays for numeric fields, object arrays for enums."""
+
+    def __init__(self, size):
+        self.size = size
+        self.numeric = {field: np.full(size, np.nan) for field in NUMERIC_FIELDS}
+        self.enums = {field: np.full(size, None, dtype=object) for field in ENUM_FIELDS}
+        self.errors = np.full(size, None, dtype=object)
+
+    def flag(self, mask, message):
+        """Record `message` on rows in `mask` that do not already carry an error."""
+        mask = mask & (self.errors == None)  # noqa: E711 - elementwise comparison
+        self.errors[mask] = message
+
+    def enum_equals(self, field, member):
+        # Elementwise on purpose: numpy coerces str-based enums to unicode scalars
+        # and would compare the object column as a whole.
+        return np.fromiter((value == member for value in self.enums[field]), dtype=bool, count=self.size)
+
+    @property
+    def valid(self):
+        return self.errors == None  # noqa: E711 - elementwise comparison
+
+
+def _from_records(records):
+    columns = BatchColumns(len(records))
+
+    for i, record in enumerate(records):
+        try:
+            for field in NUMERIC_FIELDS:
+                columns.numeric[field][i] = float(record[field])
+            for field, enum in ENUM_FIELDS.items():
+                columns.enums[field][i] = enum(record[field]) if field in record else _enum_default(field)
+        except KeyError as e:
+            columns.errors[i] = f"missing field {e.args[0]}"
+        except (TypeError, ValueError) as e:
+            columns.errors[i] = str(e)
+
+    return columns
+
+
+def _enum_default(field):
+    return BatchPricingRequest.model_fields[field].default
+
+
+def _column_length(value):
+    return len(value) if isinstance(value, list) else None
+
+
+def _from_columns(request):
+    lengths = {
+        field: length
+        for field in (*NUMERIC_FIELDS, *ENUM_FIELDS)
+        if (length := _column_length(getattr(request, field))) is not None
+    }
+    if not lengths:
+        raise ValueError("Batch request must contain records or at least one array column")
+    if len(set(lengths.values())) > 1:
+        raise ValueError(f"Column lengths do not match: {lengths}")
+
+    columns = BatchColumns(next(iter(lengths.values())))
+
+    for field in NUMERIC_FIELDS:
+        value = getattr(request, field)
+        if value is None:
+            raise ValueError(f"Missing column {field}")
+        if isinstance(value, list):
+            value = [np.nan if v is None else v for v in value]
+        columns.numeric[field][:] = value
+
+    for field in ENUM_FIELDS:
+        value = getattr(request, field)
+        columns.enums[field][:] = value if isinstance(value, list) else [value] * columns.size
+
+    return columns
+
+
+def build_batch_columns(request: BatchPricingRequest) -> BatchColumns:
+    """
+    Normalize a batch request to columns and flag every row that cannot be priced.
+    Structural problems (mismatched column lengths) raise ValueError for the whole batch.
+    """
+    columns = _from_records(request.records) if request.records is not None else _from_columns(request)
+
+    for field in NUMERIC_FIELDS:
+        columns.flag(~np.isfinite(columns.numeric[field]), f"{field} must be a finite number")
+    for field in POSITIVE_FIELDS:
+        columns.flag(columns.numeric[field] <= 0, f"{field} must be positive")
+
+    columns.flag(
+        ~columns.enum_equals("modelType", ModelType.BLACK_SCHOLES),
+        "only the Black Scholes model is supported in batch pricing"
+    )
+    return columns
+
+
+def to_optional_list(values):
+    """Array to list with NaN/inf mapped to None, the shape the JSON response expects."""
+    values = np.asarray(values, dtype=float)
+    out = values.astype(object)
+    out[~np.isfinite(values)] = None
+    return out.tolist()
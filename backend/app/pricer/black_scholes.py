@@ -0,0 +1,81 @@
+import numpy as np
+from scipy.special import ndtr
+
+GREEKS = ("delta", "gamma", "vega", "theta", "rho")
+
+
+def _norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2.0 * np.pi)
+
+
+def black_scholes_batch(spot, strike, maturity, rate, dividend, volatility, is_call=True):
+    """
+    Closed-form Black-Scholes price and Greeks for arrays of contracts.
+
+    All inputs are broadcast against each other, so any of them can be a scalar
+    or an array (e.g. a whole `param_range`). Greeks are returned per unit of the
+    underlying parameter: vega per 1.0 of volatility, theta per year, rho per 1.0 of rate.
+    """
+    spot, strike, maturity, rate, dividend, volatility, is_call = np.broadcast_arrays(
+        np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float),
+        np.asarray(maturity, dtype=float),
+        np.asarray(rate, dtype=float),
+        np.asarray(dividend, dtype=float),
+        np.asarray(volatility, dtype=float),
+        np.asarray(is_call, dtype=bool),
+    )
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_t = np.sqrt(maturity)
+        vol_sqrt_t = volatility * sqrt_t
+        d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * volatility ** 2) * maturity) / vol_sqrt_t
+        d2 = d1 - vol_sqrt_t
+
+        df_rate = np.exp(-rate * maturity)
+        df_div = np.exp(-dividend * maturity)
+        pdf_d1 = _norm_pdf(d1)
+
+        # Sign trick: N(-x) = 1 - N(x), so calls and puts share one formula
+        sign = np.where(is_call, 1.0, -1.0)
+        nd1 = ndtr(sign * d1)
+        nd2 = ndtr(sign * d2)
+
+        price = sign * (spot * df_div * nd1 - strike * df_rate * nd2)
+        delta = sign * df_div * nd1
+        gamma = df_div * pdf_d1 / (spot * vol_sqrt_t)
+        vega = spot * df_div * pdf_d1 * sqrt_t
+        theta = (
+            -spot * df_div * pdf_d1 * volatility / (2.0 * sqrt_t)
+            - sign * rate * strike * df_rate * nd2
+            + sign * dividend * spot * df_div * nd1
+        )
+        rho = sign * strike * maturity * df_rate * nd2
+
+    return {
+        "price": price,
+        "greeks": {
+            "delta": delta,
+            "gamma": gamma,
+            "vega": vega,
+            "theta": theta,
+            "rho": rho,
+        },
+    }
+
+
+def black_scholes_price_vega(spot, strike, maturity, rate, dividend, volatility, is_call=True):
+    """Price and vega only, for solvers that do not need the other Greeks."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sqrt_t = np.sqrt(maturity)
+        vol_sqrt_t = volatility * sqrt_t
+        d1 = (np.log(spot / strike) + (rate - dividend + 0.5 * volatility ** 2) * maturity) / vol_sqrt_t
+        d2 = d1 - vol_sqrt_t
+
+        forward_spot = spot * np.exp(-dividend * maturity)
+        discounted_strike = strike * np.exp(-rate * maturity)
+        sign = np.where(is_call, 1.0, -1.0)
+
+        price = sign * (forward_spot * ndtr(sign * d1) - discounted_strike * ndtr(sign * d2))
+        vega = forward_spot * _norm_pdf(d1) * sqrt_t
+    return price, vega
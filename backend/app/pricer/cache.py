@@ -0,0 +1,86 @@
+from typing import Optional
+
+import numpy as np
+
+from backend.app.cache import TTLCache
+from backend.app.pricer.model import ModelType, OptionFamily
+
+# Request fields that determine a price, in key order
+KEY_FIELDS = (
+    "spot", "volatility", "riskFreeRate", "dividendYield", "strike", "maturity",
+    "optionFamily", "optionType", "modelType"
+)
+FLOAT_FIELDS = KEY_FIELDS[:6]
+MONTE_CARLO_FIELDS = ("numPaths", "numSteps", "seed", "antithetic", "controlVariate")
+LATTICE_FIELDS = ("latticeMethod", "latticeSteps", "richardson")
+
+
+def quantize(values, significant_digits: Optional[int]):
+    """Round to `significant_digits` significant digits, elementwise; None leaves values untouched."""
+    values = np.asarray(values, dtype=float)
+    if significant_digits is None:
+        return values
+    with np.errstate(divide="ignore"):
+        magnitude = np.floor(np.log10(np.abs(values)))
+    magnitude = np.where(np.isfinite(magnitude), magnitude, 0)
+    scale = 10.0 ** (significant_digits - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+
+class PricingCache:
+    """
+    Memoizes pricing results on a canonical tuple of the request fields.
+
+    With `significant_digits` set, requests are quantized before lookup and the
+    pricer must price the quantized request (see `canonical_request`) so that a
+    cached value never depends on which nearby request populated it.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None, significant_digits: Optional[int] = None):
+        self.significant_digits = significant_digits
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def canonical_request(self, request):
+        if self.significant_digits is None:
+            return request
+        values = quantize([getattr(request, field) for field in FLOAT_FIELDS], self.significant_digits)
+        return request.model_copy(update=dict(zip(FLOAT_FIELDS, values.tolist())))
+
+    @staticmethod
+    def is_cacheable(request):
+        # An unseeded Monte Carlo price is a fresh estimate on every call
+        return request.modelType != ModelType.MONTE_CARLO or request.seed is not None
+
+    @staticmethod
+    def request_key(request):
+        key = tuple(getattr(request, field) for field in KEY_FIELDS)
+        if request.modelType == ModelType.MONTE_CARLO:
+            key += tuple(getattr(request, field) for field in MONTE_CARLO_FIELDS)
+        elif request.optionFamily == OptionFamily.AMERICAN:
+            key += tuple(getattr(request, field) for field in LATTICE_FIELDS)
+        return key
+
+    def get(self, request):
+        return self._cache.get(("price",) + self.request_key(request), None)
+
+    def set(self, request, result):
+        self._cache.set(("price",) + self.request_key(request), result)
+
+    def point_keys(self, base_request, param_to_vary, values, mode):
+        """Keys for every point of a sweep over `param_to_vary`, as if priced one by one."""
+        base_key = ("point", mode) + self.request_key(base_request)
+        position = 2 + KEY_FIELDS.index(param_to_vary)
+        prefix, suffix = base_key[:position], base_key[position + 1:]
+        return [prefix + (value,) + suffix for value in values.tolist()]
+
+    def get_many(self, keys):
+        return self._cache.get_many(keys, None)
+
+    def set_many(self, items):
+        self._cache.set_many(items)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {**self._cache.stats(), "significant_digits": self.significant_digits}
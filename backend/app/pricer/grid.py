@@ -0,0 +1,78 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from backend.app.pricer.black_scholes import GREEKS
+from backend.app.serialization import dumps
+
+GRID_OUTPUTS = ("price", *GREEKS)
+
+# One block: index of its first row, and an (rows, M) array per output
+GridBlock = Tuple[int, Dict[str, np.ndarray]]
+
+
+@dataclass
+class OptionGrid:
+    """
+    A lazily evaluated N x M mesh: rows follow `x_values`, columns follow `y_values`.
+    `blocks()` evaluates it a few rows at a time so encoders never hold the full mesh.
+    """
+    x_param: str
+    y_param: str
+    x_values: np.ndarray
+    y_values: np.ndarray
+    outputs: List[str]
+    blocks: Callable[[], Iterator[GridBlock]]
+
+    @property
+    def shape(self):
+        return self.x_values.size, self.y_values.size
+
+    def header(self):
+        return {
+            "x_param": self.x_param,
+            "y_param": self.y_param,
+            "x_values": self.x_values,
+            "y_values": self.y_values,
+            "shape": list(self.shape),
+            "outputs": self.outputs,
+        }
+
+
+def grid_to_columns(grid: OptionGrid) -> dict:
+    """Whole mesh as one document: each output is a flat row-major array of N * M values."""
+    columns = {output: np.empty(grid.shape) for output in grid.outputs}
+    for row_start, block in grid.blocks():
+        for output, values in block.items():
+            columns[output][row_start:row_start + values.shape[0]] = values
+    return {**grid.header(), **{output: values.ravel() for output, values in columns.items()}}
+
+
+def iter_ndjson(grid: OptionGrid) -> Iterator[bytes]:
+    """Header line, then one line per mesh row: {"row": i, "x": x_i, <output>: [M values], ...}."""
+    yield dumps(grid.header()) + b"\n"
+    for row_start, block in grid.blocks():
+        for offset in range(next(iter(block.values())).shape[0]):
+            row = row_start + offset
+            line = {"row": row, "x": grid.x_values[row]}
+            line.update({output: values[offset] for output, values in block.items()})
+            yield dumps(line) + b"\n"
+
+
+def binary_headers(grid: OptionGrid) -> Dict[str, str]:
+    rows, cols = grid.shape
+    return {
+        "X-Grid-Shape": f"{rows},{cols}",
+        "X-Grid-Outputs": ",".join(grid.outputs),
+        "X-Grid-X-Param": grid.x_param,
+        "X-Grid-Y-Param": grid.y_param,
+        "X-Grid-Layout": "row-major; per row, M little-endian float64 values for each output in order",
+    }
+
+
+def iter_binary(grid: OptionGrid) -> Iterator[bytes]:
+    for _, block in grid.blocks():
+        # (rows, outputs, M) so each mesh row carries all its outputs contiguously
+        stacked = np.stack([block[output] for output in grid.outputs], axis=1)
+        yield stacked.astype("<f8", copy=False).tobytes()
@@ -0,0 +1,106 @@
+import numpy as np
+
+from backend.app.pricer.black_scholes import black_scholes_price_vega
+
+VOL_LOWER = 1e-6
+VOL_UPPER = 5.0
+PRICE_TOLERANCE = 1e-8
+VOL_TOLERANCE = 1e-10
+MAX_ITERATIONS = 100
+
+
+def _no_arbitrage_bounds(spot, strike, maturity, rate, dividend, is_call):
+    forward_spot = spot * np.exp(-dividend * maturity)
+    discounted_strike = strike * np.exp(-rate * maturity)
+    lower = np.where(
+        is_call,
+        np.maximum(forward_spot - discounted_strike, 0.0),
+        np.maximum(discounted_strike - forward_spot, 0.0)
+    )
+    upper = np.where(is_call, forward_spot, discounted_strike)
+    return lower, upper
+
+
+def _initial_guess(price, spot, strike, maturity, rate, dividend):
+    # Larger of Brenner-Subrahmanyam (at the money) and Manaster-Koehler (away from it)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brenner = np.sqrt(2.0 * np.pi / maturity) * price / spot
+        log_moneyness = np.log(spot / strike) + (rate - dividend) * maturity
+        manaster = np.sqrt(2.0 * np.abs(log_moneyness) / maturity)
+    guess = np.fmax(brenner, manaster)
+    return np.clip(np.nan_to_num(guess, nan=0.2), 0.01, 2.0)
+
+
+def implied_volatility(
+        price, spot, strike, maturity, rate, dividend, is_call=True,
+        price_tolerance=PRICE_TOLERANCE, max_iterations=MAX_ITERATIONS
+):
+    """
+    Black-Scholes implied volatility for arrays of contracts, solved all at once.
+
+    Safeguarded Newton: every contract keeps a [lower, upper] volatility bracket that
+    shrinks with each evaluation (price is increasing in volatility); a Newton step
+    using the analytical vega is taken when it stays inside the bracket, otherwise the
+    bracket is bisected. Only unconverged contracts are re-evaluated each iteration.
+
+    Returns a dict of arrays: volatility (NaN where unsolved), iterations, converged,
+    and error (None, or why the contract has no solution).
+    """
+    price, spot, strike, maturity, rate, dividend, is_call = (
+        np.atleast_1d(np.array(a)) for a in np.broadcast_arrays(
+            np.asarray(price, dtype=float),
+            np.asarray(spot, dtype=float),
+            np.asarray(strike, dtype=float),
+            np.asarray(maturity, dtype=float),
+            np.asarray(rate, dtype=float),
+            np.asarray(dividend, dtype=float),
+            np.asarray(is_call, dtype=bool),
+        )
+    )
+    size = price.size
+    volatility = np.full(size, np.nan)
+    iterations = np.zeros(size, dtype=np.int64)
+    converged = np.zeros(size, dtype=bool)
+    error = np.full(size, None, dtype=object)
+
+    inputs_valid = np.isfinite(price) & (spot > 0) & (strike > 0) & (maturity > 0) \
+        & np.isfinite(rate) & np.isfinite(dividend)
+    error[~inputs_valid] = "invalid inputs"
+
+    lower_price, upper_price = _no_arbitrage_bounds(spot, strike, maturity, rate, dividend, is_call)
+    outside = inputs_valid & ((price < lower_price - price_tolerance) | (price >= upper_price))
+    error[outside] = "price outside no-arbitrage bounds"
+
+    active = np.flatnonzero(inputs_valid & ~outside)
+    lo = np.full(active.size, VOL_LOWER)
+    hi = np.full(active.size, VOL_UPPER)
+    sigma = _initial_guess(price[active], spot[active], strike[active], maturity[active], rate[active], dividend[active])
+
+    for _ in range(max_iterations):
+        if active.size == 0:
+            break
+        iterations[active] += 1
+
+        model_price, vega = black_scholes_price_vega(
+            spot[active], strike[active], maturity[active], rate[active], dividend[active], sigma, is_call[active]
+        )
+        diff = model_price - price[active]
+
+        done = (np.abs(diff) < price_tolerance) | (hi - lo < VOL_TOLERANCE)
+        volatility[active[done]] = sigma[done]
+        converged[active[done]] = True
+
+        keep = ~done
+        active, sigma, diff, vega, lo, hi = active[keep], sigma[keep], diff[keep], vega[keep], lo[keep], hi[keep]
+
+        too_high = diff > 0
+        hi = np.where(too_high, sigma, hi)
+        lo = np.where(too_high, lo, sigma)
+
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            newton = sigma - diff / vega
+        in_bracket = (newton > lo) & (newton < hi) & np.isfinite(newton)
+        sigma = np.where(in_bracket, newton, 0.5 * (lo + hi))
+
+    error[active] = f"did not converge in {max_iterations} iterations"
+    return {"volatility": volatility, "iterations": iterations, "converged": converged, "error": error}
@@ -0,0 +1,359 @@
+"""
+Pricing kernels keyed by (model, option family, option type).
+
+Each kernel pairs a scalar pricer, for single requests, with a batch pricer for arrays
+of contracts; both return the price with delta, gamma, vega, theta and rho in the units
+of `black_scholes_batch`. Two backends provide them:
+
+- "numba": the scalar kernels below compiled with Numba, and batch kernels that run
+  them over the contracts in parallel. Numba is optional (`pip install numba`).
+- "numpy": the plain-Python scalar closed form, and the NumPy broadcast / lattice
+  engines for batches and American scalars.
+
+`KernelRegistry.warm` calls every kernel once, so JIT compilation happens at startup
+rather than on the first request.
+"""
+import logging
+import math
+import os
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from backend.app.pricer.black_scholes import GREEKS, black_scholes_batch
+from backend.app.pricer.lattice import DEFAULT_STEPS, MIN_STEPS, RATE_BUMP, VOLATILITY_BUMP, lattice_batch
+from backend.app.pricer.model import LatticeMethod, ModelType, OptionFamily, OptionType
+
+try:
+    import numba
+except ImportError:  # pragma: no cover - optional dependency
+    numba = None
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("numba", "numpy")
+
+# Registry key: (model, option family, option type)
+KernelKey = Tuple[ModelType, OptionFamily, OptionType]
+
+
+if numba is not None:
+    # Kernels run on the API's worker threads: the workqueue layer is not threadsafe, and TBB
+    # first launched off the main thread blocks interpreter exit; prefer OpenMP unless configured
+    if "NUMBA_THREADING_LAYER_PRIORITY" not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ["omp", "tbb", "workqueue"]
+    # NumPy error model: invalid inputs give NaN / inf like the NumPy engines instead of raising
+    _jit = numba.njit(cache=True, error_model="numpy")
+    _jit_parallel = numba.njit(cache=True, parallel=True, error_model="numpy")
+    prange = numba.prange
+else:
+    def _jit(function):
+        return function
+
+    _jit_parallel = _jit
+    prange = range
+
+
+@_jit
+def _norm_cdf(x):
+    return 0.5 * math.erfc(-x / math.sqrt(2.0))
+
+
+@_jit
+def _norm_pdf(x):
+    return math.exp(-0.5 * x * x) / math.sqrt(2.0 * math.pi)
+
+
+@_jit
+def black_scholes_scalar(spot, strike, maturity, rate, dividend, volatility, is_call):
+    """Closed-form price, delta, gamma, vega, theta and rho of one contract."""
+    sqrt_t = math.sqrt(maturity)
+    vol_sqrt_t = volatility * sqrt_t
+    d1 = (math.log(spot / strike) + (rate - dividend + 0.5 * volatility * volatility) * maturity) / vol_sqrt_t
+    d2 = d1 - vol_sqrt_t
+
+    df_rate = math.exp(-rate * maturity)
+    df_div = math.exp(-dividend * maturity)
+    pdf_d1 = _norm_pdf(d1)
+    sign = 1.0 if is_call else -1.0
+    nd1 = _norm_cdf(sign * d1)
+    nd2 = _norm_cdf(sign * d2)
+
+    price = sign * (spot * df_div * nd1 - strike * df_rate * nd2)
+    delta = sign * df_div * nd1
+    gamma = df_div * pdf_d1 / (spot * vol_sqrt_t)
+    vega = spot * df_div * pdf_d1 * sqrt_t
+    theta = (
+        -spot * df_div * pdf_d1 * volatility / (2.0 * sqrt_t)
+        - sign * rate * strike * df_rate * nd2
+        + sign * dividend * spot * df_div * nd1
+    )
+    rho = sign * strike * maturity * df_rate * nd2
+    return price, delta, gamma, vega, theta, rho
+
+
+@_jit
+def _lattice_core(spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, smoothing):
+    """
+    Node-by-node backward induction of one American contract, the compiled counterpart
+    of `lattice._induct`: price, delta, gamma and theta.
+    """
+    dt = maturity / steps
+    discount = math.exp(-rate * dt)
+    sign = 1.0 if is_call else -1.0
+    p_up = p_mid = p_down = 0.0
+    if trinomial:
+        log_step = volatility * math.sqrt(2.0 * dt)
+        half_up = math.exp(volatility * math.sqrt(0.5 * dt))
+        half_down = 1.0 / half_up
+        drift = math.exp(0.5 * (rate - dividend) * dt)
+        p_up = ((drift - half_down) / (half_up - half_down)) ** 2
+        p_down = ((half_up - drift) / (half_up - half_down)) ** 2
+        p_mid = 1.0 - p_up - p_down
+        stride = 1
+    else:
+        log_step = volatility * math.sqrt(dt)
+        p_up = (math.exp((rate - dividend) * dt) - math.exp(-log_step)) / (math.exp(log_step) - math.exp(-log_step))
+        stride = 2
+
+    levels = np.empty(2 * steps + 1)
+    for k in range(2 * steps + 1):
+        levels[k] = spot * math.exp((k - steps) * log_step)
+
+    last = steps - 1 if smoothing else steps
+    width = 2 * last + 1 if trinomial else last + 1
+    values = np.empty(width)
+    for j in range(width):
+        s = levels[steps - last + stride * j]
+        exercise = max(sign * (s - strike), 0.0)
+        if smoothing:
+            values[j] = max(black_scholes_scalar(s, strike, dt, rate, dividend, volatility, is_call)[0], exercise)
+        else:
+            values[j] = exercise
+
+    slice_1 = np.empty(3)
+    slice_2 = np.empty(3)
+    for i in range(last - 1, -1, -1):
+        width = 2 * i + 1 if trinomial else i + 1
+        for j in range(width):
+            if trinomial:
+                continuation = discount * (p_up * values[j + 2] + p_mid * values[j + 1] + p_down * values[j])
+            else:
+                continuation = discount * (p_up * values[j + 1] + (1.0 - p_up) * values[j])
+            values[j] = max(continuation, sign * (levels[steps - i + stride * j] - strike))
+        if i == 2 and not trinomial:
+            slice_2[:] = values[:3]
+        if i == 1:
+            slice_1[:width] = values[:width]
+    price = values[0]
+
+    if trinomial:
+        s_lo, s_mid, s_hi = levels[steps - 1], levels[steps], levels[steps + 1]
+        v_lo, v_mid, v_hi = slice_1[0], slice_1[1], slice_1[2]
+        delta = (v_hi - v_lo) / (s_hi - s_lo)
+        theta = (v_mid - price) / dt
+    else:
+        delta = (slice_1[1] - slice_1[0]) / (levels[steps + 1] - levels[steps - 1])
+        s_lo, s_mid, s_hi = levels[steps - 2], levels[steps], levels[steps + 2]
+        v_lo, v_mid, v_hi = slice_2[0], slice_2[1], slice_2[2]
+        theta = (v_mid - price) / (2.0 * dt)
+    gamma = ((v_hi - v_mid) / (s_hi - s_mid) - (v_mid - v_lo) / (s_mid - s_lo)) / (0.5 * (s_hi - s_lo))
+    return price, delta, gamma, theta
+
+
+@_jit
+def _lattice_extrapolated(spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, richardson):
+    price, delta, gamma, theta = _lattice_core(
+        spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, richardson
+    )
+    if richardson:
+        half = _lattice_core(spot, strike, maturity, rate, dividend, volatility, is_call, steps // 2, trinomial, True)
+        price, delta, gamma, theta = (
+            2.0 * price - half[0], 2.0 * delta - half[1], 2.0 * gamma - half[2], 2.0 * theta - half[3]
+        )
+    return price, delta, gamma, theta
+
+
+@_jit
+def american_lattice_scalar(
+        spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, richardson, bumped_greeks
+):
+    """Lattice price and Greeks of one American contract; vega and rho are NaN unless `bumped_greeks`."""
+    price, delta, gamma, theta = _lattice_extrapolated(
+        spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, richardson
+    )
+    vega = rho = np.nan
+    if bumped_greeks:
+        bump = min(VOLATILITY_BUMP, 0.5 * volatility)
+        up = _lattice_extrapolated(spot, strike, maturity, rate, dividend, volatility + bump, is_call, steps, trinomial, richardson)
+        down = _lattice_extrapolated(spot, strike, maturity, rate, dividend, volatility - bump, is_call, steps, trinomial, richardson)
+        vega = (up[0] - down[0]) / (2.0 * bump)
+        up = _lattice_extrapolated(spot, strike, maturity, rate + RATE_BUMP, dividend, volatility, is_call, steps, trinomial, richardson)
+        down = _lattice_extrapolated(spot, strike, maturity, rate - RATE_BUMP, dividend, volatility, is_call, steps, trinomial, richardson)
+        rho = (up[0] - down[0]) / (2.0 * RATE_BUMP)
+    return price, delta, gamma, vega, theta, rho
+
+
+@_jit_parallel
+def _black_scholes_loop(spot, strike, maturity, rate, dividend, volatility, is_call):
+    out = np.empty((6, spot.size))
+    for i in prange(spot.size):
+        price, delta, gamma, vega, theta, rho = black_scholes_scalar(
+            spot[i], strike[i], maturity[i], rate[i], dividend[i], volatility[i], is_call
+        )
+        out[0, i], out[1, i], out[2, i], out[3, i], out[4, i], out[5, i] = price, delta, gamma, vega, theta, rho
+    return out
+
+
+@_jit_parallel
+def _american_lattice_loop(
+        spot, strike, maturity, rate, dividend, volatility, is_call, steps, trinomial, richardson, bumped_greeks
+):
+    out = np.empty((6, spot.size))
+    for i in prange(spot.size):
+        price, delta, gamma, vega, theta, rho = american_lattice_scalar(
+            spot[i], strike[i], maturity[i], rate[i], dividend[i], volatility[i], is_call,
+            steps, trinomial, richardson, bumped_greeks
+        )
+        out[0, i], out[1, i], out[2, i], out[3, i], out[4, i], out[5, i] = price, delta, gamma, vega, theta, rho
+    return out
+
+
+def _as_result(out, shape) -> Dict:
+    return {
+        "price": out[0].reshape(shape),
+        "greeks": {greek: out[1 + i].reshape(shape) for i, greek in enumerate(GREEKS)},
+    }
+
+
+def _flat_inputs(spot, strike, maturity, rate, dividend, volatility):
+    arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in (
+        spot, strike, maturity, rate, dividend, volatility
+    )))
+    return arrays[0].shape, [np.ascontiguousarray(a.ravel()) for a in arrays]
+
+
+def _lattice_options(steps=None, method=LatticeMethod.BINOMIAL, richardson=True, bumped_greeks=True):
+    steps = steps or DEFAULT_STEPS
+    if steps < MIN_STEPS:
+        raise ValueError(f"Lattices need at least {MIN_STEPS} steps")
+    return steps, method == LatticeMethod.TRINOMIAL, bool(richardson), bool(bumped_greeks)
+
+
+@dataclass(frozen=True)
+class PricingKernel:
+    """
+    Scalar and batch pricer of one (model, family, option type). Both take spot, strike,
+    maturity, rate, dividend and volatility, plus engine options (e.g. lattice steps)
+    as keywords; `scalar` returns (price, delta, gamma, vega, theta, rho) and `batch`
+    the {"price", "greeks"} arrays of `black_scholes_batch`.
+    """
+    backend: str
+    scalar: Callable[..., Tuple[float, ...]]
+    batch: Callable[..., Dict]
+
+
+def _black_scholes_kernels(is_call: bool) -> Dict[str, PricingKernel]:
+    def scalar(spot, strike, maturity, rate, dividend, volatility, **options):
+        return black_scholes_scalar(spot, strike, maturity, rate, dividend, volatility, is_call)
+
+    def numba_batch(spot, strike, maturity, rate, dividend, volatility, **options):
+        shape, inputs = _flat_inputs(spot, strike, maturity, rate, dividend, volatility)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return _as_result(_black_scholes_loop(*inputs, is_call), shape)
+
+    def numpy_batch(spot, strike, maturity, rate, dividend, volatility, **options):
+        return black_scholes_batch(spot, strike, maturity, rate, dividend, volatility, is_call)
+
+    return {
+        "numba": PricingKernel("numba", scalar, numba_batch),
+        "numpy": PricingKernel("numpy", scalar, numpy_batch),
+    }
+
+
+def _american_lattice_kernels(is_call: bool) -> Dict[str, PricingKernel]:
+    def numba_scalar(spot, strike, maturity, rate, dividend, volatility, **options):
+        return american_lattice_scalar(
+            spot, strike, maturity, rate, dividend, volatility, is_call, *_lattice_options(**options)
+        )
+
+    def numba_batch(spot, strike, maturity, rate, dividend, volatility, **options):
+        shape, inputs = _flat_inputs(spot, strike, maturity, rate, dividend, volatility)
+        return _as_result(_american_lattice_loop(*inputs, is_call, *_lattice_options(**options)), shape)
+
+    def numpy_batch(spot, strike, maturity, rate, dividend, volatility, **options):
+        steps, trinomial, richardson, bumped_greeks = _lattice_options(**options)
+        return lattice_batch(
+            spot, strike, maturity, rate, dividend, volatility, is_call=is_call, american=True, steps=steps,
+            method=LatticeMethod.TRINOMIAL if trinomial else LatticeMethod.BINOMIAL,
+            richardson=richardson, bumped_greeks=bumped_greeks
+        )
+
+    def numpy_scalar(spot, strike, maturity, rate, dividend, volatility, **options):
+        result = numpy_batch(spot, strike, maturity, rate, dividend, volatility, **options)
+        return (float(result["price"]), *(float(result["greeks"][greek]) for greek in GREEKS))
+
+    return {
+        "numba": PricingKernel("numba", numba_scalar, numba_batch),
+        "numpy": PricingKernel("numpy", numpy_scalar, numpy_batch),
+    }
+
+
+class KernelRegistry:
+    """
+    Pricing kernels by (model, family, option type), each available for one or more
+    backends. `backend="auto"` picks Numba when it is installed, NumPy otherwise.
+    """
+
+    def __init__(self, backend: str = "auto"):
+        if backend not in ("auto", *BACKENDS):
+            raise ValueError(f"Unknown kernel backend: {backend}. Available: auto, {', '.join(BACKENDS)}")
+        if backend == "numba" and numba is None:
+            logger.warning("Numba is not installed, pricing kernels fall back to NumPy")
+            backend = "numpy"
+        self.backend = ("numba" if numba is not None else "numpy") if backend == "auto" else backend
+        self._kernels: Dict[KernelKey, Dict[str, PricingKernel]] = {}
+        self.warmup_seconds: Dict[str, float] = {}
+
+    def register(self, model: ModelType, family: OptionFamily, option_type: OptionType, kernels: Dict[str, PricingKernel]):
+        self._kernels[(model, family, option_type)] = dict(kernels)
+
+    def get(self, model: ModelType, family: OptionFamily, option_type: OptionType, backend: Optional[str] = None) -> PricingKernel:
+        kernels = self._kernels.get((model, family, option_type))
+        if kernels is None:
+            raise ValueError(f"No pricing kernel for {model.value} / {family.value} / {option_type.value}")
+        backend = backend or self.backend
+        return kernels.get(backend) or kernels["numpy"]
+
+    def keys(self):
+        return list(self._kernels)
+
+    def warm(self) -> Dict[str, float]:
+        """Run every kernel of the active backend once, compiling it; seconds taken per kernel."""
+        for model, family, option_type in self._kernels:
+            kernel = self.get(model, family, option_type)
+            start = time.perf_counter()
+            kernel.scalar(100.0, 100.0, 1.0, 0.05, 0.0, 0.2)
+            kernel.batch(np.array([100.0, 110.0]), 100.0, 1.0, 0.05, 0.0, 0.2)
+            self.warmup_seconds[f"{model.value} / {family.value} / {option_type.value}"] = time.perf_counter() - start
+        return dict(self.warmup_seconds)
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "numba_available": numba is not None,
+            "kernels": [f"{model.value} / {family.value} / {option_type.value}" for model, family, option_type in self._kernels],
+            "warmup_seconds": dict(self.warmup_seconds),
+        }
+
+
+def build_registry(backend: str = "auto") -> KernelRegistry:
+    """Registry with the Black-Scholes kernels: closed form for European, lattice for American options."""
+    registry = KernelRegistry(backend)
+    for option_type in OptionType:
+        is_call = option_type == OptionType.CALL
+        registry.register(ModelType.BLACK_SCHOLES, OptionFamily.EUROPEAN, option_type, _black_scholes_kernels(is_call))
+        registry.register(ModelType.BLACK_SCHOLES, OptionFamily.AMERICAN, option_type, _american_lattice_kernels(is_call))
+    return registry
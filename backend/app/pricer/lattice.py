@@ -0,0 +1,162 @@
+"""
+Binomial (Cox-Ross-Rubinstein) and trinomial lattices for European and American options.
+
+Backward induction works on whole time slices: the values of every node of a slice,
+for a block of contracts at once, are one (contracts, nodes) array, so a lattice of N
+steps costs N array operations rather than N^2 / 2 node updates in Python.
+
+The last step is replaced by the Black-Scholes price over one step ("smoothing"), which
+removes the odd/even oscillation of the lattice price; the smoothed prices then converge
+smoothly enough in 1 / N for Richardson extrapolation (2 P(N) - P(N / 2)) to apply.
+"""
+import numpy as np
+
+from backend.app.pricer.black_scholes import black_scholes_batch, GREEKS
+from backend.app.pricer.model import LatticeMethod
+
+DEFAULT_STEPS = 200
+# Fewest steps a lattice may use: Greeks read the first two slices, Richardson halves N
+MIN_STEPS = 10
+# Contract x node cells held per backward induction, bounding peak memory
+LATTICE_BLOCK_CELLS = 2_000_000
+# Central-difference bumps of the Greeks that are not read off the lattice
+VOLATILITY_BUMP = 0.01
+RATE_BUMP = 0.001
+
+
+def _induct(spot, strike, maturity, rate, dividend, volatility, is_call, american, steps, method, smoothing):
+    """
+    Price, delta, gamma and theta of 1-D arrays of contracts on one lattice of `steps`
+    steps. Delta and gamma come from the node values of the first slices, theta from the
+    middle node a slice or two later, at the same spot.
+    """
+    trinomial = method == LatticeMethod.TRINOMIAL
+    dt = maturity / steps
+    discount = np.exp(-rate * dt)[:, None]
+    sign = np.where(is_call, 1.0, -1.0)[:, None]
+    exercisable = american.astype(np.float64)[:, None]
+
+    if trinomial:
+        # Log spot moves of +-sigma sqrt(2 dt), probabilities matching the first two moments
+        log_step = volatility * np.sqrt(2.0 * dt)
+        half_up, half_down = np.exp(volatility * np.sqrt(0.5 * dt)), np.exp(-volatility * np.sqrt(0.5 * dt))
+        drift = np.exp(0.5 * (rate - dividend) * dt)
+        p_up = ((drift - half_down) / (half_up - half_down)) ** 2
+        p_down = ((half_up - drift) / (half_up - half_down)) ** 2
+        p_up, p_mid, p_down = p_up[:, None], (1.0 - p_up - p_down)[:, None], p_down[:, None]
+    else:
+        log_step = volatility * np.sqrt(dt)
+        up, down = np.exp(log_step), np.exp(-log_step)
+        p_up = ((np.exp((rate - dividend) * dt) - down) / (up - down))[:, None]
+
+    # Every spot level of the lattice, S0 e^(k dx) for k = -N..N, and its exercise value
+    # (zero for European contracts); a slice is a strided view of them
+    levels = spot[:, None] * np.exp(log_step[:, None] * np.arange(-steps, steps + 1))
+    exercise_values = exercisable * np.maximum(sign * (levels - strike[:, None]), 0.0)
+    early_exercise = american.any()
+
+    def nodes(i, grid=levels):
+        return grid[:, steps - i:steps + i + 1:1 if trinomial else 2]
+
+    if smoothing:
+        last = steps - 1
+        values = black_scholes_batch(
+            nodes(last), strike[:, None], dt[:, None], rate[:, None], dividend[:, None],
+            volatility[:, None], is_call[:, None]
+        )["price"]
+        values = np.maximum(values, nodes(last, exercise_values))
+    else:
+        last = steps
+        values = np.maximum(sign * (nodes(last) - strike[:, None]), 0.0)
+
+    slices = {last: values}
+    for i in range(last - 1, -1, -1):
+        if trinomial:
+            values = discount * (p_up * values[:, 2:] + p_mid * values[:, 1:-1] + p_down * values[:, :-2])
+        else:
+            values = discount * (p_up * values[:, 1:] + (1.0 - p_up) * values[:, :-1])
+        if early_exercise:
+            values = np.maximum(values, nodes(i, exercise_values))
+        if i <= 2:
+            slices[i] = values
+
+    price = slices[0][:, 0]
+    # Slice whose three nodes give gamma: the first for trinomial, the second for binomial
+    g = 1 if trinomial else 2
+    s, v = nodes(g), slices[g]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if trinomial:
+            delta = (v[:, 2] - v[:, 0]) / (s[:, 2] - s[:, 0])
+        else:
+            s1, v1 = nodes(1), slices[1]
+            delta = (v1[:, 1] - v1[:, 0]) / (s1[:, 1] - s1[:, 0])
+        gamma = (
+            (v[:, 2] - v[:, 1]) / (s[:, 2] - s[:, 1]) - (v[:, 1] - v[:, 0]) / (s[:, 1] - s[:, 0])
+        ) / (0.5 * (s[:, 2] - s[:, 0]))
+        theta = (v[:, 1] - price) / (g * dt)
+    return np.stack([price, delta, gamma, theta])
+
+
+def _extrapolated(inputs, steps, method, richardson):
+    values = _induct(*inputs, steps, method, richardson)
+    if richardson:
+        values = 2.0 * values - _induct(*inputs, steps // 2, method, richardson)
+    return values
+
+
+def lattice_batch(
+        spot, strike, maturity, rate, dividend, volatility, is_call=True, american=True,
+        steps=DEFAULT_STEPS, method=LatticeMethod.BINOMIAL, richardson=True, bumped_greeks=True
+):
+    """
+    Lattice price and Greeks for arrays of contracts, broadcast like `black_scholes_batch`
+    and with the same units. Delta, gamma and theta are read off the lattice; vega and rho
+    are central differences of lattices repriced in the same pass, left NaN unless
+    `bumped_greeks`. With `richardson`, the lattice is smoothed and extrapolated from
+    `steps` and `steps // 2`.
+    """
+    if steps < MIN_STEPS:
+        raise ValueError(f"Lattices need at least {MIN_STEPS} steps")
+    arrays = np.broadcast_arrays(
+        np.asarray(spot, dtype=float),
+        np.asarray(strike, dtype=float),
+        np.asarray(maturity, dtype=float),
+        np.asarray(rate, dtype=float),
+        np.asarray(dividend, dtype=float),
+        np.asarray(volatility, dtype=float),
+        np.asarray(is_call, dtype=bool),
+        np.asarray(american, dtype=bool),
+    )
+    shape = arrays[0].shape
+    spot, strike, maturity, rate, dividend, volatility, is_call, american = (a.ravel() for a in arrays)
+    size = spot.size
+
+    # Bumped copies of every contract are priced as extra rows of the same lattices
+    variants = [(volatility, rate)]
+    if bumped_greeks:
+        vol_bump = np.minimum(VOLATILITY_BUMP, 0.5 * volatility)
+        variants += [(volatility + vol_bump, rate), (volatility - vol_bump, rate), (volatility, rate + RATE_BUMP),
+                     (volatility, rate - RATE_BUMP)]
+    rows = [
+        np.tile(spot, len(variants)), np.tile(strike, len(variants)), np.tile(maturity, len(variants)),
+        np.concatenate([r for _, r in variants]), np.tile(dividend, len(variants)),
+        np.concatenate([v for v, _ in variants]), np.tile(is_call, len(variants)), np.tile(american, len(variants)),
+    ]
+
+    out = np.empty((4, size * len(variants)))
+    block = max(1, LATTICE_BLOCK_CELLS // (2 * steps + 1))
+    for start in range(0, out.shape[1], block):
+        chunk = slice(start, start + block)
+        out[:, chunk] = _extrapolated([row[chunk] for row in rows], steps, method, richardson)
+
+    price, delta, gamma, theta = (values[:size] for values in out)
+    greeks = {"delta": delta, "gamma": gamma, "vega": np.full(size, np.nan), "theta": theta, "rho": np.full(size, np.nan)}
+    if bumped_greeks:
+        bumped = out[0, size:].reshape(4, size)
+        greeks["vega"] = (bumped[0] - bumped[1]) / (2.0 * vol_bump)
+        greeks["rho"] = (bumped[2] - bumped[3]) / (2.0 * RATE_BUMP)
+
+    return {
+        "price": price.reshape(shape),
+        "greeks": {greek: greeks[greek].reshape(shape) for greek in GREEKS},
+    }
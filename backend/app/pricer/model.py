@@ -1,7 +1,7 @@
 from enum import Enum
 
 from pydantic import BaseModel, Field, ConfigDict
-from typing import Literal, Optional, Dict, Union, List
+from typing import Any, Literal, Optional, Dict, Union, List
 # Define the enums and models from your code
 
 class OptionFamily(str, Enum):
@@ -18,6 +18,22 @@ class ModelType(str, Enum):
     MONTE_CARLO = "Monte Carlo"
 
 
+class LatticeMethod(str, Enum):
+    BINOMIAL = "binomial"
+    TRINOMIAL = "trinomial"
+
+
+class PricingMode(str, Enum):
+    VECTORIZED = "vectorized"
+    REFERENCE = "reference"
+
+
+class GridFormat(str, Enum):
+    JSON = "json"
+    NDJSON = "ndjson"
+    BINARY = "binary"
+
+
 
 
 class OptionPricingRequest(BaseModel):
@@ -36,6 +52,18 @@ class OptionPricingRequest(BaseModel):
     max_value: Optional[float] = None
     num_points: Optional[int] = None
 
+    # Optional Monte Carlo parameters, engine defaults apply when omitted
+    numPaths: Optional[int] = Field(default=None, gt=1, le=50_000_000)
+    numSteps: Optional[int] = Field(default=None, gt=0, le=1_000)
+    seed: Optional[int] = None
+    antithetic: bool = True
+    controlVariate: bool = True
+
+    # Optional lattice parameters, used for American options under Black Scholes
+    latticeMethod: LatticeMethod = LatticeMethod.BINOMIAL
+    latticeSteps: Optional[int] = Field(default=None, ge=10, le=10_000)
+    richardson: bool = True
+
 
 
 
@@ -54,9 +82,25 @@ class Greeks(BaseModel):
 
 
 
+class SimulationStats(BaseModel):
+    std_error: float
+    num_paths: int
+    elapsed: float
+    paths_per_second: float
+
+
+class LatticeStats(BaseModel):
+    method: LatticeMethod
+    steps: int
+    richardson: bool
+    elapsed: float
+
+
 class PricingResult(BaseModel):
     value: float
     greeks: Greeks = Field(default_factory=Greeks)
+    simulation: Optional[SimulationStats] = None
+    lattice: Optional[LatticeStats] = None
 
     def to_json(self) -> Dict[str, Union[float, Dict[str, Optional[float]]]]:
         return {
@@ -68,9 +112,11 @@ class PricingResult(BaseModel):
 class CombinedPriceAndPlotResponse(BaseModel):
     value: float
     greeks: Greeks
+    simulation: Optional[SimulationStats] = None
+    lattice: Optional[LatticeStats] = None
     x_values: Optional[List[float]] = None
     price: Optional[List[float]] = None
-    greeks_plot: Optional[Dict[str, List[float]]] = None
+    greeks_plot: Optional[Dict[str, List[Optional[float]]]] = None
 
 
 class PlotDataRequest(BaseModel):
@@ -81,6 +127,9 @@ class PlotDataRequest(BaseModel):
     optionType: OptionType = OptionType.CALL
     optionFamily: OptionFamily = OptionFamily.EUROPEAN
     modelType: ModelType = ModelType.BLACK_SCHOLES
+    pricingMode: PricingMode = PricingMode.VECTORIZED
+    latticeMethod: LatticeMethod = LatticeMethod.BINOMIAL
+    latticeSteps: Optional[int] = Field(default=None, ge=10, le=10_000)
     spot: float = 100.0
     volatility: float = 0.2
     riskFreeRate: float = 0.05
@@ -91,4 +140,79 @@ class PlotDataRequest(BaseModel):
 class PlotDataResponse(BaseModel):
     x_values: List[float]
     price: List[float]
-    greeks: Dict[str, List[float]]
\ No newline at end of file
+    greeks: Dict[str, List[Optional[float]]]
+
+class BatchPricingRequest(BaseModel):
+    """
+    A book of contracts, sent either as columns (one array per field, scalars are
+    broadcast) or as a list of records shaped like OptionPricingRequest.
+    """
+    records: Optional[List[Dict[str, Any]]] = None
+
+    spot: Optional[Union[float, List[Optional[float]]]] = None
+    volatility: Optional[Union[float, List[Optional[float]]]] = None
+    riskFreeRate: Optional[Union[float, List[Optional[float]]]] = None
+    dividendYield: Optional[Union[float, List[Optional[float]]]] = None
+    strike: Optional[Union[float, List[Optional[float]]]] = None
+    maturity: Optional[Union[float, List[Optional[float]]]] = None
+    optionFamily: Union[OptionFamily, List[OptionFamily]] = OptionFamily.EUROPEAN
+    optionType: Union[OptionType, List[OptionType]] = OptionType.CALL
+    modelType: Union[ModelType, List[ModelType]] = ModelType.BLACK_SCHOLES
+
+
+class BatchPricingResponse(BaseModel):
+    count: int
+    value: List[Optional[float]]
+    greeks: Dict[str, List[Optional[float]]]
+    error: List[Optional[str]]
+
+
+
+class ImpliedVolRequest(BaseModel):
+    """Observed prices of a chain, as columns; scalar fields are broadcast across contracts."""
+    price: Union[float, List[float]]
+    spot: Union[float, List[float]]
+    strike: Union[float, List[float]]
+    maturity: Union[float, List[float]]
+    riskFreeRate: Union[float, List[float]] = 0.0
+    dividendYield: Union[float, List[float]] = 0.0
+    optionType: Union[OptionType, List[OptionType]] = OptionType.CALL
+    maxIterations: int = Field(default=100, gt=0, le=1_000)
+    tolerance: float = Field(default=1e-8, gt=0)
+
+
+class ImpliedVolResponse(BaseModel):
+    count: int
+    volatility: List[Optional[float]]
+    iterations: List[int]
+    converged: List[bool]
+    error: List[Optional[str]]
+
+
+class GridAxis(BaseModel):
+    param: str
+    min_value: float
+    max_value: float
+    num_points: int = Field(default=50, gt=0)
+
+
+class GridRequest(BaseModel):
+    """
+    N x M mesh over two contract parameters. `json` returns one document; `ndjson`
+    and `binary` stream the mesh row by row and are required above the JSON size cap.
+    """
+    x: GridAxis
+    y: GridAxis
+    outputs: List[str] = Field(default_factory=lambda: ["price", "delta", "gamma", "vega", "theta", "rho"])
+    format: GridFormat = GridFormat.JSON
+    optionType: OptionType = OptionType.CALL
+    optionFamily: OptionFamily = OptionFamily.EUROPEAN
+    modelType: ModelType = ModelType.BLACK_SCHOLES
+    latticeMethod: LatticeMethod = LatticeMethod.BINOMIAL
+    latticeSteps: Optional[int] = Field(default=None, ge=10, le=10_000)
+    spot: float = 100.0
+    volatility: float = 0.2
+    riskFreeRate: float = 0.05
+    dividendYield: float = 0.01
+    strike: float = 100.0
+    maturity: float = 1.0
@@ -0,0 +1,241 @@
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from backend.app.pricer.black_scholes import black_scholes_batch
+
+DEFAULT_NUM_PATHS = 100_000
+DEFAULT_NUM_STEPS = 50
+# Paths simulated per task; bounds memory at roughly CHUNK_SIZE * num_steps floats per worker
+CHUNK_SIZE = 50_000
+# Independent samples (antithetic pairs count once) needed for a standard error, and for
+# the control variate regression, which leaves n - 2 degrees of freedom
+MIN_SAMPLES = 2
+MIN_CONTROL_VARIATE_SAMPLES = 3
+
+# Sufficient statistics returned by each chunk: n, sum(x), sum(y), sum(x^2), sum(y^2), sum(x*y)
+# where x is the discounted payoff and y the control variate.
+_N, _SX, _SY, _SXX, _SYY, _SXY = range(6)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        # spawn rather than fork: the API process runs threads (uvicorn, threadpool)
+        _executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count(),
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+@dataclass(frozen=True)
+class MonteCarloParams:
+    spot: float
+    strike: float
+    maturity: float
+    rate: float
+    dividend: float
+    volatility: float
+    is_call: bool
+    american: bool
+    num_steps: int
+    antithetic: bool
+    control_variate: bool
+
+
+@dataclass
+class MonteCarloResult:
+    price: float
+    std_error: float
+    num_paths: int
+    elapsed: float
+
+    @property
+    def paths_per_second(self):
+        return self.num_paths / self.elapsed if self.elapsed > 0 else float("inf")
+
+
+def _normals(rng, n_paths, n_steps, antithetic):
+    if not antithetic:
+        return rng.standard_normal((n_paths, n_steps))
+    half = rng.standard_normal((n_paths // 2, n_steps))
+    return np.concatenate([half, -half])
+
+
+def _payoff(params, prices):
+    if params.is_call:
+        return np.maximum(prices - params.strike, 0.0)
+    return np.maximum(params.strike - prices, 0.0)
+
+
+def _pair_average(values, antithetic):
+    # With antithetic variates the independent sample is the (path, mirrored path) pair
+    if not antithetic:
+        return values
+    half = values.shape[0] // 2
+    return 0.5 * (values[:half] + values[half:])
+
+
+def _european_chunk(params, rng, n_paths):
+    z = _normals(rng, n_paths, 1, params.antithetic)[:, 0]
+    drift = (params.rate - params.dividend - 0.5 * params.volatility ** 2) * params.maturity
+    terminal = params.spot * np.exp(drift + params.volatility * math.sqrt(params.maturity) * z)
+
+    discount = math.exp(-params.rate * params.maturity)
+    x = discount * _payoff(params, terminal)
+    # Discounted terminal spot has known mean spot * exp(-q T)
+    y = discount * terminal
+    return x, y
+
+
+def _american_chunk(params, rng, n_paths):
+    """Longstaff-Schwartz regression on (1, m, m^2) with m = S / K, fitted per chunk."""
+    dt = params.maturity / params.num_steps
+    z = _normals(rng, n_paths, params.num_steps, params.antithetic)
+    increments = (params.rate - params.dividend - 0.5 * params.volatility ** 2) * dt \
+        + params.volatility * math.sqrt(dt) * z
+    paths = params.spot * np.exp(np.cumsum(increments, axis=1))
+
+    step_discount = math.exp(-params.rate * dt)
+    european = _payoff(params, paths[:, -1])
+    cashflow = european.copy()
+
+    for step in range(params.num_steps - 2, -1, -1):
+        cashflow *= step_discount
+        prices = paths[:, step]
+        exercise = _payoff(params, prices)
+        in_the_money = exercise > 0
+        if in_the_money.sum() < 3:
+            continue
+
+        moneyness = prices[in_the_money] / params.strike
+        basis = np.column_stack([np.ones_like(moneyness), moneyness, moneyness ** 2])
+        coefficients, *_ = np.linalg.lstsq(basis, cashflow[in_the_money], rcond=None)
+        continuation = basis @ coefficients
+
+        exercise_now = np.zeros_like(in_the_money)
+        exercise_now[in_the_money] = exercise[in_the_money] > continuation
+        cashflow[exercise_now] = exercise[exercise_now]
+
+    x = cashflow * step_discount
+    # The matching European payoff has a closed-form mean, which makes it a strong control
+    y = math.exp(-params.rate * params.maturity) * european
+    return x, y
+
+
+def _simulate_chunk(params, seed_sequence, n_paths):
+    rng = np.random.default_rng(seed_sequence)
+    simulate = _american_chunk if params.american else _european_chunk
+    x, y = simulate(params, rng, n_paths)
+    x = _pair_average(x, params.antithetic)
+    y = _pair_average(y, params.antithetic)
+    return np.array([x.size, x.sum(), y.sum(), x @ x, y @ y, x @ y])
+
+
+def _control_mean(params):
+    if params.american:
+        european = black_scholes_batch(
+            params.spot, params.strike, params.maturity, params.rate,
+            params.dividend, params.volatility, params.is_call
+        )
+        return float(european["price"])
+    return params.spot * math.exp(-params.dividend * params.maturity)
+
+
+def _estimate(params, stats):
+    n = stats[_N]
+    mean_x = stats[_SX] / n
+    var_x = (stats[_SXX] - n * mean_x ** 2) / (n - 1)
+
+    if params.control_variate and n >= MIN_CONTROL_VARIATE_SAMPLES:
+        mean_y = stats[_SY] / n
+        var_y = (stats[_SYY] - n * mean_y ** 2) / (n - 1)
+        cov_xy = (stats[_SXY] - n * mean_x * mean_y) / (n - 1)
+        if var_y > 0:
+            beta = cov_xy / var_y
+            mean_x -= beta * (mean_y - _control_mean(params))
+            var_x -= cov_xy ** 2 / var_y
+
+    return mean_x, math.sqrt(max(var_x, 0.0) / n)
+
+
+def _chunk_sizes(num_paths, chunk_size, antithetic):
+    sizes = [chunk_size] * (num_paths // chunk_size)
+    if num_paths % chunk_size:
+        sizes.append(num_paths % chunk_size)
+    if antithetic:
+        # Each chunk must hold whole antithetic pairs
+        sizes = [size + size % 2 for size in sizes]
+    return sizes
+
+
+class MonteCarloPricingEngine:
+    """
+    Monte Carlo pricer for vanilla options under geometric Brownian motion.
+
+    European options are simulated in a single step to maturity; American options
+    use Longstaff-Schwartz on `num_steps` exercise dates. Paths are generated in
+    chunks of `chunk_size`, each with its own child of the request seed, so results
+    are reproducible regardless of how many processes price the chunks.
+    """
+
+    def __init__(
+            self,
+            num_paths: Optional[int] = None,
+            num_steps: Optional[int] = None,
+            seed: Optional[int] = None,
+            antithetic: bool = True,
+            control_variate: bool = True,
+            chunk_size: int = CHUNK_SIZE,
+            parallel: bool = True
+    ):
+        self.num_paths = num_paths or DEFAULT_NUM_PATHS
+        self.num_steps = num_steps or DEFAULT_NUM_STEPS
+        self.seed = seed
+        self.antithetic = antithetic
+        self.control_variate = control_variate
+        self.chunk_size = chunk_size
+        self.parallel = parallel
+
+    def price(self, spot, strike, maturity, rate, dividend, volatility, is_call=True, american=False):
+        params = MonteCarloParams(
+            spot=spot, strike=strike, maturity=maturity, rate=rate, dividend=dividend,
+            volatility=volatility, is_call=is_call, american=american,
+            num_steps=self.num_steps if american else 1,
+            antithetic=self.antithetic, control_variate=self.control_variate
+        )
+        sizes = _chunk_sizes(self.num_paths, self.chunk_size, self.antithetic)
+        samples = sum(sizes) // 2 if self.antithetic else sum(sizes)
+        if samples < MIN_SAMPLES:
+            raise ValueError(
+                f"Monte Carlo needs at least {MIN_SAMPLES} independent samples, "
+                f"i.e. {2 * MIN_SAMPLES} paths with antithetic variates"
+            )
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+
+        start = time.perf_counter()
+        if self.parallel and len(sizes) > 1:
+            executor = _get_executor()
+            chunks = list(executor.map(_simulate_chunk, [params] * len(sizes), seeds, sizes))
+        else:
+            chunks = [_simulate_chunk(params, seed, size) for seed, size in zip(seeds, sizes)]
+        price, std_error = _estimate(params, np.sum(chunks, axis=0))
+        elapsed = time.perf_counter() - start
+
+        return MonteCarloResult(price=float(price), std_error=float(std_error), num_paths=sum(sizes), elapsed=elapsed)
@@ -1,14 +1,37 @@
 import numpy as np
 from fastapi import APIRouter, HTTPException
-from .model import OptionPricingRequest, PricingResult, PlotDataRequest, PlotDataResponse, CombinedPriceAndPlotResponse
+from fastapi.responses import StreamingResponse
+from .model import (
+    OptionPricingRequest, PricingResult, PlotDataRequest, PlotDataResponse, CombinedPriceAndPlotResponse,
+    BatchPricingRequest, BatchPricingResponse, ImpliedVolRequest, ImpliedVolResponse, GridRequest, GridFormat
+)
+from .batch import to_optional_list
+from .cache import PricingCache
+from .kernels import build_registry
+from .grid import grid_to_columns, iter_ndjson, iter_binary, binary_headers
 from .service import PricerService
+from backend.app.config import get_settings
+from backend.app.metrics import metrics
+from backend.app.profiling import ProfilingRoute
+from backend.app.serialization import NumpyJSONResponse
 
 router = APIRouter(
     prefix="/api/v1/pricer",
-    tags=["pricer"]
+    tags=["pricer"],
+    route_class=ProfilingRoute
 )
 
-pricerService = PricerService()
+settings = get_settings()
+kernel_registry = build_registry(settings.pricing_kernel_backend)
+pricerService = PricerService(
+    cache=PricingCache(
+        maxsize=settings.pricing_cache_size,
+        ttl=settings.pricing_cache_ttl,
+        significant_digits=settings.pricing_cache_significant_digits
+    ),
+    kernels=kernel_registry
+)
+metrics.register_cache("pricing", pricerService.cache.stats)
 
 @router.post("/options/price", response_model=CombinedPriceAndPlotResponse)
 def calculate_option_price(option_pricing_request: OptionPricingRequest):
@@ -18,6 +41,8 @@ def calculate_option_price(option_pricing_request: OptionPricingRequest):
         response = {
             "value": result.value,
             "greeks": result.greeks,
+            "simulation": result.simulation,
+            "lattice": result.lattice,
         }
 
         if (
@@ -33,23 +58,46 @@ def calculate_option_price(option_pricing_request: OptionPricingRequest):
 
             plot_data = pricerService.generate_option_data(
                 param_range=param_range,
-                base_request=option_pricing_request
+                base_request=option_pricing_request,
+                lattice_max_node_steps=settings.lattice_max_node_steps,
+                mc_max_path_count=settings.mc_max_path_count
             )
 
             response.update({
                 "x_values": plot_data["x_values"].tolist(),
                 "price": plot_data["price"].tolist(),
                 "greeks_plot": {
-                    greek: plot_data["greeks"][greek].tolist()
+                    greek: to_optional_list(plot_data["greeks"][greek])
                     for greek in plot_data["greeks"]
                 }
             })
 
         return response
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/options/price/batch", response_model=BatchPricingResponse)
+def calculate_option_price_batch(batch_request: BatchPricingRequest):
+    # Invalid rows are reported in the response's error column; only a malformed
+    # batch as a whole (e.g. mismatched column lengths) is rejected here.
+    try:
+        return pricerService.price_batch(batch_request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/options/implied-vol", response_model=ImpliedVolResponse, response_class=NumpyJSONResponse)
+def calculate_implied_volatility(iv_request: ImpliedVolRequest):
+    # Contracts without a solution are reported per row through `converged` and `error`
+    try:
+        return NumpyJSONResponse(content=pricerService.solve_implied_volatility(iv_request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.post("/options/plot-data", response_model=PlotDataResponse)
 def get_option_plot_data(plot_request: PlotDataRequest):
     try:
@@ -59,10 +107,13 @@ def get_option_plot_data(plot_request: PlotDataRequest):
             volatility=plot_request.volatility,
             riskFreeRate=plot_request.riskFreeRate,
             dividendYield=plot_request.dividendYield,
-            strike=plot_request.strikePrice,
+            strike=plot_request.strike,
             maturity=plot_request.maturity,
+            optionFamily=plot_request.optionFamily,
             optionType=plot_request.optionType,
-            modelType=plot_request.modelType
+            modelType=plot_request.modelType,
+            latticeMethod=plot_request.latticeMethod,
+            latticeSteps=plot_request.latticeSteps
         )
 
         param_range = np.linspace(
@@ -73,17 +124,55 @@ def get_option_plot_data(plot_request: PlotDataRequest):
 
         result_data = pricerService.generate_option_data(
             param_range=param_range,
-            base_request=base_request
+            base_request=base_request,
+            param_to_vary=plot_request.param_to_vary,
+            mode=plot_request.pricingMode,
+            lattice_max_node_steps=settings.lattice_max_node_steps,
+            mc_max_path_count=settings.mc_max_path_count
         )
 
         return PlotDataResponse(
             x_values=result_data['x_values'].tolist(),
             price=result_data['price'].tolist(),
             greeks={
-                greek: result_data['greeks'][greek].tolist()
+                greek: to_optional_list(result_data['greeks'][greek])
                 for greek in result_data['greeks']
             }
         )
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/options/grid")
+def get_option_grid(grid_request: GridRequest):
+    # Validation runs before any streaming starts, so bad requests still get a 400
+    try:
+        grid = pricerService.build_option_grid(
+            grid_request,
+            max_points=settings.grid_max_points,
+            json_max_points=settings.grid_json_max_points,
+            block_points=settings.grid_block_points,
+            lattice_max_points=settings.grid_lattice_max_points,
+            lattice_max_node_steps=settings.lattice_max_node_steps
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if grid_request.format == GridFormat.NDJSON:
+        return StreamingResponse(iter_ndjson(grid), media_type="application/x-ndjson")
+    if grid_request.format == GridFormat.BINARY:
+        return StreamingResponse(iter_binary(grid), media_type="application/octet-stream", headers=binary_headers(grid))
+    return NumpyJSONResponse(content=grid_to_columns(grid))
+
+
+@router.get("/cache/stats")
+def get_pricing_cache_stats():
+    return pricerService.cache.stats()
+
+
+@router.get("/kernels")
+def get_pricing_kernels():
+    return kernel_registry.stats()
@@ -1,20 +1,131 @@
+import time
+from typing import Optional
+
 import numpy as np
 from hiram_pricing.market_data import MarketData
 from hiram_pricing.payoff import CallPayoff, PutPayoff
 from hiram_pricing.engine import BlackScholesPricingEngine, BlackScholesPricer
 from hiram_pricing.option import VanillaOption
 from hiram_pricing.facade import OptionFacade
-from hiram_pricing.models import PricingResult, Greeks
 
-from backend.app.pricer.model import OptionPricingRequest, ModelType, OptionType, OptionFamily
+from backend.app.metrics import metrics
+from backend.app.pricer.batch import build_batch_columns, to_optional_list
+from backend.app.pricer.black_scholes import GREEKS
+from backend.app.pricer.cache import PricingCache, quantize
+from backend.app.pricer.grid import GRID_OUTPUTS, OptionGrid
+from backend.app.pricer.implied_vol import implied_volatility
+from backend.app.pricer.kernels import KernelRegistry, build_registry
+from backend.app.pricer.lattice import DEFAULT_STEPS
+from backend.app.pricer.model import (
+    OptionPricingRequest, ModelType, OptionType, OptionFamily, PricingMode, PricingResult, Greeks, SimulationStats,
+    GridFormat, LatticeMethod, LatticeStats
+)
+from backend.app.pricer.monte_carlo import DEFAULT_NUM_PATHS, MonteCarloPricingEngine
+
+# Legacy name still sent by older clients
+PARAM_ALIASES = {"strikePrice": "strike"}
+
+DEFAULT_PARAM_RANGES = {
+    "spot": (50, 150),
+    "strike": (50, 150),
+    "riskFreeRate": (0.01, 0.1),
+    "volatility": (0.05, 0.5),
+    "dividendYield": (0, 0.05),
+    "maturity": (0.1, 2.0),
+}
 
 
 class PricerService:
-    def __init__(self):
-        pass
+    def __init__(self, cache: Optional[PricingCache] = None, kernels: Optional[KernelRegistry] = None):
+        self.cache = cache
+        self.kernels = kernels if kernels is not None else build_registry()
+
+    def calculate_price(self, request):
+        if self.cache is None or not self.cache.is_cacheable(request):
+            return self._price(request)
+
+        request = self.cache.canonical_request(request)
+        result = self.cache.get(request)
+        if result is None:
+            result = self._price(request)
+            self.cache.set(request, result)
+        return result
+
+    def _price(self, request):
+        if request.modelType == ModelType.MONTE_CARLO:
+            return PricerService._calculate_monte_carlo_price(request)
+
+        kernel = self.kernels.get(request.modelType, request.optionFamily, request.optionType)
+        american = request.optionFamily == OptionFamily.AMERICAN
+        steps = request.latticeSteps or DEFAULT_STEPS
+        start = time.perf_counter()
+        with metrics.stage("pricing_kernel"):
+            price, *greeks = kernel.scalar(
+                request.spot,
+                request.strike,
+                request.maturity,
+                request.riskFreeRate,
+                request.dividendYield,
+                request.volatility,
+                **self._lattice_options(request)
+            )
+        elapsed = time.perf_counter() - start
+
+        return PricingResult(
+            value=float(price),
+            greeks=Greeks(**{greek: float(value) for greek, value in zip(GREEKS, greeks)}),
+            # American options have no closed form and are priced on a lattice
+            lattice=LatticeStats(
+                method=request.latticeMethod,
+                steps=steps,
+                richardson=request.richardson,
+                elapsed=elapsed
+            ) if american else None
+        )
+
+    @staticmethod
+    def _lattice_options(request, **options):
+        """Engine options of a request's kernel; only lattice kernels read them."""
+        if request.optionFamily != OptionFamily.AMERICAN:
+            return {}
+        return {
+            "steps": getattr(request, "latticeSteps", None) or DEFAULT_STEPS,
+            "method": getattr(request, "latticeMethod", LatticeMethod.BINOMIAL),
+            "richardson": getattr(request, "richardson", True),
+            **options,
+        }
+
+    @staticmethod
+    def _check_lattice_work(request, points, max_node_steps):
+        """Reject `points` lattice pricings of `request` whose cells x steps^2 exceed `max_node_steps`."""
+        if (
+            max_node_steps is None
+            or request.optionFamily != OptionFamily.AMERICAN
+            or request.modelType == ModelType.MONTE_CARLO
+        ):
+            return
+        steps = request.latticeSteps or DEFAULT_STEPS
+        if points * steps ** 2 > max_node_steps:
+            raise ValueError(
+                f"{points} lattices of {steps} steps exceed the limit of {max_node_steps} node-steps, "
+                f"request fewer points or lattice steps"
+            )
 
     @staticmethod
-    def calculate_price(request):
+    def _check_monte_carlo_work(request, points, max_path_count):
+        """Reject `points` Monte Carlo simulations of `request` whose total paths exceed `max_path_count`."""
+        if max_path_count is None or request.modelType != ModelType.MONTE_CARLO:
+            return
+        paths = request.numPaths or DEFAULT_NUM_PATHS
+        if points * paths > max_path_count:
+            raise ValueError(
+                f"{points} simulations of {paths} paths exceed the limit of {max_path_count} paths, "
+                f"request fewer points or paths"
+            )
+
+    @staticmethod
+    def _price_facade(request):
+        """Price through the hiram_pricing object graph, kept to cross-check the kernels."""
         market = MarketData(
             spot=request.spot,
             rate=request.riskFreeRate,
@@ -22,7 +133,7 @@ class PricerService:
             dividend=request.dividendYield
         )
 
-        payoff = CallPayoff(strike=request.strike) if request.optionType.CALL else PutPayoff(strike=request.strike)
+        payoff = CallPayoff(strike=request.strike) if request.optionType == OptionType.CALL else PutPayoff(strike=request.strike)
         option = VanillaOption(payoff=payoff, expiry=request.maturity)
         pricing_engine = BlackScholesPricingEngine(pricer=BlackScholesPricer)
         option_facade = OptionFacade(option, pricing_engine, market)
@@ -39,16 +150,127 @@ class PricerService:
             )
         )
 
+    @staticmethod
+    def _calculate_monte_carlo_price(request):
+        engine = MonteCarloPricingEngine(
+            num_paths=request.numPaths,
+            num_steps=request.numSteps,
+            seed=request.seed,
+            antithetic=request.antithetic,
+            control_variate=request.controlVariate
+        )
+        with metrics.stage("monte_carlo"):
+            result = engine.price(
+                spot=request.spot,
+                strike=request.strike,
+                maturity=request.maturity,
+                rate=request.riskFreeRate,
+                dividend=request.dividendYield,
+                volatility=request.volatility,
+                is_call=request.optionType == OptionType.CALL,
+                american=request.optionFamily == OptionFamily.AMERICAN
+            )
+
+        return PricingResult(
+            value=result.price,
+            greeks=Greeks(),
+            simulation=SimulationStats(
+                std_error=result.std_error,
+                num_paths=result.num_paths,
+                elapsed=result.elapsed,
+                paths_per_second=result.paths_per_second
+            )
+        )
+
+    def price_batch(self, batch_request):
+        """
+        Price a whole book in one vectorized pass per (option family, option type) kernel.
+        Rows that fail validation get an error message and null outputs instead of failing the batch.
+        """
+        columns = build_batch_columns(batch_request)
+        valid = columns.valid
+
+        prices = np.full(columns.size, np.nan)
+        greeks = {greek: np.full(columns.size, np.nan) for greek in GREEKS}
+
+        for family in OptionFamily:
+            for option_type in OptionType:
+                rows = valid & columns.enum_equals("optionFamily", family) & columns.enum_equals("optionType", option_type)
+                if not rows.any():
+                    continue
+                numeric = {field: values[rows] for field, values in columns.numeric.items()}
+                kernel = self.kernels.get(ModelType.BLACK_SCHOLES, family, option_type)
+                with metrics.stage("pricing_kernel"):
+                    result = kernel.batch(
+                        spot=numeric["spot"],
+                        strike=numeric["strike"],
+                        maturity=numeric["maturity"],
+                        rate=numeric["riskFreeRate"],
+                        dividend=numeric["dividendYield"],
+                        volatility=numeric["volatility"]
+                    )
+                prices[rows] = result["price"]
+                for greek in GREEKS:
+                    greeks[greek][rows] = result["greeks"][greek]
+
+        return {
+            "count": columns.size,
+            "value": to_optional_list(prices),
+            "greeks": {greek: to_optional_list(values) for greek, values in greeks.items()},
+            "error": columns.errors.tolist()
+        }
 
     @staticmethod
-    def generate_option_data(base_request, param_range, param_to_vary="spot"):
+    def solve_implied_volatility(iv_request):
+        option_types = np.atleast_1d(np.asarray(iv_request.optionType, dtype=object))
+        is_call = np.fromiter((t == OptionType.CALL for t in option_types), dtype=bool, count=option_types.size)
+        if np.ndim(iv_request.optionType) == 0:
+            is_call = is_call[0]
+
+        columns = [
+            iv_request.price, iv_request.spot, iv_request.strike, iv_request.maturity,
+            iv_request.riskFreeRate, iv_request.dividendYield, is_call
+        ]
+        try:
+            np.broadcast_shapes(*(np.shape(column) for column in columns))
+        except ValueError:
+            raise ValueError("All list fields of an implied volatility request must have the same length")
+
+        solved = implied_volatility(
+            price=iv_request.price,
+            spot=iv_request.spot,
+            strike=iv_request.strike,
+            maturity=iv_request.maturity,
+            rate=iv_request.riskFreeRate,
+            dividend=iv_request.dividendYield,
+            is_call=is_call,
+            price_tolerance=iv_request.tolerance,
+            max_iterations=iv_request.maxIterations
+        )
+
+        return {
+            "count": solved["volatility"].size,
+            "volatility": solved["volatility"],
+            "iterations": solved["iterations"],
+            "converged": solved["converged"],
+            "error": solved["error"].tolist()
+        }
+
+    def generate_option_data(
+            self, base_request, param_range, param_to_vary="spot", mode=PricingMode.VECTORIZED,
+            lattice_max_node_steps=None, mc_max_path_count=None
+    ):
+        param_to_vary = PARAM_ALIASES.get(param_to_vary, param_to_vary)
+        if param_to_vary not in DEFAULT_PARAM_RANGES:
+            raise ValueError(f"Unsupported parameter to vary: {param_to_vary}")
+
         if base_request is None:
             base_request = OptionPricingRequest(
                 spot=100.0,
                 volatility=0.2,
                 riskFreeRate=0.05,
                 dividendYield=0.01,
-                strikePrice=100.0,
+                strike=100.0,
                 maturity=1.0,
                 optionFamily=OptionFamily.EUROPEAN,
                 optionType=OptionType.CALL,
@@ -56,54 +278,151 @@ class PricerService:
             )
 
         if param_range is None:
-            if param_to_vary == 'spot':
-                param_range = np.linspace(50, 150, 100)
-            elif param_to_vary == 'strikePrice':
-                param_range = np.linspace(50, 150, 100)
-            elif param_to_vary == 'riskFreeRate':
-                param_range = np.linspace(0.01, 0.1, 100)
-            elif param_to_vary == 'volatility':
-                param_range = np.linspace(0.05, 0.5, 100)
-            elif param_to_vary == 'dividendYield':
-                param_range = np.linspace(0, 0.05, 100)
-            elif param_to_vary == 'maturity':
-                param_range = np.linspace(0.1, 2.0, 100)
+            param_range = np.linspace(*DEFAULT_PARAM_RANGES[param_to_vary], 100)
+        param_range = np.asarray(param_range, dtype=float)
+        self._check_lattice_work(base_request, param_range.size, lattice_max_node_steps)
+        self._check_monte_carlo_work(base_request, param_range.size, mc_max_path_count)
 
-        prices = np.zeros_like(param_range, dtype=float)
-        deltas = np.zeros_like(param_range, dtype=float)
-        gammas = np.zeros_like(param_range, dtype=float)
-        vegas = np.zeros_like(param_range, dtype=float)
-        thetas = np.zeros_like(param_range, dtype=float)
-        rhos = np.zeros_like(param_range, dtype=float)
+        # Monte Carlo has no closed form to vectorize, so its sweeps price point by point
+        if mode == PricingMode.REFERENCE or base_request.modelType == ModelType.MONTE_CARLO:
+            price_points, mode = self._price_points_reference, PricingMode.REFERENCE
+        else:
+            price_points = self._price_points_vectorized
 
-        pricer = PricerService()
+        if self.cache is None or not self.cache.is_cacheable(base_request):
+            prices, greeks = price_points(base_request, param_range, param_to_vary)
+        else:
+            prices, greeks = self._price_points_cached(price_points, mode, base_request, param_range, param_to_vary)
 
-        for i, param_value in enumerate(param_range):
-            request_dict = {"spot": base_request.spot, "volatility": base_request.volatility,
-                            "riskFreeRate": base_request.riskFreeRate, "dividendYield": base_request.dividendYield,
-                            "strikePrice": base_request.strikePrice, "maturity": base_request.maturity,
-                            "optionType": base_request.optionType, "isCall": base_request.isCall,
-                            "modelType": base_request.modelType, param_to_vary: float(param_value)}
+        return {
+            'x_values': param_range,
+            'price': prices,
+            'greeks': greeks
+        }
 
-            request = OptionPricingRequest(**request_dict)
+    def build_option_grid(
+            self, grid_request, max_points, json_max_points, block_points, lattice_max_points=None,
+            lattice_max_node_steps=None
+    ):
+        """
+        Validate a 2-D grid request and return it as an OptionGrid whose rows are priced
+        on demand, `block_points` cells per broadcast call, so streaming it keeps memory bounded.
+        American grids are priced on lattices and capped at `lattice_max_points` cells and
+        `lattice_max_node_steps` node-steps.
+        """
+        x_param = PARAM_ALIASES.get(grid_request.x.param, grid_request.x.param)
+        y_param = PARAM_ALIASES.get(grid_request.y.param, grid_request.y.param)
+        for param in (x_param, y_param):
+            if param not in DEFAULT_PARAM_RANGES:
+                raise ValueError(f"Unsupported grid parameter: {param}")
+        if x_param == y_param:
+            raise ValueError("Grid axes must vary two different parameters")
 
-            result = pricer.calculate_price(request)
+        outputs = list(dict.fromkeys(grid_request.outputs))
+        unknown = [output for output in outputs if output not in GRID_OUTPUTS]
+        if not outputs or unknown:
+            raise ValueError(f"Grid outputs must be among {', '.join(GRID_OUTPUTS)}")
 
-            prices[i] = result.value
-            deltas[i] = result.greeks.delta if result.greeks.delta is not None else 0.0
-            gammas[i] = result.greeks.gamma if result.greeks.gamma is not None else 0.0
-            vegas[i] = result.greeks.vega if result.greeks.vega is not None else 0.0
-            thetas[i] = result.greeks.theta if result.greeks.theta is not None else 0.0
-            rhos[i] = result.greeks.rho if result.greeks.rho is not None else 0.0
+        if grid_request.modelType != ModelType.BLACK_SCHOLES:
+            raise ValueError("Grids are only available under Black Scholes")
 
-        return {
-            'x_values': param_range,
-            'price': prices,
-            'greeks': {
-                'delta': deltas,
-                'gamma': gammas,
-                'vega': vegas,
-                'theta': thetas,
-                'rho': rhos
-            }
+        rows, cols = grid_request.x.num_points, grid_request.y.num_points
+        if grid_request.optionFamily == OptionFamily.AMERICAN and lattice_max_points is not None:
+            max_points = min(max_points, lattice_max_points)
+        if rows * cols > max_points:
+            raise ValueError(f"Grid of {rows}x{cols} exceeds the limit of {max_points} points")
+        self._check_lattice_work(grid_request, rows * cols, lattice_max_node_steps)
+        if grid_request.format == GridFormat.JSON and rows * cols > json_max_points:
+            raise ValueError(
+                f"Grid of {rows}x{cols} exceeds the JSON limit of {json_max_points} points, "
+                f"request the ndjson or binary format instead"
+            )
+
+        x_values = np.linspace(grid_request.x.min_value, grid_request.x.max_value, rows)
+        y_values = np.linspace(grid_request.y.min_value, grid_request.y.max_value, cols)
+        rows_per_block = max(1, block_points // cols)
+        # Lattice vega and rho reprice bumped lattices: skip them when not requested
+        bumped_greeks = "vega" in outputs or "rho" in outputs
+
+        def blocks():
+            for start in range(0, rows, rows_per_block):
+                result = self._price_vectorized(grid_request, {
+                    x_param: x_values[start:start + rows_per_block, None],
+                    y_param: y_values[None, :],
+                }, bumped_greeks=bumped_greeks)
+                values = {"price": result["price"], **result["greeks"]}
+                yield start, {output: values[output] for output in outputs}
+
+        return OptionGrid(x_param, y_param, x_values, y_values, outputs, blocks)
+
+    def _price_points_cached(self, price_points, mode, base_request, param_range, param_to_vary):
+        """
+        Reuse every point already priced by an earlier, possibly overlapping, sweep
+        and only price the missing ones. Points are cached as (price, *greeks) rows.
+        """
+        base_request = self.cache.canonical_request(base_request)
+        points = quantize(param_range, self.cache.significant_digits)
+        keys = self.cache.point_keys(base_request, param_to_vary, points, mode)
+
+        rows = self.cache.get_many(keys)
+        missing = np.array([i for i, row in enumerate(rows) if row is None], dtype=int)
+        if missing.size:
+            prices, greeks = price_points(base_request, points[missing], param_to_vary)
+            computed = np.column_stack([prices] + [greeks[greek] for greek in GREEKS])
+            for i, row in zip(missing, computed):
+                rows[i] = row
+            self.cache.set_many((keys[i], row) for i, row in zip(missing, computed))
+
+        table = np.array(rows, dtype=float).reshape(len(rows), 1 + len(GREEKS))
+        return table[:, 0], {greek: table[:, 1 + i] for i, greek in enumerate(GREEKS)}
+
+    def _price_vectorized(self, base_request, overrides, bumped_greeks=True):
+        """
+        Price and Greeks of `base_request` with some inputs replaced by arrays, through
+        the batch kernel of its option family and type.
+        """
+        inputs = {
+            "spot": base_request.spot,
+            "strike": base_request.strike,
+            "maturity": base_request.maturity,
+            "riskFreeRate": base_request.riskFreeRate,
+            "dividendYield": base_request.dividendYield,
+            "volatility": base_request.volatility,
         }
+        inputs.update(overrides)
+
+        kernel = self.kernels.get(ModelType.BLACK_SCHOLES, base_request.optionFamily, base_request.optionType)
+        with metrics.stage("pricing_kernel"):
+            return kernel.batch(
+                spot=inputs["spot"],
+                strike=inputs["strike"],
+                maturity=inputs["maturity"],
+                rate=inputs["riskFreeRate"],
+                dividend=inputs["dividendYield"],
+                volatility=inputs["volatility"],
+                **self._lattice_options(base_request, bumped_greeks=bumped_greeks)
+            )
+
+    def _price_points_vectorized(self, base_request, param_range, param_to_vary):
+        result = self._price_vectorized(base_request, {param_to_vary: param_range})
+        return result["price"], result["greeks"]
+
+    def _price_points_reference(self, base_request, param_range, param_to_vary):
+        """Per-point facade pricing, kept to cross-check the vectorized path; American points go through the kernels."""
+        prices = np.zeros_like(param_range, dtype=float)
+        greeks = {greek: np.zeros_like(param_range, dtype=float) for greek in GREEKS}
+
+        for i, param_value in enumerate(param_range):
+            request = base_request.model_copy(update={param_to_vary: float(param_value)})
+            if request.modelType == ModelType.BLACK_SCHOLES and request.optionFamily == OptionFamily.EUROPEAN:
+                result = PricerService._price_facade(request)
+            else:
+                result = self._price(request)
+
+            prices[i] = result.value
+            for greek in GREEKS:
+                value = getattr(result.greeks, greek)
+                # Monte Carlo prices come without Greeks: plotted as gaps rather than zeros
+                greeks[greek][i] = value if value is not None else np.nan
+
+        return prices, greeks
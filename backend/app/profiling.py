@@ -0,0 +1,353 @@
+"""
+On-demand cProfile profiling of API requests.
+
+Routers built with `route_class=ProfilingRoute` profile a request when profiling is
+enabled for every request, or when it carries the configured token in the
+X-Profile-Token header. The event loop's share of the request (validation, async
+endpoints, response serialization) and, for sync endpoints, the worker thread running
+the endpoint are profiled separately and merged. The event loop profile also sees any
+other coroutine that runs while the request awaits, and work fanned out to further
+threads is not profiled.
+
+Each profile is saved as a pstats dump (`.prof`, for snakeviz / gprof2dot) and as
+collapsed stacks (`.folded`, for flamegraph.pl / speedscope / inferno); only the
+slowest `keep` profiles are retained.
+"""
+import asyncio
+import cProfile
+import heapq
+import inspect
+import io
+import itertools
+import logging
+import os
+import pstats
+import secrets
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from backend.app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+# Functions listed in a profile summary, by cumulative time
+TOP_FUNCTIONS = 25
+# Deepest call chain written to the collapsed stacks, and the smallest share of the
+# profile's time a frame needs to be written: paths through cProfile's call graph
+# multiply with its size, the threshold bounds the frames per depth
+MAX_STACK_DEPTH = 128
+MIN_FRAME_FRACTION = 2e-4
+
+_session: ContextVar[Optional["ProfileSession"]] = ContextVar("profile_session", default=None)
+
+
+def _frame_label(function) -> str:
+    filename, line, name = function
+    if filename == "~":
+        # Built-ins, e.g. <method 'sort' of 'list' objects>
+        return name.replace(";", ":")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ":")
+
+
+def collapsed_stacks(stats: pstats.Stats, root: Optional[str] = None) -> str:
+    """
+    Collapsed stacks ("root;caller;function microseconds" lines) of a cProfile profile,
+    under a `root` frame if given. cProfile only records caller -> callee edges, so the
+    time of a function reached along several paths is split between them in proportion
+    to each edge's time.
+    """
+    callees = defaultdict(dict)
+    roots = []
+    for function, (_, _, _, _, callers) in stats.stats.items():
+        if not callers:
+            roots.append(function)
+        for caller, edge in callers.items():
+            callees[caller][function] = edge
+
+    lines = defaultdict(float)
+    threshold = max(stats.total_tt * MIN_FRAME_FRACTION, 1e-6)
+
+    def walk(function, path, labels, share):
+        own = stats.stats[function][2]
+        labels = labels + (_frame_label(function),)
+        lines[";".join(labels)] += own * share
+        if len(labels) >= MAX_STACK_DEPTH:
+            return
+        for callee, (_, _, _, edge_cumulative) in callees[function].items():
+            callee_cumulative = stats.stats[callee][3]
+            if callee in path or share * edge_cumulative < threshold:
+                continue
+            walk(callee, path | {callee}, labels, share * edge_cumulative / callee_cumulative)
+
+    for function in roots:
+        walk(function, {function}, (root,) if root else (), 1.0)
+    return "".join(f"{stack} {round(seconds * 1e6)}\n" for stack, seconds in lines.items() if seconds >= 1e-6)
+
+
+def top_functions(stats: pstats.Stats, limit: int = TOP_FUNCTIONS) -> List[Dict]:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            "function": pstats.func_std_string(function),
+            "calls": calls,
+            "primitive_calls": primitive_calls,
+            "total_time": own,
+            "cumulative_time": cumulative,
+        }
+        for function, (primitive_calls, calls, own, cumulative, _) in rows
+    ]
+
+
+@dataclass
+class ProfileRecord:
+    id: str
+    method: str
+    path: str
+    route: str
+    status_code: int
+    duration: float
+    started_at: datetime
+    top_functions: List[Dict] = field(default_factory=list)
+    pstats_path: Optional[str] = None
+    folded_path: Optional[str] = None
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status_code": self.status_code,
+            "duration": self.duration,
+            "started_at": self.started_at.isoformat(),
+        }
+
+
+class ProfileStore:
+    """
+    Thread-safe ring buffer of the `keep` slowest request profiles. Artifacts are
+    written to `directory`; those of a profile pushed out of the buffer are deleted.
+    """
+
+    def __init__(self, keep: int = 20, directory: Optional[str] = None):
+        self.keep = keep
+        self.directory = directory or os.path.join(tempfile.gettempdir(), "hiram-profiles")
+        self._heap = []
+        self._records: Dict[str, ProfileRecord] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def add(self, record: ProfileRecord, session: "ProfileSession") -> bool:
+        """Keep `record` if it is among the slowest profiles; returns whether it was kept."""
+        with self._lock:
+            if len(self._heap) >= self.keep and record.duration <= self._heap[0][0]:
+                return False
+
+        os.makedirs(self.directory, exist_ok=True)
+        record.pstats_path = os.path.join(self.directory, f"{record.id}.prof")
+        record.folded_path = os.path.join(self.directory, f"{record.id}.folded")
+        stats = session.stats()
+        stats.dump_stats(record.pstats_path)
+        with open(record.folded_path, "w") as folded:
+            folded.write(session.collapsed_stacks())
+        record.top_functions = top_functions(stats)
+
+        with self._lock:
+            heapq.heappush(self._heap, (record.duration, next(self._counter), record.id))
+            self._records[record.id] = record
+            evicted = [
+                self._records.pop(heapq.heappop(self._heap)[2]) for _ in range(max(len(self._heap) - self.keep, 0))
+            ]
+        for old in evicted:
+            self._remove_artifacts(old)
+        return record.id in self._records
+
+    def get(self, profile_id: str) -> ProfileRecord:
+        with self._lock:
+            record = self._records.get(profile_id)
+        if record is None:
+            raise LookupError(f"No profile {profile_id}")
+        return record
+
+    def list(self) -> List[ProfileRecord]:
+        """Retained profiles, slowest first."""
+        with self._lock:
+            return sorted(self._records.values(), key=lambda record: record.duration, reverse=True)
+
+    def clear(self):
+        with self._lock:
+            records = list(self._records.values())
+            self._records.clear()
+            self._heap.clear()
+        for record in records:
+            self._remove_artifacts(record)
+
+    @staticmethod
+    def _remove_artifacts(record: ProfileRecord):
+        for path in (record.pstats_path, record.folded_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+
+
+class ProfileSession:
+    """Profiles of one request, one per thread it ran on, by thread name."""
+
+    def __init__(self):
+        self.profiles: List[Tuple[str, cProfile.Profile]] = []
+        self._lock = threading.Lock()
+
+    def run(self, function: Callable, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active on this thread
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            profile.disable()
+            self.add(threading.current_thread().name, profile)
+
+    def add(self, thread: str, profile: cProfile.Profile):
+        with self._lock:
+            self.profiles.append((thread, profile))
+
+    def stats(self) -> pstats.Stats:
+        """All threads' profiles merged."""
+        with self._lock:
+            profiles = [profile for _, profile in self.profiles]
+        stats = pstats.Stats(profiles[0], stream=io.StringIO())
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+    def collapsed_stacks(self) -> str:
+        """Collapsed stacks of every thread, each under a root frame named after the thread."""
+        with self._lock:
+            profiles = list(self.profiles)
+        return "".join(
+            collapsed_stacks(pstats.Stats(profile, stream=io.StringIO()), root=thread) for thread, profile in profiles
+        )
+
+
+class RequestProfiler:
+    """Decides which requests are profiled and records their profiles in `store`."""
+
+    def __init__(self, store: ProfileStore, enabled: bool = False, token: Optional[str] = None):
+        self.store = store
+        self.enabled = enabled
+        self.token = token
+        # cProfile hooks are per thread: one request at a time is profiled on the event loop
+        self._event_loop = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        return self.enabled or bool(self.token)
+
+    def authorized(self, token: Optional[str]) -> bool:
+        return bool(self.token) and token is not None and secrets.compare_digest(token, self.token)
+
+    def wants(self, request: Request) -> bool:
+        return self.enabled or self.authorized(request.headers.get(PROFILE_HEADER))
+
+    def route_handler(self, route: APIRoute, handler: Callable) -> Callable:
+        async def profiled_handler(request: Request) -> Response:
+            if not self.wants(request) or not self._event_loop.acquire(blocking=False):
+                return await handler(request)
+
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active on the event loop thread
+                self._event_loop.release()
+                return await handler(request)
+
+            session = ProfileSession()
+            token = _session.set(session)
+            started_at = datetime.now(timezone.utc)
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            finally:
+                profile.disable()
+                duration = time.perf_counter() - start
+                _session.reset(token)
+                self._event_loop.release()
+
+            session.add("event loop", profile)
+            record = ProfileRecord(
+                id=uuid.uuid4().hex,
+                method=request.method,
+                path=request.url.path,
+                route=route.path,
+                status_code=response.status_code,
+                duration=duration,
+                started_at=started_at,
+            )
+            try:
+                # Writing the artifacts walks the whole call graph: keep it off the event loop
+                if await asyncio.to_thread(self.store.add, record, session):
+                    response.headers[PROFILE_ID_HEADER] = record.id
+            except OSError:
+                logger.exception("Could not save the profile of %s %s", request.method, request.url.path)
+            return response
+
+        return profiled_handler
+
+
+def profiled_endpoint(endpoint: Callable) -> Callable:
+    """Sync endpoint that profiles itself, on its worker thread, when its request is profiled."""
+    @wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        session = _session.get()
+        if session is None:
+            return endpoint(*args, **kwargs)
+        return session.run(endpoint, *args, **kwargs)
+    return wrapper
+
+
+def _is_async(endpoint: Callable) -> bool:
+    return inspect.iscoroutinefunction(endpoint) or inspect.iscoroutinefunction(getattr(endpoint, "__call__", None))
+
+
+def _build_profiler() -> RequestProfiler:
+    settings = get_settings()
+    return RequestProfiler(
+        store=ProfileStore(keep=settings.profiling_keep, directory=settings.profiling_dir),
+        enabled=settings.profiling_enabled,
+        token=settings.profiling_token,
+    )
+
+
+request_profiler = _build_profiler()
+
+
+class ProfilingRoute(APIRoute):
+    """API route whose requests can be profiled by `request_profiler`."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        # FastAPI runs sync endpoints on a worker thread, out of reach of the event loop's profile
+        if request_profiler.available and not _is_async(endpoint):
+            endpoint = profiled_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        if not request_profiler.available:
+            return handler
+        return request_profiler.route_handler(self, handler)
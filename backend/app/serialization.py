@@ -0,0 +1,77 @@
+from enum import Enum
+from typing import Any, Dict, List
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from backend.app.metrics import metrics
+
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+class HistoryOrient(str, Enum):
+    COLUMNS = "columns"
+    RECORDS = "records"
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types orjson does not encode natively."""
+    if isinstance(obj, pd.DataFrame):
+        return frame_to_columns(obj)
+    if isinstance(obj, pd.Series):
+        return _column_values(obj)
+    if isinstance(obj, pd.Timestamp):
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        # Non-contiguous or object arrays are not handled by OPT_SERIALIZE_NUMPY
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def _column_values(column: pd.Series):
+    if pd.api.types.is_datetime64_any_dtype(column.dtype):
+        values = column.dt.tz_localize(None) if column.dt.tz is not None else column
+        return np.datetime_as_string(values.to_numpy(dtype="datetime64[s]"), unit="s")
+    if pd.api.types.is_numeric_dtype(column.dtype) and not pd.api.types.is_bool_dtype(column.dtype):
+        # orjson writes NaN/inf in float arrays as null
+        return np.ascontiguousarray(column.to_numpy(dtype=np.float64))
+    return column.tolist()
+
+
+def frame_to_columns(frame: pd.DataFrame) -> Dict[str, Any]:
+    """One array per column, taken straight from the DataFrame buffers."""
+    return {str(name): _column_values(frame[name]) for name in frame.columns}
+
+
+def frame_to_records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Row-oriented shape (one dict per row), kept for older clients."""
+    columns = frame_to_columns(frame)
+    names = list(columns)
+    values = [col.tolist() if isinstance(col, np.ndarray) else col for col in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def serialize_frame(frame: pd.DataFrame, orient: HistoryOrient = HistoryOrient.COLUMNS):
+    if orient == HistoryOrient.RECORDS:
+        return frame_to_records(frame)
+    return frame_to_columns(frame)
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class NumpyJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson with native NumPy support; NaN and inf become null.
+    Return an instance directly from a route: FastAPI then skips its jsonable_encoder pass.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with metrics.stage("serialization"):
+            return dumps(content)
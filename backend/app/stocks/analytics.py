@@ -0,0 +1,84 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Lookback of each performance window in calendar days
+PERFORMANCE_WINDOWS = {
+    "fiveYears": 5 * 365,
+    "threeYears": 3 * 365,
+    "oneYear": 252,
+    "sixMonths": 182,
+    "oneMonth": 30,
+}
+
+
+def compute_returns(close: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Daily and compounded cumulative returns of a close series, as float64 arrays.
+    Missing closes are carried forward, so a gap neither loses nor double counts a move;
+    their daily return is reported as NaN.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    valid = np.isfinite(close)
+    last_valid = np.maximum.accumulate(np.where(valid, np.arange(close.size), 0))
+    filled = close[last_valid] if close.size else close
+
+    daily_return = np.full(close.shape, np.nan)
+    if close.size > 1:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            daily_return[1:] = filled[1:] / filled[:-1] - 1.0
+    daily_return[~np.isfinite(daily_return)] = np.nan
+
+    cumulative_return = np.cumprod(1.0 + np.nan_to_num(daily_return, nan=0.0)) - 1.0
+    daily_return[~valid] = np.nan
+    return daily_return, cumulative_return
+
+
+def _round_performance(value) -> Optional[float]:
+    return round(float(value), 2) if np.isfinite(value) else None
+
+
+def calculate_performances(dates: np.ndarray, cumulative_return: np.ndarray) -> Dict[str, Optional[float]]:
+    """
+    Percent performance over every window in PERFORMANCE_WINDOWS plus year-to-date,
+    resolved in one `searchsorted` over the sorted dates. A window needs at least
+    two bars, otherwise its performance is None.
+    """
+    dates = np.asarray(dates, dtype="datetime64[ns]")
+    if dates.size < 2:
+        return {**{name: None for name in PERFORMANCE_WINDOWS}, "ytd": None}
+
+    last_date = dates[-1]
+    start_of_year = np.datetime64(pd.Timestamp(last_date).replace(month=1, day=1), "ns")
+    starts = np.array(
+        [last_date - np.timedelta64(days, "D") for days in PERFORMANCE_WINDOWS.values()] + [start_of_year],
+        dtype="datetime64[ns]"
+    )
+    first = np.searchsorted(dates, starts, side="left")
+
+    growth = 1.0 + np.asarray(cumulative_return, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        performance = (growth[-1] / growth[np.minimum(first, dates.size - 1)] - 1.0) * 100.0
+    performance[dates.size - first < 2] = np.nan
+
+    names = [*PERFORMANCE_WINDOWS, "ytd"]
+    return {name: _round_performance(value) for name, value in zip(names, performance)}
+
+
+def build_history_frame(hist: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Optional[float]]]:
+    """
+    Add daily/cumulative returns to a Date-indexed OHLCV frame and compute its
+    performance windows. Numeric columns stay float64 with NaN for missing values.
+    """
+    hist = hist.sort_index()
+    daily_return, cumulative_return = compute_returns(hist["Close"].to_numpy())
+
+    frame = hist[["Open", "High", "Low", "Close", "Volume", "Dividends"]].reset_index()
+    frame["daily_return"] = daily_return
+    frame["cumulative_return"] = cumulative_return
+
+    dates = pd.DatetimeIndex(frame["Date"])
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    return frame, calculate_performances(dates.to_numpy(), cumulative_return)
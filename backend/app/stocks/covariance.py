@@ -0,0 +1,212 @@
+"""
+Covariance and correlation estimators over aligned daily log returns.
+
+Every estimator keeps a small state of window sums (moments, or exponentially weighted
+cross products) for the returns matrix up to some row. Moving that state forward by k
+new rows adds their terms and subtracts those of the rows leaving the window, so a
+cached matrix follows new bars in O(k p^2) instead of O(window p^2).
+"""
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS_PER_YEAR = 252
+
+
+class CovarianceMethod(str, Enum):
+    SAMPLE = "sample"
+    # RiskMetrics exponentially weighted, zero-mean
+    EWMA = "ewma"
+    # Sample covariance shrunk towards a scaled identity (Ledoit & Wolf, 2004)
+    LEDOIT_WOLF = "ledoit_wolf"
+
+
+def aligned_log_returns(closes: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dates and (dates, symbols) log returns over the calendar every symbol has a close
+    on: a return spans two consecutive common dates.
+    """
+    closes = closes.sort_index()
+    values = closes.to_numpy(dtype=np.float64)
+    common = np.isfinite(values).all(axis=1) & (values > 0).all(axis=1)
+    values = values[common]
+    dates = closes.index.to_numpy(dtype="datetime64[D]")[common]
+    if len(values) < 2:
+        return dates[:0], np.empty((0, values.shape[1]))
+    return dates[1:], np.log(values[1:] / values[:-1])
+
+
+def correlation_from_covariance(covariance: np.ndarray) -> np.ndarray:
+    deviation = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(deviation, deviation)
+    np.fill_diagonal(correlation, np.where(deviation > 0, 1.0, np.nan))
+    return np.clip(correlation, -1.0, 1.0)
+
+
+@dataclass
+class Moments:
+    """Window sums of returns x: count, sum x, sum x x', sum |x|^4 and sum |x|^2 x."""
+    count: int
+    first: np.ndarray
+    cross: np.ndarray
+    quartic: float
+    cubic: np.ndarray
+
+    @classmethod
+    def of(cls, x: np.ndarray) -> "Moments":
+        squared_norm = np.einsum("ij,ij->i", x, x)
+        return cls(len(x), x.sum(axis=0), x.T @ x, float(squared_norm @ squared_norm), squared_norm @ x)
+
+    def __add__(self, other: "Moments") -> "Moments":
+        return Moments(
+            self.count + other.count, self.first + other.first, self.cross + other.cross,
+            self.quartic + other.quartic, self.cubic + other.cubic
+        )
+
+    def __sub__(self, other: "Moments") -> "Moments":
+        return Moments(
+            self.count - other.count, self.first - other.first, self.cross - other.cross,
+            self.quartic - other.quartic, self.cubic - other.cubic
+        )
+
+
+class CovarianceEstimator(ABC):
+    """
+    Daily covariance over the last `window` rows of a returns matrix. `state(returns, end)`
+    builds the state of the window ending at row `end` from scratch; `advance` moves the
+    state of row `anchor` to row `end` using only the rows in between and those leaving
+    the window.
+    """
+    window: int = 252
+
+    @abstractmethod
+    def state(self, returns: np.ndarray, end: int):
+        ...
+
+    @abstractmethod
+    def advance(self, state, returns: np.ndarray, anchor: int, end: int):
+        ...
+
+    @abstractmethod
+    def covariance(self, state) -> Tuple[np.ndarray, Dict[str, float]]:
+        """Covariance matrix of a state, and estimator details (e.g. the shrinkage)."""
+
+    def observations(self, end: int) -> int:
+        return min(self.window, end + 1)
+
+
+@dataclass(frozen=True)
+class SampleCovariance(CovarianceEstimator):
+    """Unbiased sample covariance of the window's returns."""
+    window: int = 252
+
+    def state(self, returns, end):
+        return Moments.of(returns[max(end + 1 - self.window, 0):end + 1])
+
+    def advance(self, state, returns, anchor, end):
+        if end - anchor >= self.window:
+            return self.state(returns, end)
+        added = Moments.of(returns[anchor + 1:end + 1])
+        removed = Moments.of(returns[max(anchor + 1 - self.window, 0):max(end + 1 - self.window, 0)])
+        return state + added - removed
+
+    def covariance(self, state):
+        n = state.count
+        mean = state.first / n
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (state.cross - n * np.outer(mean, mean)) / (n - 1), {}
+
+
+@dataclass(frozen=True)
+class LedoitWolfCovariance(SampleCovariance):
+    """
+    Biased sample covariance S shrunk towards mu I, mu = trace(S) / p, with the
+    Ledoit-Wolf intensity. The fourth-moment term of the intensity is expanded around
+    the window mean, so it comes from the same incremental moments.
+    """
+
+    def covariance(self, state):
+        n, p = state.count, len(state.first)
+        mean = state.first / n
+        centered_cross = state.cross - n * np.outer(mean, mean)
+        sample = centered_cross / n
+        mu = np.trace(sample) / p
+
+        # sum_k ||x_k - m||^4, from the moments of the raw returns
+        m2 = mean @ mean
+        quartic = (
+            state.quartic - 4.0 * state.cubic @ mean + 2.0 * m2 * np.trace(state.cross)
+            + 4.0 * mean @ state.cross @ mean - 4.0 * m2 * (mean @ state.first) + n * m2 * m2
+        )
+        delta = (np.sum(sample * sample) - 2.0 * mu * np.trace(sample) + p * mu * mu) / p
+        beta = (quartic / n - np.sum(sample * sample)) / (p * n)
+        shrinkage = float(min(max(beta, 0.0), delta) / delta) if delta > 0 else 0.0
+
+        shrunk = (1.0 - shrinkage) * sample
+        shrunk[np.diag_indices(p)] += shrinkage * mu
+        return shrunk, {"shrinkage": shrinkage}
+
+
+@dataclass(frozen=True)
+class EwmaCovariance(CovarianceEstimator):
+    """
+    Zero-mean exponentially weighted covariance: weight decay^j on the return j days
+    before the last one, over the window, normalized by the sum of the weights.
+    """
+    window: int = 252
+    decay: float = 0.94
+
+    def state(self, returns, end):
+        rows = returns[max(end + 1 - self.window, 0):end + 1]
+        weights = self.decay ** np.arange(len(rows) - 1, -1, -1, dtype=np.float64)
+        return (rows * weights[:, None]).T @ rows, len(rows)
+
+    def advance(self, state, returns, anchor, end):
+        steps = end - anchor
+        if steps >= self.window:
+            return self.state(returns, end)
+        weighted, count = state
+        weights = self.decay ** np.arange(steps - 1, -1, -1, dtype=np.float64)
+        added = returns[anchor + 1:end + 1]
+        weighted = self.decay ** steps * weighted + (added * weights[:, None]).T @ added
+
+        # Rows pushed out of the window, each weighted as it would have been on leaving
+        lo, hi = anchor + 1 - self.window, end + 1 - self.window
+        if hi > 0:
+            removed = returns[max(lo, 0):hi]
+            leaving = self.decay ** self.window * weights[max(-lo, 0):]
+            weighted = weighted - (removed * leaving[:, None]).T @ removed
+        return weighted, min(count + steps, self.window)
+
+    def covariance(self, state):
+        weighted, count = state
+        total = (1.0 - self.decay ** count) / (1.0 - self.decay)
+        return weighted / total, {"decay": self.decay}
+
+
+ESTIMATORS = {
+    CovarianceMethod.SAMPLE: SampleCovariance,
+    CovarianceMethod.EWMA: EwmaCovariance,
+    CovarianceMethod.LEDOIT_WOLF: LedoitWolfCovariance,
+}
+
+# Longest window a request may ask for
+MAX_WINDOW = 2_520
+
+
+def make_estimator(method: CovarianceMethod, window: int = 252, decay: Optional[float] = None) -> CovarianceEstimator:
+    if not 2 <= window <= MAX_WINDOW:
+        raise ValueError(f"window must be between 2 and {MAX_WINDOW}")
+    if method == CovarianceMethod.EWMA:
+        decay = 0.94 if decay is None else decay
+        if not 0.0 < decay < 1.0:
+            raise ValueError("decay must be between 0 and 1")
+        return EwmaCovariance(window=window, decay=decay)
+    if decay is not None:
+        raise ValueError(f"decay only applies to the {CovarianceMethod.EWMA.value} estimator")
+    return ESTIMATORS[method](window=window)
@@ -0,0 +1,153 @@
+from dataclasses import dataclass
+from datetime import date
+from enum import Enum
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Columns of a history frame reduced with each aggregate when bars are merged into buckets
+FIRST_COLUMNS = ("Date", "Open")
+LAST_COLUMNS = ("Close", "cumulative_return")
+SUM_COLUMNS = ("Volume", "Dividends")
+
+
+class HistoryInterval(str, Enum):
+    DAILY = "daily"
+    WEEKLY = "weekly"
+    MONTHLY = "monthly"
+
+
+class DownsampleMethod(str, Enum):
+    # Largest-Triangle-Three-Buckets: keeps the daily bars that preserve the close line's shape
+    LTTB = "lttb"
+    # Merges consecutive bars into OHLC candles
+    OHLC = "ohlc"
+
+
+def slice_dates(frame: pd.DataFrame, start: Optional[date] = None, end: Optional[date] = None) -> pd.DataFrame:
+    """Rows of a Date-sorted history frame between `start` and `end`, both inclusive."""
+    dates = pd.DatetimeIndex(frame["Date"])
+    if dates.tz is not None:
+        dates = dates.tz_localize(None)
+    lo = dates.searchsorted(pd.Timestamp(start), side="left") if start is not None else 0
+    hi = dates.searchsorted(pd.Timestamp(end), side="right") if end is not None else len(frame)
+    return frame.iloc[lo:hi].reset_index(drop=True)
+
+
+def aggregate_buckets(frame: pd.DataFrame, starts: np.ndarray) -> pd.DataFrame:
+    """
+    Merge the bars of a history frame into buckets beginning at row positions `starts`.
+    A bucket is dated by its first bar and carries its first open, highest high, lowest
+    low, last close and summed volume and dividends; `daily_return` becomes the return
+    over the bucket and `cumulative_return` is the one at its last bar.
+    """
+    if len(frame) == 0:
+        return frame
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.append(starts[1:], len(frame)) - 1
+
+    buckets = {}
+    for name in frame.columns:
+        values = frame[name].to_numpy()
+        if name in FIRST_COLUMNS:
+            buckets[name] = values[starts]
+        elif name in LAST_COLUMNS:
+            buckets[name] = values[ends]
+        elif name in SUM_COLUMNS:
+            buckets[name] = np.add.reduceat(np.nan_to_num(values.astype(np.float64)), starts)
+        elif name == "High":
+            # fmax / fmin skip NaN bars instead of propagating them
+            buckets[name] = np.fmax.reduceat(values.astype(np.float64), starts)
+        elif name == "Low":
+            buckets[name] = np.fmin.reduceat(values.astype(np.float64), starts)
+
+    if "cumulative_return" in frame.columns and "daily_return" in frame.columns:
+        growth = 1.0 + frame["cumulative_return"].to_numpy(dtype=np.float64)
+        first_return = np.nan_to_num(frame["daily_return"].to_numpy(dtype=np.float64)[starts], nan=0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            buckets["daily_return"] = growth[ends] / (growth[starts] / (1.0 + first_return)) - 1.0
+
+    return pd.DataFrame({name: buckets[name] for name in frame.columns if name in buckets})
+
+
+def period_starts(frame: pd.DataFrame, interval: HistoryInterval) -> np.ndarray:
+    """Row positions where a new calendar week (Monday based) or month begins."""
+    days = pd.DatetimeIndex(frame["Date"]).to_numpy(dtype="datetime64[D]")
+    if interval == HistoryInterval.WEEKLY:
+        # 1970-01-01 is a Thursday: shifting by 3 days makes weeks start on Monday
+        keys = (days.astype(np.int64) + 3) // 7
+    else:
+        keys = days.astype("datetime64[M]").astype(np.int64)
+    return np.flatnonzero(np.diff(keys, prepend=keys[:1] - 1))
+
+
+def ohlc_bucket_starts(num_rows: int, points: int) -> np.ndarray:
+    """Start positions of `points` buckets of (almost) equal size over `num_rows` bars."""
+    return np.unique(np.floor(np.linspace(0, num_rows, points, endpoint=False)).astype(np.int64))
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """
+    Row positions kept by Largest-Triangle-Three-Buckets: the first and last points,
+    plus one per bucket in between, the one forming the largest triangle with the point
+    kept in the previous bucket and the average of the next bucket.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = x.size
+    if points >= n or points < 3:
+        return np.arange(n)
+
+    # A missing close would make every triangle around it NaN: carry the last one forward
+    valid = np.isfinite(y)
+    if not valid.all():
+        y = y[np.maximum.accumulate(np.where(valid, np.arange(n), 0))]
+        y = np.nan_to_num(y, nan=0.0)
+
+    every = (n - 2) / (points - 2)
+    edges = np.append(np.floor(np.arange(points - 1) * every).astype(np.int64) + 1, n)
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(points - 2):
+        lo, hi = edges[i], edges[i + 1]
+        next_lo, next_hi = edges[i + 1], edges[i + 2]
+        xc, yc = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - xc) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (yc - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+@dataclass(frozen=True)
+class HistoryView:
+    """Date range, sampling interval and target point count applied to a history frame."""
+    start: Optional[date] = None
+    end: Optional[date] = None
+    interval: HistoryInterval = HistoryInterval.DAILY
+    points: Optional[int] = None
+    method: DownsampleMethod = DownsampleMethod.LTTB
+
+    def __post_init__(self):
+        if self.start is not None and self.end is not None and self.start > self.end:
+            raise ValueError("start must not be after end")
+        if self.points is not None and self.points < 3:
+            raise ValueError("points must be at least 3")
+
+    def apply(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Slice to [start, end], resample to the interval, then reduce to at most `points` rows."""
+        if self.start is not None or self.end is not None:
+            frame = slice_dates(frame, self.start, self.end)
+        if self.interval != HistoryInterval.DAILY and len(frame):
+            frame = aggregate_buckets(frame, period_starts(frame, self.interval))
+
+        if self.points is None or len(frame) <= self.points:
+            return frame
+        if self.method == DownsampleMethod.OHLC:
+            return aggregate_buckets(frame, ohlc_bucket_starts(len(frame), self.points))
+
+        x = pd.DatetimeIndex(frame["Date"]).asi8
+        keep = lttb_indices(x, frame["Close"].to_numpy(dtype=np.float64), self.points)
+        return frame.iloc[keep].reset_index(drop=True)
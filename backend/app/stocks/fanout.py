@@ -0,0 +1,78 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key: the first caller starts the work,
+    later callers await the same task until it finishes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self):
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # shield: a caller timing out must not cancel the work other callers are waiting on
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        self._inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            # Marks the exception as retrieved when every waiter already gave up
+            logger.debug("In-flight call for %s failed: %s", key, task.exception())
+
+
+class ConcurrentLoader:
+    """
+    Runs a blocking per-key loader for many keys at once on a dedicated thread pool,
+    with at most `max_concurrency` loads running, a per-key timeout, single-flight
+    coalescing of duplicate keys, and partial results.
+    """
+
+    def __init__(self, load: Callable[[Hashable], Any], max_concurrency: int = 8, timeout: float = 15.0):
+        self.load = load
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="loader")
+        self._semaphore = None
+        self._max_concurrency = max_concurrency
+        self._single_flight = SingleFlight()
+
+    async def _load(self, key):
+        if self._semaphore is None:
+            # Created lazily so it binds to the running event loop
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        async with self._semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self.load, key)
+
+    async def load_one(self, key):
+        return await asyncio.wait_for(self._single_flight.do(key, lambda: self._load(key)), timeout=self.timeout)
+
+    async def load_many(self, keys: Iterable[Hashable]):
+        """Returns (results, errors), both dicts keyed by the requested keys."""
+        keys = list(dict.fromkeys(keys))
+        outcomes = await asyncio.gather(*(self.load_one(key) for key in keys), return_exceptions=True)
+
+        results, errors = {}, {}
+        for key, outcome in zip(keys, outcomes):
+            if isinstance(outcome, asyncio.TimeoutError):
+                errors[key] = f"timed out after {self.timeout}s"
+            elif isinstance(outcome, Exception):
+                errors[key] = str(outcome)
+            else:
+                results[key] = outcome
+        return results, errors
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
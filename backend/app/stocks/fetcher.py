@@ -0,0 +1,99 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import date
+from typing import Dict, Optional
+
+import pandas as pd
+import yfinance as yf
+
+from backend.app.metrics import metrics
+from backend.app.stocks.repository import HISTORY_COLUMNS
+from backend.app.stocks.utils import FIELDS
+
+
+def _normalize_history(hist: pd.DataFrame) -> pd.DataFrame:
+    """Keep the stored columns and index bars by exchange-local calendar day."""
+    hist = hist.reindex(columns=list(HISTORY_COLUMNS)).astype("float64")
+    index = pd.DatetimeIndex(hist.index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    hist.index = index.normalize().rename("Date")
+    return hist[~hist.index.duplicated(keep="last")].sort_index()
+
+
+def select_info_fields(info: Dict) -> Dict:
+    return {k: v for k in FIELDS if (v := info.get(k)) is not None}
+
+
+class MarketDataFetcher(ABC):
+    """Source of daily history and company info for the local market data store."""
+
+    @abstractmethod
+    def fetch_history(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        """
+        Daily bars from `start` (inclusive) to today, or the full default period when
+        `start` is None. Returns OHLCV/Dividends columns indexed by a naive daily Date.
+        """
+
+    @abstractmethod
+    def fetch_info(self, symbol: str) -> Dict:
+        """Company info restricted to the FIELDS subset."""
+
+
+class YFinanceFetcher(MarketDataFetcher):
+    """
+    Yahoo Finance provider. Every call goes through one HTTP session so concurrent
+    fetches share its connection pool: `session` if given, otherwise yfinance's shared one.
+    """
+
+    def __init__(self, period: str = "5y", session=None):
+        self.period = period
+        self.session = session
+
+    @metrics.timed("yfinance_fetch")
+    def fetch_history(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        ticker = yf.Ticker(symbol, session=self.session)
+        hist = ticker.history(period=self.period) if start is None else ticker.history(start=start)
+        return _normalize_history(hist)
+
+    @metrics.timed("yfinance_fetch")
+    def fetch_info(self, symbol: str) -> Dict:
+        return select_info_fields(yf.Ticker(symbol, session=self.session).info)
+
+
+class FixtureFetcher(MarketDataFetcher):
+    """
+    Offline provider reading recorded data from a directory:
+    `<SYMBOL>.csv` with a Date column plus OHLCV/Dividends, and an optional `<SYMBOL>.json` info dict.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def fetch_history(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        path = os.path.join(self.directory, f"{symbol}.csv")
+        if not os.path.exists(path):
+            raise LookupError(f"No recorded history for {symbol}")
+
+        hist = _normalize_history(pd.read_csv(path, index_col="Date", parse_dates=["Date"]))
+        if start is not None:
+            hist = hist[hist.index >= pd.Timestamp(start)]
+        return hist
+
+    def fetch_info(self, symbol: str) -> Dict:
+        path = os.path.join(self.directory, f"{symbol}.json")
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return select_info_fields(json.load(f))
+
+
+def get_fetcher(settings) -> MarketDataFetcher:
+    if settings.market_data_provider == "fixture":
+        if not settings.market_data_fixture_dir:
+            raise ValueError("HIRAM_MARKET_DATA_FIXTURE_DIR is required for the fixture provider")
+        return FixtureFetcher(settings.market_data_fixture_dir)
+    if settings.market_data_provider == "yfinance":
+        return YFinanceFetcher()
+    raise ValueError(f"Unknown market data provider: {settings.market_data_provider}")
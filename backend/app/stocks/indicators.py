@@ -0,0 +1,225 @@
+"""
+Technical indicators over stored daily closes.
+
+Every indicator is a vectorized kernel over whole arrays. Window indicators (moving
+average, realized volatility, beta) only need the `lookback` rows before the first row
+they compute; recursive ones (EMA, RSI, drawdown) carry their state from row to row
+instead. Either way an indicator can be extended to newly appended bars without
+recomputing the full history.
+"""
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Indicator keys are a name, optionally followed by "_<window>", e.g. "sma_50" or "drawdown"
+INDICATOR_KEY = re.compile(r"^([a-z]+)(?:_(\d+))?$")
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    """Sum over each trailing window, NaN until the first full window."""
+    out = np.full(values.shape, np.nan)
+    if values.size >= window:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        out[window - 1:] = cumulative[window:] - cumulative[:-window]
+    return out
+
+
+def _exponential_smoothing(values: np.ndarray, alpha: float, previous: Optional[float]) -> np.ndarray:
+    """y[t] = alpha x[t] + (1 - alpha) y[t-1], seeded with the first value when there is no `previous`."""
+    if values.size == 0:
+        return values
+    if previous is None or not np.isfinite(previous):
+        previous = values[0]
+    smoothed, _ = lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * previous])
+    return smoothed
+
+
+class Indicator(ABC):
+    """
+    One indicator series. `kernel` gets the inputs from `offset`, the absolute row of
+    their first element, and the carry of the row before it; it returns the values of
+    every row it got and the carry after each of them (None for window indicators).
+    """
+    # Inputs read by the kernel: "close", "change", "log_return", "benchmark_log_return"
+    inputs: Tuple[str, ...] = ("close",)
+    # Rows before the first computed one that the kernel needs
+    lookback: int = 0
+
+    @abstractmethod
+    def kernel(self, inputs: Dict[str, np.ndarray], offset: int, carry) -> Tuple[np.ndarray, Optional[tuple]]:
+        ...
+
+    def compute(self, inputs: Dict[str, np.ndarray], start: int = 0, carry=None):
+        """
+        Values of rows `start` onwards, and the carry after the second to last row, which
+        is where the next update starts: the last stored bar may still be revised.
+        """
+        lo = max(start - self.lookback, 0)
+        values, carries = self.kernel({name: inputs[name][lo:] for name in self.inputs}, lo, carry)
+        values = values[start - lo:]
+        if carries is not None:
+            carry = tuple(c[-2] for c in carries) if len(values) >= 2 else carry
+        return values, carry
+
+
+@dataclass(frozen=True)
+class SimpleMovingAverage(Indicator):
+    window: int = 20
+
+    @property
+    def lookback(self):
+        return self.window - 1
+
+    def kernel(self, inputs, offset, carry):
+        return _rolling_sum(inputs["close"], self.window) / self.window, None
+
+
+@dataclass(frozen=True)
+class ExponentialMovingAverage(Indicator):
+    window: int = 20
+
+    def kernel(self, inputs, offset, carry):
+        values = _exponential_smoothing(inputs["close"], 2.0 / (self.window + 1.0), carry[0] if carry else None)
+        return values, (values,)
+
+
+@dataclass(frozen=True)
+class RelativeStrengthIndex(Indicator):
+    """Wilder's RSI: exponential averages of gains and losses with alpha = 1 / window."""
+    window: int = 14
+    inputs = ("change",)
+
+    def kernel(self, inputs, offset, carry):
+        change = np.nan_to_num(inputs["change"], nan=0.0)
+        alpha = 1.0 / self.window
+        gains = _exponential_smoothing(np.maximum(change, 0.0), alpha, carry[0] if carry else 0.0)
+        losses = _exponential_smoothing(np.maximum(-change, 0.0), alpha, carry[1] if carry else 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(losses > 0, 100.0 - 100.0 / (1.0 + gains / losses), np.where(gains > 0, 100.0, 50.0))
+        # The first `window` changes only warm the averages up
+        values[:max(self.window - offset, 0)] = np.nan
+        return values, (gains, losses)
+
+
+@dataclass(frozen=True)
+class RealizedVolatility(Indicator):
+    """Annualized sample standard deviation of daily log returns over the window."""
+    window: int = 21
+    inputs = ("log_return",)
+
+    @property
+    def lookback(self):
+        return self.window - 1
+
+    def kernel(self, inputs, offset, carry):
+        returns = inputs["log_return"]
+        valid = np.isfinite(returns)
+        x = np.where(valid, returns, 0.0)
+        count = _rolling_sum(valid.astype(np.float64), self.window)
+        total = _rolling_sum(x, self.window)
+        squares = _rolling_sum(x * x, self.window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            variance = (squares - total * total / count) / (count - 1.0)
+        values = np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS_PER_YEAR)
+        # Windows with a missing return (only the first rows, closes are carried forward) are left out
+        values[~(count >= self.window)] = np.nan
+        return values, None
+
+
+@dataclass(frozen=True)
+class Drawdown(Indicator):
+    """Relative distance of the close below its running maximum (0 at a new high)."""
+
+    def kernel(self, inputs, offset, carry):
+        close = inputs["close"]
+        peak = np.fmax.accumulate(np.concatenate(([carry[0] if carry else np.nan], close)))[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return close / peak - 1.0, (peak,)
+
+
+@dataclass(frozen=True)
+class Beta(Indicator):
+    """Rolling OLS beta of the symbol's daily log returns on the benchmark's."""
+    window: int = 252
+    inputs = ("log_return", "benchmark_log_return")
+
+    @property
+    def lookback(self):
+        return self.window - 1
+
+    def kernel(self, inputs, offset, carry):
+        y, x = inputs["log_return"], inputs["benchmark_log_return"]
+        valid = np.isfinite(x) & np.isfinite(y)
+        x, y = np.where(valid, x, 0.0), np.where(valid, y, 0.0)
+        count = _rolling_sum(valid.astype(np.float64), self.window)
+        sum_x, sum_y = _rolling_sum(x, self.window), _rolling_sum(y, self.window)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covariance = _rolling_sum(x * y, self.window) - sum_x * sum_y / count
+            variance = _rolling_sum(x * x, self.window) - sum_x * sum_x / count
+            values = covariance / variance
+        values[~(count >= self.window) | ~(variance > 0)] = np.nan
+        return values, None
+
+
+INDICATORS = {
+    "sma": SimpleMovingAverage,
+    "ema": ExponentialMovingAverage,
+    "rsi": RelativeStrengthIndex,
+    "vol": RealizedVolatility,
+    "drawdown": Drawdown,
+    "beta": Beta,
+}
+
+# Indicators whose window is fixed by their definition
+WINDOWLESS = {"drawdown"}
+
+# Longest window an indicator key may ask for
+MAX_WINDOW = 2_520
+
+
+def parse_indicator(key: str) -> Indicator:
+    """Indicator for a key such as "sma_50", "rsi_14" or "drawdown"; the default window applies when omitted."""
+    match = INDICATOR_KEY.match(key.strip().lower())
+    if not match or match.group(1) not in INDICATORS:
+        raise ValueError(f"Unknown indicator: {key}. Available: {', '.join(INDICATORS)}")
+    name, window = match.group(1), match.group(2)
+    if window is None:
+        return INDICATORS[name]()
+    if name in WINDOWLESS:
+        raise ValueError(f"Indicator {name} takes no window")
+    window = int(window)
+    if not 2 <= window <= MAX_WINDOW:
+        raise ValueError(f"Indicator window must be between 2 and {MAX_WINDOW}")
+    return INDICATORS[name](window=window)
+
+
+def indicator_inputs(close: np.ndarray, benchmark_close: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Kernel inputs of a close series: closes carried forward over gaps, their daily
+    changes and log returns, and the benchmark's log returns on the same dates.
+    """
+    def carry_forward(values):
+        values = np.asarray(values, dtype=np.float64)
+        valid = np.isfinite(values)
+        return values[np.maximum.accumulate(np.where(valid, np.arange(values.size), 0))] if values.size else values
+
+    def log_returns(values):
+        out = np.full(values.shape, np.nan)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[1:] = np.log(values[1:] / values[:-1])
+        out[~np.isfinite(out)] = np.nan
+        return out
+
+    close = carry_forward(close)
+    change = np.full(close.shape, np.nan)
+    change[1:] = np.diff(close)
+    inputs = {"close": close, "change": change, "log_return": log_returns(close)}
+    if benchmark_close is not None:
+        inputs["benchmark_log_return"] = log_returns(carry_forward(benchmark_close))
+    return inputs
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Date, JSON, Index
 from sqlalchemy.sql import func
 from backend.app.database import Base
 
@@ -15,3 +15,87 @@ class ReferenceStock(Base):
 
     def __repr__(self):
         return f"<Stock {self.symbol}: {self.security_name} {self.gics_sector} {self.gics_sub_sector}>"
+
+
+class PriceBar(Base):
+    """One daily OHLCV bar of the local market data store."""
+    __tablename__ = "price_history"
+
+    symbol = Column(String, primary_key=True)
+    date = Column(Date, primary_key=True)
+    open = Column(Float)
+    high = Column(Float)
+    low = Column(Float)
+    close = Column(Float)
+    volume = Column(Float)
+    dividends = Column(Float)
+
+    def __repr__(self):
+        return f"<PriceBar {self.symbol} {self.date}: {self.close}>"
+
+
+class SymbolMetadata(Base):
+    """Per-symbol info snapshot and refresh timestamps of the local market data store."""
+    __tablename__ = "symbol_metadata"
+
+    symbol = Column(String, primary_key=True)
+    info = Column(JSON)
+    info_updated_at = Column(DateTime)
+    history_updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<SymbolMetadata {self.symbol}: history {self.history_updated_at}, info {self.info_updated_at}>"
+
+
+class ScreenerSnapshot(Base):
+    """
+    One row per reference symbol with its classification, performance windows and info
+    metrics, rebuilt in bulk from the local market data store for the screener.
+    """
+    __tablename__ = "screener_snapshot"
+    __table_args__ = (
+        Index("idx_screener_sector", "gics_sector", "gics_sub_sector"),
+        Index("idx_screener_sub_sector", "gics_sub_sector"),
+        Index("idx_screener_index_sector", "market_index", "gics_sector"),
+    )
+
+    symbol = Column(String, primary_key=True)
+    security_name = Column(String)
+    gics_sector = Column(String)
+    gics_sub_sector = Column(String)
+    market_index = Column(String)
+    currency = Column(String)
+
+    price = Column(Float)
+    last_bar_date = Column(Date)
+    # Percent performance windows, as in the stock data payload
+    five_years = Column(Float)
+    three_years = Column(Float)
+    one_year = Column(Float)
+    six_months = Column(Float)
+    one_month = Column(Float)
+    ytd = Column(Float)
+
+    beta = Column(Float)
+    eps_current_year = Column(Float)
+    gross_margins = Column(Float)
+    operating_margins = Column(Float)
+    profit_margins = Column(Float)
+    return_on_equity = Column(Float)
+    return_on_assets = Column(Float)
+    enterprise_value = Column(Float)
+    enterprise_to_revenue = Column(Float)
+    enterprise_to_ebitda = Column(Float)
+    ebitda = Column(Float)
+    free_cashflow = Column(Float)
+    total_cash = Column(Float)
+    total_debt = Column(Float)
+    quick_ratio = Column(Float)
+    five_year_avg_dividend_yield = Column(Float)
+    average_daily_volume_10_day = Column(Float)
+    full_time_employees = Column(Float)
+
+    updated_at = Column(DateTime)
+
+    def __repr__(self):
+        return f"<ScreenerSnapshot {self.symbol}: {self.gics_sector} {self.one_year}>"
@@ -0,0 +1,137 @@
+import asyncio
+import difflib
+import hashlib
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+from backend.app.database import SessionLocal, get_async_session_factory
+from backend.app.serialization import dumps
+from backend.app.stocks.model import ReferenceStock
+from backend.app.stocks.repository import AsyncStockRepository, StockRepository
+
+# Sorts after any character a symbol or name can contain, closing a prefix range
+_PREFIX_END = "\uffff"
+
+
+def _prefix_range(keys, prefix):
+    return bisect_left(keys, (prefix,)), bisect_left(keys, (prefix + _PREFIX_END,))
+
+
+class ReferenceSymbolIndex:
+    """
+    Immutable snapshot of the reference universe: the serialized symbol list with
+    its ETag, plus sorted (key, position) lists for prefix search on symbols and on
+    every word of the security names.
+    """
+
+    def __init__(self, records: List[Dict[str, str]]):
+        self.records = records
+        self.body = dumps(records)
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+
+        self._symbols = sorted(((r["symbol"] or "").upper(), i) for i, r in enumerate(records))
+        self._words = sorted(
+            (word, i)
+            for i, r in enumerate(records)
+            for word in set((r["security_name"] or "").upper().split())
+        )
+        self._fuzzy_keys = {}
+        for i, r in enumerate(records):
+            for key in ((r["symbol"] or "").upper(), (r["security_name"] or "").upper()):
+                self._fuzzy_keys.setdefault(key, i)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, str]]:
+        """
+        Ranked matches: exact symbol, symbol prefix, name word prefix (every query
+        word must prefix a word of the name), then fuzzy matches on symbol or name.
+        """
+        terms = query.strip().upper().split()
+        if not terms or limit <= 0:
+            return []
+        query = " ".join(terms)
+        matches = {}
+
+        lo, hi = _prefix_range(self._symbols, query)
+        for symbol, i in sorted(self._symbols[lo:hi], key=lambda item: (item[0] != query, len(item[0]), item[0])):
+            matches.setdefault(i, None)
+
+        if len(matches) < limit:
+            lo, hi = _prefix_range(self._words, terms[0])
+            for _, i in self._words[lo:hi]:
+                name_words = (self.records[i]["security_name"] or "").upper().split()
+                if all(any(word.startswith(term) for word in name_words) for term in terms[1:]):
+                    matches.setdefault(i, None)
+
+        if len(matches) < limit:
+            for key in difflib.get_close_matches(query, self._fuzzy_keys, n=limit, cutoff=0.7):
+                matches.setdefault(self._fuzzy_keys[key], None)
+
+        return [self.records[i] for i in list(matches)[:limit]]
+
+
+class ReferenceSymbolCache:
+    """
+    In-process snapshot of `reference_stocks`, rebuilt on first use after ORM writes to
+    ReferenceStock (via mapper events) or once `ttl` seconds have passed, which also
+    covers writes made outside this process.
+    """
+
+    def __init__(self, session_factory=SessionLocal, ttl: Optional[float] = 300.0, async_session_factory=None):
+        self.session_factory = session_factory
+        self.async_session_factory = async_session_factory
+        self.ttl = ttl
+        self._index = None
+        self._built_at = 0.0
+        self._version = 0
+        self._built_version = -1
+        self._lock = threading.Lock()
+        self._async_lock = asyncio.Lock()
+
+        for event_name in ("after_insert", "after_update", "after_delete"):
+            event.listen(ReferenceStock, event_name, self._on_change)
+
+    def _on_change(self, mapper, connection, target):
+        self.invalidate()
+
+    def invalidate(self):
+        self._version += 1
+
+    def _is_stale(self):
+        if self._index is None or self._built_version != self._version:
+            return True
+        return self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+
+    def get(self) -> ReferenceSymbolIndex:
+        if not self._is_stale():
+            return self._index
+
+        with self._lock:
+            if self._is_stale():
+                version = self._version
+                with self.session_factory() as db:
+                    records = StockRepository(db).get_all_stocks_symbols_and_names()
+                self._index = ReferenceSymbolIndex(records)
+                self._built_at = time.monotonic()
+                self._built_version = version
+        return self._index
+
+    async def get_async(self) -> ReferenceSymbolIndex:
+        """`get` for async routes: a hit never leaves the event loop, a rebuild reads through the async engine."""
+        if not self._is_stale():
+            return self._index
+
+        async with self._async_lock:
+            if self._is_stale():
+                version = self._version
+                async with (self.async_session_factory or get_async_session_factory())() as db:
+                    records = await AsyncStockRepository(db).get_all_stocks_symbols_and_names()
+                index = ReferenceSymbolIndex(records)
+                with self._lock:
+                    self._index = index
+                    self._built_at = time.monotonic()
+                    self._built_version = version
+        return self._index
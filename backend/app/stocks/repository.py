@@ -1,7 +1,98 @@
+from datetime import date, datetime
+from sqlalchemy import String, select, delete, func, insert, type_coerce
 from sqlalchemy.orm import Session, InstrumentedAttribute
 from sqlalchemy.exc import SQLAlchemyError
-from typing import List, Optional, Dict
-from backend.app.stocks.model import ReferenceStock
+from typing import TYPE_CHECKING, List, Optional, Dict
+import numpy as np
+import pandas as pd
+from backend.app.stocks.model import ReferenceStock, PriceBar, ScreenerSnapshot, SymbolMetadata
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+# Column names used by the stocks service, mapped to price_history columns
+HISTORY_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+}
+
+
+def _reference_symbols_query():
+    return select(ReferenceStock.symbol, ReferenceStock.security_name).order_by(ReferenceStock.id)
+
+
+def _history_query(symbol: str, start: Optional[date] = None):
+    query = select(PriceBar.date, *(getattr(PriceBar, col) for col in HISTORY_COLUMNS.values())) \
+        .where(PriceBar.symbol == symbol) \
+        .order_by(PriceBar.date)
+    if start is not None:
+        query = query.where(PriceBar.date >= start)
+    return query
+
+
+def _history_frame(rows) -> pd.DataFrame:
+    hist = pd.DataFrame(rows, columns=["Date", *HISTORY_COLUMNS]).astype({col: "float64" for col in HISTORY_COLUMNS})
+    hist["Date"] = pd.to_datetime(hist["Date"])
+    return hist.set_index("Date")
+
+
+def _last_closes_query(symbols: List[str], end: Optional[date] = None):
+    last = select(PriceBar.symbol, func.max(PriceBar.date).label("date")) \
+        .where(PriceBar.symbol.in_(symbols))
+    if end is not None:
+        last = last.where(PriceBar.date <= end)
+    last = last.group_by(PriceBar.symbol).subquery()
+    return select(PriceBar.symbol, PriceBar.close) \
+        .join(last, (PriceBar.symbol == last.c.symbol) & (PriceBar.date == last.c.date)) \
+        .where(PriceBar.close.is_not(None))
+
+
+def _closes_query(symbols: List[str], start: Optional[date] = None):
+    # Table columns and dates left as stored: a Core query skips the per-row ORM and
+    # date conversions, which dominate when loading the whole universe.
+    # No ORDER BY: the pivot sorts the dates
+    columns = PriceBar.__table__.c
+    query = select(type_coerce(columns.date, String), columns.symbol, columns.close).where(columns.symbol.in_(symbols))
+    if start is not None:
+        query = query.where(columns.date >= start)
+    return query
+
+
+def _closes_frame(rows, symbols: List[str]) -> pd.DataFrame:
+    """Pivot (date, symbol, close) rows into a float64 (Date, symbol) frame, columns in `symbols` order."""
+    rows = pd.DataFrame(rows, columns=["Date", "symbol", "close"])
+    dates = pd.Categorical(pd.to_datetime(rows["Date"]))
+    columns = pd.Categorical(rows["symbol"], categories=list(dict.fromkeys(symbols)))
+
+    values = np.full((len(dates.categories), len(columns.categories)), np.nan)
+    values[dates.codes, columns.codes] = rows["close"].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = np.bincount(columns.codes, minlength=len(columns.categories)) > 0
+    closes = pd.DataFrame(values[:, present], index=pd.DatetimeIndex(dates.categories, name="Date"),
+                          columns=columns.categories[present])
+    closes.columns.name = "symbol"
+    return closes
+
+
+def _refresh_status_query(symbols: Optional[List[str]] = None):
+    last_bars = select(PriceBar.symbol, func.max(PriceBar.date).label("last_bar_date")) \
+        .group_by(PriceBar.symbol) \
+        .subquery()
+    query = select(
+        SymbolMetadata.symbol,
+        SymbolMetadata.history_updated_at,
+        SymbolMetadata.info_updated_at,
+        last_bars.c.last_bar_date,
+    ) \
+        .outerjoin(last_bars, last_bars.c.symbol == SymbolMetadata.symbol) \
+        .order_by(SymbolMetadata.symbol)
+    if symbols is not None:
+        query = query.where(SymbolMetadata.symbol.in_(symbols))
+    return query
+
 
 class StockRepository:
     def __init__(self, db: Session):
@@ -12,4 +103,179 @@ class StockRepository:
         """
          Retrieve all stocks symbols and security names
          """
-        return [{"symbol": stock.symbol, "security_name": stock.security_name} for stock in self.db.query(ReferenceStock).all()]
+        rows = self.db.execute(_reference_symbols_query())
+        return [{"symbol": symbol, "security_name": security_name} for symbol, security_name in rows]
+
+
+class ScreenerRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_universe(self) -> List[Dict]:
+        """Every reference symbol with its classification."""
+        query = select(
+            ReferenceStock.symbol,
+            ReferenceStock.security_name,
+            ReferenceStock.gics_sector,
+            ReferenceStock.gics_sub_sector,
+            ReferenceStock.market_index,
+        ).order_by(ReferenceStock.id)
+        return [dict(row._mapping) for row in self.db.execute(query)]
+
+    def get_infos(self, symbols: List[str]) -> Dict[str, Dict]:
+        query = select(SymbolMetadata.symbol, SymbolMetadata.info).where(SymbolMetadata.symbol.in_(symbols))
+        return {symbol: info or {} for symbol, info in self.db.execute(query)}
+
+    def replace_snapshot(self, rows: List[Dict]):
+        self.db.execute(delete(ScreenerSnapshot))
+        if rows:
+            self.db.execute(insert(ScreenerSnapshot), rows)
+
+    def get_snapshot_updated_at(self) -> Optional[datetime]:
+        return self.db.execute(select(func.max(ScreenerSnapshot.updated_at))).scalar()
+
+    def screen(
+            self,
+            sectors: List[str],
+            sub_sectors: List[str],
+            indices: List[str],
+            ranges: Dict[str, tuple],
+            sort: str,
+            descending: bool,
+            limit: int,
+            offset: int
+    ):
+        """
+        Total number of matching snapshot rows and one sorted page of them. Rows with no
+        value for the sort column come last either way; the symbol breaks ties.
+        """
+        conditions = []
+        if sectors:
+            conditions.append(ScreenerSnapshot.gics_sector.in_(sectors))
+        if sub_sectors:
+            conditions.append(ScreenerSnapshot.gics_sub_sector.in_(sub_sectors))
+        if indices:
+            conditions.append(ScreenerSnapshot.market_index.in_(indices))
+        for name, (low, high) in ranges.items():
+            column = getattr(ScreenerSnapshot, name)
+            if low is not None:
+                conditions.append(column >= low)
+            if high is not None:
+                conditions.append(column <= high)
+
+        total = self.db.execute(select(func.count()).select_from(ScreenerSnapshot).where(*conditions)).scalar()
+        sort_column = getattr(ScreenerSnapshot, sort)
+        query = select(*ScreenerSnapshot.__table__.columns) \
+            .where(*conditions) \
+            .order_by((sort_column.desc() if descending else sort_column.asc()).nulls_last(), ScreenerSnapshot.symbol) \
+            .limit(limit) \
+            .offset(offset)
+        return total, [dict(row._mapping) for row in self.db.execute(query)]
+
+
+class MarketDataRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_history(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        """
+        Stored daily bars for a symbol as a float64 DataFrame indexed by Date,
+        with the same columns as a yfinance history.
+        """
+        return _history_frame(self.db.execute(_history_query(symbol, start)).all())
+
+    def get_last_bar_date(self, symbol: str) -> Optional[date]:
+        return self.db.execute(select(func.max(PriceBar.date)).where(PriceBar.symbol == symbol)).scalar()
+
+    def get_last_closes(self, symbols: List[str], end: Optional[date] = None) -> Dict[str, float]:
+        """
+        Close of the most recent stored bar of each symbol, on or before `end` if given,
+        in one query; symbols without bars are left out.
+        """
+        return {symbol: close for symbol, close in self.db.execute(_last_closes_query(symbols, end))}
+
+    def get_closes(self, symbols: List[str], start: Optional[date] = None) -> pd.DataFrame:
+        """Stored closes of many symbols in one query, as a float64 (Date, symbol) frame."""
+        return _closes_frame(self.db.connection().execute(_closes_query(symbols, start)).all(), symbols)
+
+    def get_metadata_many(self, symbols: List[str]) -> Dict[str, SymbolMetadata]:
+        rows = self.db.execute(select(SymbolMetadata).where(SymbolMetadata.symbol.in_(symbols))).scalars()
+        return {metadata.symbol: metadata for metadata in rows}
+
+    def get_refresh_status(self, symbols: Optional[List[str]] = None) -> List[Dict]:
+        """Refresh timestamps and last stored bar date per symbol, from one query."""
+        return [dict(row._mapping) for row in self.db.execute(_refresh_status_query(symbols))]
+
+    def replace_history_from(self, symbol: str, hist: pd.DataFrame):
+        """
+        Store bars, replacing any stored bar on or after the first new date so a
+        partial last session is overwritten by its final values.
+        """
+        if hist.empty:
+            return
+        dates = hist.index.date
+        self.db.execute(delete(PriceBar).where(PriceBar.symbol == symbol, PriceBar.date >= dates.min()))
+
+        values = hist[list(HISTORY_COLUMNS)].rename(columns=HISTORY_COLUMNS)
+        values = values.astype(object).where(values.notna(), None)
+        records = values.to_dict("records")
+        for record, bar_date in zip(records, dates):
+            record["symbol"] = symbol
+            record["date"] = bar_date
+        self.db.execute(insert(PriceBar), records)
+
+    def get_metadata(self, symbol: str) -> Optional[SymbolMetadata]:
+        return self.db.get(SymbolMetadata, symbol)
+
+    def get_or_create_metadata(self, symbol: str) -> SymbolMetadata:
+        metadata = self.get_metadata(symbol)
+        if metadata is None:
+            metadata = SymbolMetadata(symbol=symbol)
+            self.db.add(metadata)
+            # Sessions do not autoflush: flush so the next lookup finds it instead of adding a duplicate
+            self.db.flush()
+        return metadata
+
+    def save_info(self, symbol: str, info: Dict, updated_at: datetime):
+        metadata = self.get_or_create_metadata(symbol)
+        metadata.info = info
+        metadata.info_updated_at = updated_at
+
+    def mark_history_updated(self, symbol: str, updated_at: datetime):
+        self.get_or_create_metadata(symbol).history_updated_at = updated_at
+
+
+class AsyncStockRepository:
+    """Read side of `StockRepository` over an async session."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_all_stocks_symbols_and_names(self):
+        rows = await self.db.execute(_reference_symbols_query())
+        return [{"symbol": symbol, "security_name": security_name} for symbol, security_name in rows]
+
+
+class AsyncMarketDataRepository:
+    """Read side of `MarketDataRepository` over an async session; writes stay on the sync store."""
+
+    def __init__(self, db: "AsyncSession"):
+        self.db = db
+
+    async def get_history(self, symbol: str, start: Optional[date] = None) -> pd.DataFrame:
+        return _history_frame((await self.db.execute(_history_query(symbol, start))).all())
+
+    async def get_last_bar_date(self, symbol: str) -> Optional[date]:
+        return (await self.db.execute(select(func.max(PriceBar.date)).where(PriceBar.symbol == symbol))).scalar()
+
+    async def get_last_closes(self, symbols: List[str], end: Optional[date] = None) -> Dict[str, float]:
+        return {symbol: close for symbol, close in await self.db.execute(_last_closes_query(symbols, end))}
+
+    async def get_closes(self, symbols: List[str], start: Optional[date] = None) -> pd.DataFrame:
+        return _closes_frame((await self.db.execute(_closes_query(symbols, start))).all(), symbols)
+
+    async def get_metadata(self, symbol: str) -> Optional[SymbolMetadata]:
+        return await self.db.get(SymbolMetadata, symbol)
+
+    async def get_refresh_status(self, symbols: Optional[List[str]] = None) -> List[Dict]:
+        return [dict(row._mapping) for row in await self.db.execute(_refresh_status_query(symbols))]
@@ -1,29 +1,286 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
-from typing import List, Dict
-from backend.app.database import get_db
-from backend.app.stocks.service import StocksService
+import asyncio
+from datetime import date
+from fastapi import APIRouter, HTTPException, Header, Query, Response
+from typing import List, Dict, Optional
+from backend.app.cache import TTLCache
+from backend.app.config import get_settings
+from backend.app.metrics import metrics
+from backend.app.profiling import ProfilingRoute
+from backend.app.serialization import HistoryOrient, NumpyJSONResponse
+from backend.app.stocks.covariance import CovarianceMethod
+from backend.app.stocks.downsampling import DownsampleMethod, HistoryInterval, HistoryView
+from backend.app.stocks.fanout import ConcurrentLoader
+from backend.app.stocks.fetcher import get_fetcher
+from backend.app.stocks.reference import ReferenceSymbolCache
+from backend.app.stocks.scheduler import build_scheduler
+from backend.app.stocks.schema import ScreenerRequest
+from backend.app.stocks.screener import ScreenerService
+from backend.app.stocks.service import CovarianceService, IndicatorService, StocksService
+from backend.app.stocks.store import MarketDataStore
 
 router = APIRouter(
     prefix="/api/v1/stocks",
-    tags=["stocks"]
+    tags=["stocks"],
+    route_class=ProfilingRoute
 )
 
+# Upper bound of the `points` history parameter
+MAX_HISTORY_POINTS = 10_000
+
+settings = get_settings()
+market_data_store = MarketDataStore(
+    fetcher=get_fetcher(settings),
+    history_ttl=settings.market_data_history_ttl,
+    info_ttl=settings.market_data_info_ttl,
+    history_years=settings.market_data_history_years,
+    refresh_on_read=settings.market_data_refresh_on_read
+)
+
+screener_service = ScreenerService(history_years=settings.market_data_history_years)
+
+refresh_scheduler = build_scheduler(settings, market_data_store, after_run=screener_service.refresh)
+
+reference_symbol_cache = ReferenceSymbolCache(ttl=settings.reference_cache_ttl)
+
+indicator_service = IndicatorService(
+    market_data_store,
+    cache=TTLCache(maxsize=settings.indicators_cache_size),
+    benchmark=settings.indicators_benchmark
+)
+
+covariance_service = CovarianceService(
+    market_data_store,
+    cache=TTLCache(maxsize=settings.covariance_cache_size),
+    max_symbols=settings.covariance_max_symbols
+)
+
+metrics.register_cache("indicators", indicator_service.cache.stats)
+metrics.register_cache("covariance", covariance_service.cache.stats)
+
+
+def _load_stock_data(symbol):
+    return StocksService(store=market_data_store).load_stock_data(symbol)
+
+
+def _shape_stock_data(loaded, orient, include_history, view, errors):
+    """Per-request views of symbols loaded by `stock_data_loader`; failures are added to `errors`."""
+    data = {}
+    for symbol, stock in loaded.items():
+        try:
+            data[symbol] = StocksService.shape_stock_data(stock, orient, include_history, view)
+        except Exception as e:
+            errors[symbol] = str(e)
+    return data
+
+
+stock_data_loader = ConcurrentLoader(
+    _load_stock_data,
+    max_concurrency=settings.stocks_fetch_concurrency,
+    timeout=settings.stocks_fetch_timeout
+)
+
+
+def _history_view(
+        start: Optional[date],
+        end: Optional[date],
+        interval: HistoryInterval,
+        points: Optional[int],
+        method: DownsampleMethod
+) -> Optional[HistoryView]:
+    if start is None and end is None and interval == HistoryInterval.DAILY and points is None:
+        return None
+    try:
+        return HistoryView(start=start, end=end, interval=interval, points=points, method=method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
 
 @router.get("/reference/data/symbols", response_model=List[Dict[str, str]])
-def get_stocks_data(db: Session = Depends(get_db)):
+async def get_stocks_data(if_none_match: Optional[str] = Header(default=None)):
     try:
-        stocks_service = StocksService(db)
-        result = stocks_service.get_all_stocks_symbols_and_names()
-        return result
+        index = await reference_symbol_cache.get_async()
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.get("/{symbol}/data")
-def get_stocks_data(symbol: str):
+    headers = {"ETag": index.etag, "Cache-Control": "no-cache"}
+    if _etag_matches(if_none_match, index.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=index.body, media_type="application/json", headers=headers)
+
+
+@router.get("/reference/data/symbols/search", response_model=List[Dict[str, str]])
+async def search_reference_symbols(q: str, limit: int = Query(default=20, gt=0, le=200)):
+    """Prefix and fuzzy search over symbols and security names."""
+    try:
+        return (await reference_symbol_cache.get_async()).search(q, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/refresh/status", response_class=NumpyJSONResponse)
+def get_refresh_progress():
+    """Progress of the running universe refresh, or summary of the last one."""
+    return NumpyJSONResponse(content=refresh_scheduler.progress.to_dict())
+
+
+@router.get("/refresh/staleness", response_class=NumpyJSONResponse)
+async def get_refresh_staleness(symbols: Optional[str] = None):
+    """Last refresh times, last stored bar and staleness per stored symbol (comma-separated filter)."""
+    requested = None
+    if symbols:
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    try:
+        return NumpyJSONResponse(content=await market_data_store.get_refresh_status_async(requested))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/refresh", status_code=202, response_class=NumpyJSONResponse)
+async def trigger_refresh(symbols: Optional[str] = None):
+    """Start a refresh of the given symbols, or of the whole reference universe, in the background."""
+    requested = None
+    if symbols:
+        requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not refresh_scheduler.trigger(requested):
+        raise HTTPException(status_code=409, detail="A refresh is already running")
+    return NumpyJSONResponse(status_code=202, content={"started": True, "status": f"{router.prefix}/refresh/status"})
+
+
+@router.post("/screener", response_class=NumpyJSONResponse)
+def screen_stocks(screener_request: ScreenerRequest):
+    """
+    Filter the reference universe on sector / sub-sector / index and numeric ranges
+    (performance windows, price, info metrics), sorted and paginated, from the snapshot.
+    """
+    try:
+        return NumpyJSONResponse(content=screener_service.screen(screener_request))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/screener/refresh", response_class=NumpyJSONResponse)
+def refresh_screener():
+    """Rebuild the screener snapshot from the stored history and info now."""
+    try:
+        return NumpyJSONResponse(content=screener_service.refresh())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/covariance", response_class=NumpyJSONResponse)
+def get_covariance(
+        symbols: str,
+        method: CovarianceMethod = CovarianceMethod.SAMPLE,
+        window: int = Query(default=252, ge=2),
+        decay: Optional[float] = Query(default=None, gt=0, lt=1),
+        annualized: bool = True
+):
+    """
+    Covariance and correlation matrices of a comma-separated list of symbols, over the
+    last `window` daily log returns on the dates all of them traded. `method=ewma` weights
+    returns by `decay` (0.94 by default), `method=ledoit_wolf` shrinks the sample
+    covariance and reports the shrinkage intensity.
+    """
+    try:
+        return NumpyJSONResponse(content=covariance_service.compute(
+            symbols.split(","), method=method, window=window, decay=decay, annualized=annualized
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/data", response_class=NumpyJSONResponse)
+async def get_many_stocks_data(
+        symbols: str,
+        orient: HistoryOrient = HistoryOrient.COLUMNS,
+        history: bool = True,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        interval: HistoryInterval = HistoryInterval.DAILY,
+        points: Optional[int] = Query(default=None, ge=3, le=MAX_HISTORY_POINTS),
+        method: DownsampleMethod = DownsampleMethod.LTTB
+):
+    """
+    Stock data for a comma-separated list of symbols, loaded concurrently.
+    Symbols that fail or time out are reported under `errors` without failing the others.
+    History parameters are the same as for a single symbol.
+    """
+    view = _history_view(start, end, interval, points, method)
+    requested = list(dict.fromkeys(s.strip().upper() for s in symbols.split(",") if s.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="No symbols requested")
+    if len(requested) > settings.stocks_batch_max_symbols:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.stocks_batch_max_symbols} symbols per request"
+        )
+
+    # Single-flight per symbol: concurrent requests share the store reads whatever their view
+    loaded, errors = await stock_data_loader.load_many(requested)
+    data = await asyncio.to_thread(_shape_stock_data, loaded, orient, history, view, errors)
+    return NumpyJSONResponse(content={"data": data, "errors": errors})
+
+
+@router.get("/{symbol}/indicators", response_class=NumpyJSONResponse)
+def get_stock_indicators(
+        symbol: str,
+        indicators: str = "sma_20,sma_50,ema_20,rsi_14,vol_21,drawdown",
+        benchmark: Optional[str] = None,
+        start: Optional[date] = None,
+        end: Optional[date] = None
+):
+    """
+    Indicator columns over the stored daily history, for a comma-separated list of keys:
+    sma_<n>, ema_<n>, rsi_<n>, vol_<n> (annualized realized volatility), drawdown and
+    beta_<n> against `benchmark` (the configured index by default).
+    """
+    if start is not None and end is not None and start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    try:
+        return NumpyJSONResponse(content=indicator_service.compute(
+            symbol.strip().upper(), indicators.split(","), benchmark=benchmark, start=start, end=end
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{symbol}/data", response_class=NumpyJSONResponse)
+def get_stocks_data(
+        symbol: str,
+        orient: HistoryOrient = HistoryOrient.COLUMNS,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        interval: HistoryInterval = HistoryInterval.DAILY,
+        points: Optional[int] = Query(default=None, ge=3, le=MAX_HISTORY_POINTS),
+        method: DownsampleMethod = DownsampleMethod.LTTB
+):
+    """
+    History is columnar (one array per field) by default; `orient=records` returns one object per bar.
+
+    `start` / `end` restrict it to a date range, `interval=weekly|monthly` merges the daily
+    bars into calendar periods, and `points` caps the number of rows: `method=lttb` keeps the
+    bars that best preserve the close line, `method=ohlc` merges bars into candles.
+    """
+    view = _history_view(start, end, interval, points, method)
     try:
-        stocks_service = StocksService()
-        result = stocks_service.get_stock_data_by_symbol(symbol)
+        stocks_service = StocksService(store=market_data_store)
+        result = stocks_service.get_stock_data_by_symbol(symbol.strip().upper(), orient=orient, view=view)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,233 @@
+"""
+End-of-day refresh of the whole reference universe into the local market data store.
+
+Runs inside the API process (started from the app lifespan when
+HIRAM_REFRESH_SCHEDULER_ENABLED is set) or as a separate worker:
+
+    python -m backend.app.stocks.scheduler [--once]
+"""
+import argparse
+import asyncio
+import logging
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from backend.app.config import get_settings
+from backend.app.database import SessionLocal
+from backend.app.stocks.fanout import ConcurrentLoader
+from backend.app.stocks.fetcher import get_fetcher
+from backend.app.stocks.repository import StockRepository
+from backend.app.stocks.screener import ScreenerService
+from backend.app.stocks.store import MarketDataStore, utcnow
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RefreshProgress:
+    """State of the current, or last finished, refresh run."""
+    running: bool = False
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total: int = 0
+    refreshed: int = 0
+    retries: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    next_run_at: Optional[datetime] = None
+
+    def to_dict(self):
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "total": self.total,
+            "refreshed": self.refreshed,
+            "failed": len(self.failed),
+            "pending": self.total - self.refreshed - len(self.failed),
+            "retries": self.retries,
+            "errors": self.failed,
+            "next_run_at": self.next_run_at,
+        }
+
+
+def next_run_time(now: datetime, run_at: time, tz: ZoneInfo) -> datetime:
+    """Next weekday at `run_at` local time strictly after `now` (aware), returned as naive UTC."""
+    local = now.astimezone(tz)
+    candidate = datetime.combine(local.date(), run_at, tzinfo=tz)
+    while candidate <= local or candidate.weekday() >= 5:
+        candidate = datetime.combine(candidate.date() + timedelta(days=1), run_at, tzinfo=tz)
+    return candidate.astimezone(ZoneInfo("UTC")).replace(tzinfo=None)
+
+
+class RefreshScheduler:
+    """
+    Refreshes history and info of every symbol returned by `list_symbols`, `batch_size`
+    symbols at a time through a ConcurrentLoader (bounded concurrency, per-symbol
+    timeout). Symbols that fail are retried up to `max_retries` times with exponential
+    backoff and jitter, then reported in the progress.
+    """
+
+    def __init__(
+            self,
+            store: MarketDataStore,
+            list_symbols: Callable[[], List[str]],
+            batch_size: int = 50,
+            max_concurrency: int = 4,
+            timeout: float = 60.0,
+            max_retries: int = 3,
+            backoff: float = 2.0,
+            run_at: time = time(16, 30),
+            timezone: str = "America/New_York",
+            after_run: Optional[Callable[[], Any]] = None
+    ):
+        self.store = store
+        self.list_symbols = list_symbols
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.run_at = run_at
+        self.timezone = ZoneInfo(timezone)
+        # Called in a worker thread once a run has finished, e.g. to rebuild derived tables
+        self.after_run = after_run
+        self.loader = ConcurrentLoader(store.refresh, max_concurrency=max_concurrency, timeout=timeout)
+        self.progress = RefreshProgress()
+        self._task: Optional[asyncio.Task] = None
+        self._manual_task: Optional[asyncio.Task] = None
+        self._run_lock = asyncio.Lock()
+
+    async def _refresh_batch(self, symbols: List[str]):
+        pending = symbols
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self.progress.retries += len(pending)
+                delay = self.backoff * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * (1.0 + random.random()))
+
+            results, errors = await self.loader.load_many(pending)
+            self.progress.refreshed += len(results)
+            if not errors:
+                return
+            pending = list(errors)
+            logger.info("Refresh attempt %d failed for %d symbols", attempt + 1, len(pending))
+
+        self.progress.failed.update(errors)
+
+    async def run_once(self, symbols: Optional[List[str]] = None) -> RefreshProgress:
+        """Refresh `symbols`, or the whole universe; a run already in progress is awaited instead."""
+        if self._run_lock.locked():
+            async with self._run_lock:
+                return self.progress
+
+        async with self._run_lock:
+            if symbols is None:
+                symbols = await asyncio.to_thread(self.list_symbols)
+            symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()))
+
+            next_run_at = self.progress.next_run_at
+            self.progress = RefreshProgress(running=True, started_at=utcnow(), total=len(symbols), next_run_at=next_run_at)
+            logger.info("Refreshing %d symbols", len(symbols))
+            try:
+                for start in range(0, len(symbols), self.batch_size):
+                    await self._refresh_batch(symbols[start:start + self.batch_size])
+            finally:
+                self.progress.running = False
+                self.progress.finished_at = utcnow()
+            logger.info(
+                "Refresh finished: %d refreshed, %d failed", self.progress.refreshed, len(self.progress.failed)
+            )
+            if self.after_run is not None:
+                try:
+                    await asyncio.to_thread(self.after_run)
+                except Exception:
+                    logger.exception("Post-refresh step failed")
+            return self.progress
+
+    async def run_forever(self):
+        while True:
+            self.progress.next_run_at = next_run_time(datetime.now(ZoneInfo("UTC")), self.run_at, self.timezone)
+            delay = (self.progress.next_run_at - utcnow()).total_seconds()
+            logger.info("Next universe refresh at %s UTC", self.progress.next_run_at)
+            await asyncio.sleep(max(delay, 0.0))
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("Universe refresh failed")
+
+    def trigger(self, symbols: Optional[List[str]] = None) -> bool:
+        """Start a run in the background now; False when one is already running."""
+        if self._run_lock.locked():
+            return False
+        self._manual_task = asyncio.create_task(self.run_once(symbols))
+        return True
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_forever())
+
+    async def stop(self):
+        for task in (self._task, self._manual_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._manual_task = None
+        self.loader.shutdown()
+
+
+def list_reference_symbols() -> List[str]:
+    with SessionLocal() as db:
+        return [record["symbol"] for record in StockRepository(db).get_all_stocks_symbols_and_names()]
+
+
+def build_scheduler(settings, store: MarketDataStore, after_run: Optional[Callable[[], Any]] = None) -> RefreshScheduler:
+    return RefreshScheduler(
+        store,
+        list_reference_symbols,
+        batch_size=settings.refresh_batch_size,
+        max_concurrency=settings.refresh_concurrency,
+        timeout=settings.refresh_timeout,
+        max_retries=settings.refresh_max_retries,
+        backoff=settings.refresh_backoff,
+        run_at=time.fromisoformat(settings.refresh_run_at),
+        timezone=settings.refresh_timezone,
+        after_run=after_run
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--once", action="store_true", help="refresh the universe now and exit")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+
+    settings = get_settings()
+    store = MarketDataStore(
+        fetcher=get_fetcher(settings),
+        history_ttl=settings.market_data_history_ttl,
+        info_ttl=settings.market_data_info_ttl,
+        history_years=settings.market_data_history_years,
+        refresh_on_read=settings.market_data_refresh_on_read
+    )
+    screener_service = ScreenerService(history_years=settings.market_data_history_years)
+    scheduler = build_scheduler(settings, store, after_run=screener_service.refresh)
+
+    async def run():
+        try:
+            if args.once:
+                progress = await scheduler.run_once()
+                logger.info("Refresh summary: %s", progress.to_dict())
+            else:
+                await scheduler.run_forever()
+        finally:
+            await scheduler.stop()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
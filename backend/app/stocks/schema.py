@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from enum import Enum
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class StockBase(BaseModel):
@@ -15,4 +16,26 @@ class Stock(StockBase):
     last_updated: datetime
 
     # Enable ORM mode for compatibility with SQLAlchemy
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
+
+class Range(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+
+class ScreenerRequest(BaseModel):
+    # Exact matches; a symbol passes when its value is any of the listed ones
+    sectors: List[str] = Field(default_factory=list)
+    sub_sectors: List[str] = Field(default_factory=list)
+    indices: List[str] = Field(default_factory=list)
+    # Inclusive bounds on numeric snapshot columns, e.g. {"one_year": {"min": 10}, "beta": {"max": 1.2}}
+    ranges: Dict[str, Range] = Field(default_factory=dict)
+    sort: str = "one_year"
+    order: SortOrder = SortOrder.DESC
+    limit: int = Field(default=50, gt=0, le=1_000)
+    offset: int = Field(default=0, ge=0)
@@ -0,0 +1,172 @@
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from backend.app.database import Base, SessionLocal
+from backend.app.stocks.analytics import calculate_performances, compute_returns
+from backend.app.stocks.model import ScreenerSnapshot
+from backend.app.stocks.repository import MarketDataRepository, ScreenerRepository
+from backend.app.stocks.schema import ScreenerRequest, SortOrder
+from backend.app.stocks.store import utcnow
+
+logger = logging.getLogger(__name__)
+
+# Snapshot columns of the performance windows computed by `calculate_performances`
+PERFORMANCE_COLUMNS = {
+    "fiveYears": "five_years",
+    "threeYears": "three_years",
+    "oneYear": "one_year",
+    "sixMonths": "six_months",
+    "oneMonth": "one_month",
+    "ytd": "ytd",
+}
+
+# Snapshot columns filled from the stored info snapshot (keys from `FIELDS`)
+INFO_COLUMNS = {
+    "beta": "beta",
+    "eps_current_year": "epsCurrentYear",
+    "gross_margins": "grossMargins",
+    "operating_margins": "operatingMargins",
+    "profit_margins": "profitMargins",
+    "return_on_equity": "returnOnEquity",
+    "return_on_assets": "returnOnAssets",
+    "enterprise_value": "enterpriseValue",
+    "enterprise_to_revenue": "enterpriseToRevenue",
+    "enterprise_to_ebitda": "enterpriseToEbitda",
+    "ebitda": "ebitda",
+    "free_cashflow": "freeCashflow",
+    "total_cash": "totalCash",
+    "total_debt": "totalDebt",
+    "quick_ratio": "quickRatio",
+    "five_year_avg_dividend_yield": "fiveYearAvgDividendYield",
+    "average_daily_volume_10_day": "averageDailyVolume10Day",
+    "full_time_employees": "fullTimeEmployees",
+}
+
+# Columns that can be range-filtered and sorted on
+NUMERIC_COLUMNS = ("price", *PERFORMANCE_COLUMNS.values(), *INFO_COLUMNS)
+SORT_COLUMNS = ("symbol", "security_name", *NUMERIC_COLUMNS)
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if np.isfinite(value) else None
+
+
+def snapshot_row(reference: Dict, dates: np.ndarray, close: np.ndarray, info: Dict, updated_at) -> Dict[str, Any]:
+    """Snapshot row of one symbol from its stored closes on `dates` (NaN where missing, may be empty) and info."""
+    row = {**reference, "currency": info.get("currency"), "updated_at": updated_at}
+    row.update({column: _as_float(info.get(key)) for column, key in INFO_COLUMNS.items()})
+
+    valid = np.isfinite(close)
+    if not valid.any():
+        row.update({column: None for column in PERFORMANCE_COLUMNS.values()})
+        row.update({"price": _as_float(info.get("currentPrice")), "last_bar_date": None})
+        return row
+
+    dates, close = dates[valid], close[valid]
+    _, cumulative_return = compute_returns(close)
+    performances = calculate_performances(dates, cumulative_return)
+    row.update({column: performances[name] for name, column in PERFORMANCE_COLUMNS.items()})
+    row.update({"price": float(close[-1]), "last_bar_date": pd.Timestamp(dates[-1]).date()})
+    return row
+
+
+class ScreenerService:
+    """
+    Screens the reference universe against the `screener_snapshot` table.
+
+    `refresh` rebuilds the whole snapshot from what the local market data store already
+    holds (one bulk close query, stored info snapshots), so it never calls the fetcher;
+    the refresh scheduler runs it after every universe refresh.
+    """
+
+    def __init__(self, session_factory=SessionLocal, history_years: int = 5):
+        self.session_factory = session_factory
+        self.history_years = history_years
+        self._refresh_lock = threading.Lock()
+        self._ready = False
+
+        Base.metadata.create_all(bind=session_factory.kw["bind"], tables=[ScreenerSnapshot.__table__])
+
+    def refresh(self) -> Dict[str, Any]:
+        started = time.perf_counter()
+        with self._refresh_lock, self.session_factory() as db:
+            repository = ScreenerRepository(db)
+            universe = repository.get_universe()
+            symbols = list(dict.fromkeys(reference["symbol"] for reference in universe))
+            start = (pd.Timestamp.today() - pd.DateOffset(years=self.history_years)).date()
+            closes = MarketDataRepository(db).get_closes(symbols, start=start)
+            infos = repository.get_infos(symbols)
+
+            updated_at = utcnow()
+            # Plain arrays: a per-symbol pandas Series would cost more than the returns themselves
+            dates = closes.index.to_numpy(dtype="datetime64[ns]")
+            matrix = closes.to_numpy(dtype=np.float64)
+            positions = {symbol: i for i, symbol in enumerate(closes.columns)}
+            empty = np.empty(0, dtype=np.float64)
+            rows, seen = [], set()
+            for reference in universe:
+                symbol = reference["symbol"]
+                if symbol in seen:
+                    continue
+                seen.add(symbol)
+                if symbol in positions:
+                    row = snapshot_row(reference, dates, matrix[:, positions[symbol]], infos.get(symbol, {}), updated_at)
+                else:
+                    row = snapshot_row(reference, dates[:0], empty, infos.get(symbol, {}), updated_at)
+                rows.append(row)
+
+            repository.replace_snapshot(rows)
+            db.commit()
+            self._ready = True
+
+        summary = {
+            "symbols": len(rows),
+            "with_history": sum(row["last_bar_date"] is not None for row in rows),
+            "updated_at": updated_at,
+            "seconds": time.perf_counter() - started,
+        }
+        logger.info("Screener snapshot rebuilt: %s", summary)
+        return summary
+
+    def screen(self, request: ScreenerRequest) -> Dict[str, Any]:
+        unknown = [name for name in request.ranges if name not in NUMERIC_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown range columns: {', '.join(unknown)}. Available: {', '.join(NUMERIC_COLUMNS)}")
+        if request.sort not in SORT_COLUMNS:
+            raise ValueError(f"Unknown sort column: {request.sort}. Available: {', '.join(SORT_COLUMNS)}")
+
+        if not self._ready:
+            with self.session_factory() as db:
+                self._ready = ScreenerRepository(db).get_snapshot_updated_at() is not None
+            if not self._ready:
+                self.refresh()
+
+        with self.session_factory() as db:
+            repository = ScreenerRepository(db)
+            total, rows = repository.screen(
+                sectors=request.sectors,
+                sub_sectors=request.sub_sectors,
+                indices=request.indices,
+                ranges={name: (bounds.min, bounds.max) for name, bounds in request.ranges.items()},
+                sort=request.sort,
+                descending=request.order == SortOrder.DESC,
+                limit=request.limit,
+                offset=request.offset
+            )
+        return {
+            "total": total,
+            "limit": request.limit,
+            "offset": request.offset,
+            "sort": request.sort,
+            "order": request.order,
+            "results": rows,
+        }
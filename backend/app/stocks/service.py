@@ -1,199 +1,333 @@
-from typing import List, Dict, Optional, Any
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Dict, Optional, Any, Iterable
 from sqlalchemy.orm import Session
 from backend.app.stocks.repository import StockRepository
 from backend.app.database import get_db
-import yfinance as yf
 import numpy as np
 import pandas as pd
 from fastapi import status
 from fastapi.responses import JSONResponse
 
-from backend.app.stocks.utils import FIELDS
-
-
-def calculate_performance(hist, days):
-    try:
-        start_date = hist['Date'].max() - pd.Timedelta(days=days)
-        filtered_hist = hist[hist['Date'] >= start_date]
-
-        # Check if we have enough data
-        if len(filtered_hist) < 2:
-            return None
-
-        first_val = filtered_hist['cumulative_return'].iloc[0]
-        last_val = filtered_hist['cumulative_return'].iloc[-1]
-
-        if first_val is None or last_val is None:
-            return None
-
-        performance = ((last_val - first_val) * 100)
-        if isinstance(performance, (np.float64, np.float32)):
-            performance = float(performance)
-
-        if performance is not None and np.isfinite(performance):
-            return round(performance, 2)
-        return None
-
-    except Exception as e:
-        print(f"Error calculating performance for {days} days: {e}")
-        return None
-
-
-def calculate_ytd_performance(hist):
-    try:
-        if hist['Date'].dt.tz is not None:
-            hist['Date'] = hist['Date'].dt.tz_localize(None)
-
-        current_year = hist['Date'].dt.year.max()
-        if pd.isna(current_year):
-            return None
-
-        start_of_year = pd.Timestamp(year=current_year, month=1, day=1)
-        filtered_hist = hist[hist['Date'] >= start_of_year]
-
-        if len(filtered_hist) < 2:
-            return None
-
-        first_val = filtered_hist['cumulative_return'].iloc[0]
-        last_val = filtered_hist['cumulative_return'].iloc[-1]
-
-        if first_val is None or last_val is None:
-            return None
-
-        performance = ((last_val - first_val) * 100)
-        if isinstance(performance, (np.float64, np.float32)):
-            performance = float(performance)
-
-        if performance is not None and np.isfinite(performance):
-            return round(performance, 2)
-        return None
-
-    except Exception as e:
-        print(f"Error calculating YTD performance: {e}")
-        return None
-
-
-def make_json_serializable(obj: Any) -> Any:
-    """Convert NumPy types to Python native types for JSON serialization."""
-    if isinstance(obj, (np.integer, np.int64, np.int32)):
-        return int(obj)
-    elif isinstance(obj, (np.floating, np.float64, np.float32)):
-        if not np.isfinite(obj):
-            return None
-        return float(obj)
-    elif isinstance(obj, np.ndarray):
-        return [make_json_serializable(x) for x in obj]
-    elif isinstance(obj, pd.DataFrame):
-        return make_json_serializable(obj.to_dict('records'))
-    elif isinstance(obj, pd.Series):
-        return make_json_serializable(obj.to_dict())
-    elif isinstance(obj, dict):
-        return {k: make_json_serializable(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [make_json_serializable(item) for item in obj]
-    elif isinstance(obj, pd.Timestamp):
-        return obj.isoformat()
-    elif obj is None or isinstance(obj, (str, int, float, bool)):
-        return obj
-    else:
-        # Fallback for other types: try to convert to string
-        try:
-            return str(obj)
-        except:
-            return None
+from backend.app.cache import TTLCache, MISSING
+from backend.app.metrics import metrics
+from backend.app.serialization import HistoryOrient, NumpyJSONResponse, serialize_frame
+from backend.app.stocks.analytics import build_history_frame
+from backend.app.stocks.covariance import (
+    TRADING_DAYS_PER_YEAR, CovarianceMethod, aligned_log_returns, correlation_from_covariance, make_estimator
+)
+from backend.app.stocks.downsampling import HistoryView
+from backend.app.stocks.indicators import Indicator, RealizedVolatility, indicator_inputs, parse_indicator
+from backend.app.stocks.store import MarketDataStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LoadedStock:
+    """Processed history, performance windows and info of one symbol."""
+    hist: pd.DataFrame
+    performance: Dict[str, Any]
+    info: Dict[str, Any]
 
 
 class StocksService:
-    def __init__(self, db: Optional[Session] = None):
+    def __init__(self, db: Optional[Session] = None, store: Optional[MarketDataStore] = None):
         self.db = db
         self.stock_repository = StockRepository(db) if db else None
+        self.store = store
 
     def get_all_stocks_symbols_and_names(self) -> List[Dict[str, str]]:
-        result = self.stock_repository.get_all_stocks_symbols_and_names()
-        return make_json_serializable(result)
-
-    def get_stock_data_by_symbol(self, symbol: str):
+        return self.stock_repository.get_all_stocks_symbols_and_names()
+
+    def get_stock_data_by_symbol(
+            self,
+            symbol: str,
+            orient: HistoryOrient = HistoryOrient.COLUMNS,
+            view: Optional[HistoryView] = None
+    ):
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period="5y")  # Create an explicit copy
-            stock_info_needed = {k: v for k in FIELDS if (v := stock.info.get(k)) is not None}
-            hist['Date'] = hist.index
-            if pd.api.types.is_datetime64_any_dtype(hist['Date']):
-                hist['Date'] = hist['Date'].dt.to_pydatetime()
-
-            # Extract only needed columns
-            hist = hist[['Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Dividends']]
-
-            # Replace NumPy NaN values with None which is JSON serializable
-            hist = hist.replace([np.nan, np.inf, -np.inf], None)
-
-            # Calculate returns
-            hist['daily_return'] = hist['Close'].pct_change()
-            hist['daily_return'] = hist['daily_return'].replace([np.nan, np.inf, -np.inf], None)
-
-            # Calculate cumulative returns
-            cumulative_return = []
-            current_cum_return = 0
-
-            for return_val in hist['daily_return']:
-                if return_val is not None:
-                    current_cum_return = (1 + current_cum_return) * (1 + return_val) - 1
-                cumulative_return.append(current_cum_return)
-
-            hist['cumulative_return'] = cumulative_return
-
-            performance = {
-                "fiveYears": calculate_performance(hist, 5 * 365),
-                "threeYears": calculate_performance(hist, 3 * 365),
-                "oneYear": calculate_performance(hist, 252),
-                "sixMonths": calculate_performance(hist, 182),
-                "oneMonth": calculate_performance(hist, 30),
-                "ytd": calculate_ytd_performance(hist)
-            }
-
-            # Remove None values for JSON compliance
-            performance = {k: v for k, v in performance.items() if v is not None}
-
-            # Get the current price correctly from yfinance API
-            # First try the fast_info property which is recommended by yfinance
-            price = None
-            try:
-                # First method: Use fast_info.last_price which is the recommended method
-                if hasattr(stock, 'fast_info') and hasattr(stock.fast_info, 'last_price'):
-                    price = stock.fast_info.last_price
-                # Second method: Use the last closing price from history
-                elif not hist.empty and hist['Close'].iloc[-1] is not None:
-                    price = hist['Close'].iloc[-1]
-                # Third method: Try the direct info dictionary
-                elif 'regularMarketPrice' in stock.info:
-                    price = stock.info['regularMarketPrice']
-                elif 'currentPrice' in stock.info:
-                    price = stock.info['currentPrice']
-
-                # Ensure price is a proper float
-                if price is not None:
-                    if isinstance(price, (np.float64, np.float32)):
-                        price = float(price)
-
-                    # Check if price is a finite number
-                    if not np.isfinite(price):
-                        price = None
-            except Exception as price_error:
-                print(f"Error getting price for {symbol}: {str(price_error)}")
-                price = None
-
-            response = {
-                "price": round(price, 2) if price is not None else None,
-                "performance": performance,
-                "hist": hist,
-                "info": stock_info_needed
-            }
-
-            return make_json_serializable(response)
+            return NumpyJSONResponse(content=self.build_stock_data(symbol, orient, view=view))
 
         except Exception as e:
-            print(f"Error processing {symbol}: {str(e)}")
+            logger.exception("Error processing %s", symbol)
             return JSONResponse(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 content={"price": None, "error": str(e)}
-            )
\ No newline at end of file
+            )
+
+    def build_stock_data(
+            self,
+            symbol: str,
+            orient: HistoryOrient = HistoryOrient.COLUMNS,
+            include_history: bool = True,
+            view: Optional[HistoryView] = None
+    ):
+        """
+        Price, performance windows, info and (optionally) serialized history for one symbol.
+        Price and performance always come from the full history; `view` only shapes the
+        returned history (date range, weekly / monthly bars, downsampling).
+        """
+        return self.shape_stock_data(self.load_stock_data(symbol), orient, include_history, view)
+
+    def load_stock_data(self, symbol: str) -> LoadedStock:
+        """Stored history and info of one symbol with its performance windows, before any view is applied."""
+        hist = self.store.get_history(symbol)
+        if hist.empty:
+            raise LookupError(f"No price history available for {symbol}")
+        info = self.store.get_info(symbol)
+
+        # Float64 throughout: NaN only becomes null when the response is serialized
+        with metrics.stage("dataframe_processing"):
+            hist, performance = build_history_frame(hist)
+        return LoadedStock(hist=hist, performance=performance, info=info)
+
+    @staticmethod
+    def shape_stock_data(
+            loaded: LoadedStock,
+            orient: HistoryOrient = HistoryOrient.COLUMNS,
+            include_history: bool = True,
+            view: Optional[HistoryView] = None
+    ) -> Dict[str, Any]:
+        """Response of `build_stock_data` from a loaded symbol; `loaded` is left untouched so views can share it."""
+        hist, stock_info_needed = loaded.hist, loaded.info
+
+        # Remove None values for JSON compliance
+        performance = {k: v for k, v in loaded.performance.items() if v is not None}
+
+        # The last stored close is refreshed with the history; the info quote is a fallback
+        price = hist['Close'].iloc[-1]
+        if not np.isfinite(price):
+            price = stock_info_needed.get('currentPrice')
+
+        # Ensure price is a proper finite float
+        if price is not None:
+            price = float(price)
+            if not np.isfinite(price):
+                price = None
+
+        response = {
+            "price": round(price, 2) if price is not None else None,
+            "performance": performance,
+            "info": stock_info_needed
+        }
+        if include_history:
+            with metrics.stage("dataframe_processing"):
+                if view is not None:
+                    hist = view.apply(hist)
+                response["hist"] = serialize_frame(hist, orient)
+
+        return response
+
+
+@dataclass
+class CachedIndicator:
+    """Indicator values over a history, with what is needed to extend them to new bars."""
+    dates: np.ndarray
+    values: np.ndarray
+    # Carry after the second to last row, where an update resumes
+    carry: Any
+    # Rows dropped off the front of the window since the series was computed in full
+    dropped: int = 0
+
+
+# Rows the stored history's first date may move past a cached series before it is recomputed in full
+REANCHOR_ROWS = 63
+
+
+class IndicatorService:
+    """
+    Indicators over the stored daily closes, cached per (symbol, benchmark, indicator).
+
+    The stored history is a sliding window: its first date moves forward as bars are
+    appended. A cached series is reused as long as the history still holds its dates
+    from the new first date to its second to last bar: only the last cached bar (which
+    a refresh may have revised) and the bars appended since are computed, carrying on
+    from the cached series. Recursive indicators (EMA, RSI, drawdown) thus stay anchored
+    on the cached series' first date, until the window has moved `REANCHOR_ROWS` rows
+    past it and the series is recomputed over the current window.
+    """
+
+    def __init__(self, store: MarketDataStore, cache: Optional[TTLCache] = None, benchmark: str = "^GSPC"):
+        self.store = store
+        self.cache = cache if cache is not None else TTLCache(maxsize=1024)
+        self.benchmark = benchmark
+
+    def _series(self, key, indicator: Indicator, dates: np.ndarray, inputs: Dict[str, np.ndarray]) -> np.ndarray:
+        rows = len(dates)
+        cached = self.cache.get((key, indicator))
+        values, dropped = None, 0
+        if cached is not MISSING and rows >= 2:
+            # Cached rows dropped off the front of the window, and the current row of the last cached bar
+            shift = int(np.searchsorted(cached.dates, dates[0]))
+            start = len(cached.dates) - 1 - shift
+            dropped = cached.dropped + shift
+            if dropped <= REANCHOR_ROWS and 1 <= start < rows and np.array_equal(cached.dates[shift:-1], dates[:start]):
+                tail, carry = indicator.compute(inputs, start, cached.carry)
+                values = np.concatenate((cached.values[shift:-1], tail))
+        if values is None:
+            values, carry = indicator.compute(inputs)
+            dropped = 0
+
+        if rows >= 2:
+            self.cache.set((key, indicator), CachedIndicator(dates, values, carry, dropped))
+        return values
+
+    def compute(
+            self,
+            symbol: str,
+            keys: Iterable[str],
+            benchmark: Optional[str] = None,
+            start: Optional[date] = None,
+            end: Optional[date] = None
+    ) -> Dict[str, Any]:
+        """Columns of the requested indicators (keys such as "sma_50" or "rsi_14") over the symbol's history."""
+        indicators = {key: parse_indicator(key) for key in dict.fromkeys(k.strip().lower() for k in keys if k.strip())}
+        if not indicators:
+            raise ValueError("No indicators requested")
+
+        hist = self.store.get_history(symbol)
+        if hist.empty:
+            raise LookupError(f"No price history available for {symbol}")
+        hist = hist.sort_index()
+        dates = hist.index.to_numpy(dtype="datetime64[D]")
+
+        benchmark_close = None
+        uses_benchmark = any("benchmark_log_return" in indicator.inputs for indicator in indicators.values())
+        if uses_benchmark:
+            benchmark = (benchmark or self.benchmark).strip().upper()
+            benchmark_hist = self.store.get_history(benchmark)
+            if benchmark_hist.empty:
+                raise LookupError(f"No price history available for benchmark {benchmark}")
+            benchmark_close = benchmark_hist["Close"].sort_index().reindex(hist.index).to_numpy()
+
+        inputs = indicator_inputs(hist["Close"].to_numpy(), benchmark_close)
+        columns = {}
+        for key, indicator in indicators.items():
+            series_benchmark = benchmark if "benchmark_log_return" in indicator.inputs else None
+            columns[key] = self._series((symbol, series_benchmark), indicator, dates, inputs)
+
+        lo = np.searchsorted(dates, np.datetime64(start, "D")) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(end, "D"), side="right") if end is not None else len(dates)
+        result = {
+            "symbol": symbol,
+            "Date": np.datetime_as_string(dates[lo:hi].astype("datetime64[s]"), unit="s"),
+            "values": {key: values[lo:hi] for key, values in columns.items()},
+            "latest": {key: float(values[-1]) for key, values in columns.items()},
+        }
+        if uses_benchmark:
+            result["benchmark"] = benchmark
+        if "drawdown" in columns:
+            drawdown = columns["drawdown"][lo:hi]
+            result["max_drawdown"] = float(np.nanmin(drawdown)) if np.isfinite(drawdown).any() else None
+        return result
+
+    def latest_realized_volatility(self, symbols: Iterable[str], window: int = 21) -> Dict[str, float]:
+        """Last annualized realized volatility of each symbol, from one bulk close query; unknown symbols are left out."""
+        indicator = RealizedVolatility(window=window)
+        closes = self.store.get_closes(symbols)
+        volatilities = {}
+        for symbol in closes.columns:
+            close = closes[symbol].dropna()
+            if len(close) < 2:
+                continue
+            dates = close.index.to_numpy(dtype="datetime64[D]")
+            values = self._series((symbol, None), indicator, dates, indicator_inputs(close.to_numpy()))
+            if np.isfinite(values[-1]):
+                volatilities[symbol] = float(values[-1])
+        return volatilities
+
+
+@dataclass
+class CachedCovariance:
+    """Estimator state of the window ending on `anchor_date`, the second to last common date when cached."""
+    anchor_date: Any
+    # First date of that window and its number of rows, to find it again in a later history
+    window_start_date: Any
+    observations: int
+    state: Any
+
+
+class CovarianceService:
+    """
+    Covariance and correlation matrices of a symbol set, over the log returns on the
+    dates every symbol has a close.
+
+    Estimator states are cached per (symbol set, estimator). As long as a later history
+    still holds the cached window, only the bars since its anchor are folded in, even
+    though the stored history's first date moves forward every day.
+    """
+
+    def __init__(self, store: MarketDataStore, cache: Optional[TTLCache] = None, max_symbols: int = 500):
+        self.store = store
+        self.cache = cache if cache is not None else TTLCache(maxsize=256)
+        self.max_symbols = max_symbols
+
+    def _state(self, key, estimator, dates: np.ndarray, returns: np.ndarray):
+        """State of the window ending on the second to last row, from the cache when it still applies."""
+        anchor = len(dates) - 2
+        cached = self.cache.get(key)
+        state = None
+        if cached is not MISSING:
+            position = int(np.searchsorted(dates, cached.anchor_date))
+            first = position + 1 - cached.observations
+            if position <= anchor and dates[position] == cached.anchor_date and first >= 0 \
+                    and dates[first] == cached.window_start_date:
+                state = estimator.advance(cached.state, returns, position, anchor)
+        if state is None:
+            state = estimator.state(returns, anchor)
+
+        observations = estimator.observations(anchor)
+        self.cache.set(key, CachedCovariance(dates[anchor], dates[anchor + 1 - observations], observations, state))
+        return state
+
+    def compute(
+            self,
+            symbols: Iterable[str],
+            method: CovarianceMethod = CovarianceMethod.SAMPLE,
+            window: int = 252,
+            decay: Optional[float] = None,
+            annualized: bool = True
+    ) -> Dict[str, Any]:
+        """Covariance, correlation and volatility of each symbol, in request order."""
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        if len(symbols) < 2:
+            raise ValueError("At least two symbols are needed")
+        if len(symbols) > self.max_symbols:
+            raise ValueError(f"At most {self.max_symbols} symbols per request")
+        estimator = make_estimator(method, window, decay)
+
+        # States are kept for the sorted set, whatever order it was requested in
+        canonical = sorted(symbols)
+        closes = self.store.get_closes(canonical)
+        missing = [symbol for symbol in canonical if symbol not in closes.columns]
+        if missing:
+            raise LookupError(f"No price history available for {', '.join(missing)}")
+        dates, returns = aligned_log_returns(closes[canonical])
+        if len(dates) < 2:
+            raise ValueError("Not enough common price history across the symbols")
+
+        state = self._state((tuple(canonical), estimator), estimator, dates, returns)
+        last = len(dates) - 1
+        covariance, details = estimator.covariance(estimator.advance(state, returns, last - 1, last))
+
+        order = np.array([canonical.index(symbol) for symbol in symbols])
+        covariance = covariance[np.ix_(order, order)]
+        if annualized:
+            covariance = covariance * TRADING_DAYS_PER_YEAR
+        volatility = np.sqrt(np.diag(covariance))
+        observations = estimator.observations(last)
+        return {
+            "symbols": symbols,
+            "method": method,
+            "window": window,
+            "observations": observations,
+            "start": str(dates[last + 1 - observations]),
+            "end": str(dates[last]),
+            "annualized": annualized,
+            **details,
+            "volatility": dict(zip(symbols, volatility)),
+            "covariance": np.ascontiguousarray(covariance),
+            "correlation": correlation_from_covariance(covariance),
+        }
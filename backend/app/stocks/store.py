@@ -0,0 +1,182 @@
+import logging
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from backend.app.database import Base, SessionLocal, get_async_session_factory
+from backend.app.stocks.fetcher import MarketDataFetcher
+from backend.app.stocks.model import PriceBar, SymbolMetadata
+from backend.app.stocks.repository import AsyncMarketDataRepository, MarketDataRepository
+
+logger = logging.getLogger(__name__)
+
+
+def utcnow() -> datetime:
+    # Naive UTC, the way DateTime columns are stored
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _is_stale(updated_at: Optional[datetime], ttl: float, now: datetime) -> bool:
+    return updated_at is None or now - updated_at > timedelta(seconds=ttl)
+
+
+class MarketDataStore:
+    """
+    Persistent per-symbol daily history and info, kept in the application database.
+
+    Reads are served from the `price_history` and `symbol_metadata` tables. When the
+    stored data is older than its TTL, only the tail since the last stored bar is
+    fetched from the configured `MarketDataFetcher` and appended.
+    Sessions come from `session_factory` so one store can be shared across threads.
+
+    With `refresh_on_read` off (the refresh scheduler keeps the store current), reads
+    only fetch symbols that were never stored, so requests never wait on stale data.
+    """
+
+    def __init__(
+            self,
+            fetcher: MarketDataFetcher,
+            session_factory=SessionLocal,
+            history_ttl: float = 900.0,
+            info_ttl: float = 86_400.0,
+            history_years: int = 5,
+            refresh_on_read: bool = True,
+            async_session_factory=None
+    ):
+        self.fetcher = fetcher
+        self.session_factory = session_factory
+        self.history_ttl = history_ttl
+        self.info_ttl = info_ttl
+        self.history_years = history_years
+        self.refresh_on_read = refresh_on_read
+        self._async_session_factory = async_session_factory
+
+        bind = session_factory.kw["bind"]
+        Base.metadata.create_all(bind=bind, tables=[PriceBar.__table__, SymbolMetadata.__table__])
+
+    @property
+    def async_session_factory(self):
+        # Created on first use, so the sync path never needs the async driver
+        if self._async_session_factory is None:
+            self._async_session_factory = get_async_session_factory()
+        return self._async_session_factory
+
+    def _needs_refresh(self, updated_at: Optional[datetime], ttl: float) -> bool:
+        if not self.refresh_on_read:
+            return updated_at is None
+        return _is_stale(updated_at, ttl, utcnow())
+
+    def get_history(self, symbol: str) -> pd.DataFrame:
+        """Stored daily history over the last `history_years`; a failed refresh falls back to the stored bars."""
+        with self.session_factory() as db:
+            repository = MarketDataRepository(db)
+            metadata = repository.get_metadata(symbol)
+            updated_at = metadata.history_updated_at if metadata else None
+            if self._needs_refresh(updated_at, self.history_ttl):
+                try:
+                    self._refresh_history(repository, symbol)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    if updated_at is None:
+                        raise
+                    logger.warning("Could not refresh %s history, serving stored bars: %s", symbol, e)
+
+            start = (pd.Timestamp.today() - pd.DateOffset(years=self.history_years)).date()
+            return repository.get_history(symbol, start=start)
+
+    def get_closes(self, symbols) -> pd.DataFrame:
+        """
+        Daily closes of many symbols as one (Date, symbol) frame over the last
+        `history_years`. Stale symbols are refreshed first, one by one; a symbol whose
+        refresh fails is served from whatever is stored.
+        """
+        symbols = list(dict.fromkeys(symbols))
+        with self.session_factory() as db:
+            repository = MarketDataRepository(db)
+            metadata = repository.get_metadata_many(symbols)
+            for symbol in symbols:
+                updated_at = metadata[symbol].history_updated_at if symbol in metadata else None
+                if not self._needs_refresh(updated_at, self.history_ttl):
+                    continue
+                try:
+                    self._refresh_history(repository, symbol)
+                    db.commit()
+                except Exception as e:
+                    db.rollback()
+                    logger.warning("Could not refresh %s history: %s", symbol, e)
+
+            start = (pd.Timestamp.today() - pd.DateOffset(years=self.history_years)).date()
+            return repository.get_closes(symbols, start=start)
+
+    def get_info(self, symbol: str) -> Dict:
+        """Stored info snapshot; a failed refresh falls back to the stored snapshot."""
+        with self.session_factory() as db:
+            repository = MarketDataRepository(db)
+            metadata = repository.get_metadata(symbol)
+            if metadata is not None and not self._needs_refresh(metadata.info_updated_at, self.info_ttl):
+                return metadata.info or {}
+
+            stored = (metadata.info or {}) if metadata is not None and metadata.info_updated_at is not None else None
+            try:
+                info = self.fetcher.fetch_info(symbol)
+                repository.save_info(symbol, info, utcnow())
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if stored is None:
+                    raise
+                logger.warning("Could not refresh %s info, serving the stored snapshot: %s", symbol, e)
+                return stored
+            return info
+
+    def get_last_closes(self, symbols, end: Optional[date] = None) -> Dict[str, float]:
+        """
+        Last stored close per symbol, on or before `end` if given, read without refreshing
+        anything so callers on a hot path never wait on the fetcher; symbols with no stored
+        history (up to `end`) are omitted.
+        """
+        with self.session_factory() as db:
+            return MarketDataRepository(db).get_last_closes(list(symbols), end)
+
+    async def get_last_closes_async(self, symbols, end: Optional[date] = None) -> Dict[str, float]:
+        """`get_last_closes` on the async engine."""
+        async with self.async_session_factory() as db:
+            return await AsyncMarketDataRepository(db).get_last_closes(list(symbols), end)
+
+    def get_refresh_status(self, symbols=None) -> List[Dict]:
+        """Refresh timestamps, last stored bar and staleness of stored symbols (all when `symbols` is None)."""
+        with self.session_factory() as db:
+            rows = MarketDataRepository(db).get_refresh_status(None if symbols is None else list(symbols))
+        return self._with_staleness(rows)
+
+    async def get_refresh_status_async(self, symbols=None) -> List[Dict]:
+        """`get_refresh_status` on the async engine."""
+        async with self.async_session_factory() as db:
+            rows = await AsyncMarketDataRepository(db).get_refresh_status(None if symbols is None else list(symbols))
+        return self._with_staleness(rows)
+
+    def _with_staleness(self, rows: List[Dict]) -> List[Dict]:
+        now = utcnow()
+        for row in rows:
+            row["history_stale"] = _is_stale(row["history_updated_at"], self.history_ttl, now)
+            row["info_stale"] = _is_stale(row["info_updated_at"], self.info_ttl, now)
+        return rows
+
+    def refresh(self, symbol: str):
+        """Fetch the missing history tail and the info snapshot regardless of staleness."""
+        with self.session_factory() as db:
+            repository = MarketDataRepository(db)
+            self._refresh_history(repository, symbol)
+            repository.save_info(symbol, self.fetcher.fetch_info(symbol), utcnow())
+            db.commit()
+
+    def _refresh_history(self, repository: MarketDataRepository, symbol: str):
+        last_bar = repository.get_last_bar_date(symbol)
+        # Refetch the last stored bar too: it may have been stored mid-session
+        hist = self.fetcher.fetch_history(symbol, start=last_bar)
+        logger.debug("Fetched %d bars for %s since %s", len(hist), symbol, last_bar)
+
+        repository.replace_history_from(symbol, hist)
+        repository.mark_history_updated(symbol, utcnow())
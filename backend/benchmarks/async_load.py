@@ -0,0 +1,128 @@
+"""
+Requests per second of the sync (threadpool) and async (aiosqlite) database paths under
+concurrent load, on the same temporary SQLite file and the same service objects.
+
+    python -m backend.benchmarks.async_load [--concurrency 200] [--seconds 5] [--positions 500]
+
+Each path serves the portfolio list and a portfolio valuation: sync handlers call the
+sync service methods in Starlette's threadpool, async handlers await the async ones.
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import tempfile
+import time
+
+import httpx
+import numpy as np
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from backend.app.database import create_async_database_engine
+from backend.app.portfolios.service import PortfolioService, SpotCache
+from backend.app.stocks.store import MarketDataStore
+from backend.benchmarks.portfolio_valuation import make_database
+
+ENDPOINTS = ("portfolios", "valuation")
+
+
+def make_app(service: PortfolioService) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/sync/portfolios")
+    def sync_portfolios():
+        return service.get_portfolios()
+
+    @app.get("/async/portfolios")
+    async def async_portfolios():
+        return await service.get_portfolios_async()
+
+    @app.get("/sync/valuation")
+    def sync_valuation():
+        return service.value_portfolio(1)["totals"]
+
+    @app.get("/async/valuation")
+    async def async_valuation():
+        return (await service.value_portfolio_async(1))["totals"]
+
+    return app
+
+
+async def load(app: FastAPI, path: str, concurrency: int, seconds: float, method: str = "GET", payloads=None):
+    """
+    `concurrency` clients calling `path` back to back for `seconds`. With `payloads`,
+    requests send them as JSON bodies in turn.
+    """
+    latencies, errors = [], 0
+    bodies = itertools.cycle(payloads) if payloads else itertools.repeat(None)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        deadline = time.perf_counter() + seconds
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.request(method, path, json=next(bodies))
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    values = np.array(latencies) if latencies else np.array([np.nan])
+    return {
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": float(np.nanpercentile(values, 50) * 1e3),
+        "p99_ms": float(np.nanpercentile(values, 99) * 1e3),
+        "errors": errors,
+    }
+
+
+async def run(concurrency=200, seconds=5.0, num_positions=500):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite:///{os.path.join(directory, 'load.db')}"
+        session_factory = make_database(num_positions, url=url)
+        async_engine = create_async_database_engine(url)
+        async_session_factory = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+        store = MarketDataStore(fetcher=None, session_factory=session_factory, async_session_factory=async_session_factory)
+        service = PortfolioService(
+            SpotCache(store), session_factory=session_factory, async_session_factory=async_session_factory
+        )
+        app = make_app(service)
+
+        results = {}
+        try:
+            for endpoint in ENDPOINTS:
+                for path in ("sync", "async"):
+                    # Spots are cached per path run, so both start cold
+                    service.spot_cache = SpotCache(store)
+                    results[(endpoint, path)] = await load(app, f"/{path}/{endpoint}", concurrency, seconds)
+        finally:
+            await async_engine.dispose()
+            session_factory.kw["bind"].dispose()
+        return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--positions", type=int, default=500)
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.concurrency, args.seconds, args.positions))
+    print(f"{args.concurrency} concurrent clients, {args.seconds:g} s per run, {args.positions} positions")
+    print(f"{'endpoint':<12} {'path':<6} {'req/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for (endpoint, path), r in results.items():
+        print(
+            f"{endpoint:<12} {path:<6} {r['requests_per_second']:>10.1f} {r['p50_ms']:>10.2f} "
+            f"{r['p99_ms']:>10.2f} {r['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Mixed read / write throughput of the market data tables from concurrent threads, on a
+temporary SQLite file, with a plain engine and with the tuned one from backend.app.database.
+
+    python -m backend.benchmarks.database_concurrency [--readers 8] [--writers 2] [--seconds 5]
+
+Pass --url to run the tuned profile against another database instead (e.g. PostgreSQL);
+its price_history / symbol_metadata rows for the benchmark symbols are replaced.
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.database import Base, create_database_engine
+from backend.app.stocks.model import PriceBar, SymbolMetadata
+from backend.app.stocks.repository import MarketDataRepository
+from backend.app.stocks.store import utcnow
+
+NUM_SYMBOLS = 50
+NUM_BARS = 1_250
+
+
+def make_bars(num_bars, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0.0, 0.01, num_bars)))
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=num_bars)
+    return pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+        "Volume": rng.uniform(1e5, 1e6, num_bars), "Dividends": 0.0,
+    }, index=index)
+
+
+def seed_database(engine):
+    Base.metadata.create_all(bind=engine, tables=[PriceBar.__table__, SymbolMetadata.__table__])
+    bars = make_bars(NUM_BARS)
+    with sessionmaker(bind=engine)() as db:
+        repository = MarketDataRepository(db)
+        for i in range(NUM_SYMBOLS):
+            symbol = f"B{i:03d}"
+            repository.replace_history_from(symbol, bars)
+            repository.mark_history_updated(symbol, utcnow())
+        db.commit()
+
+
+def run_workload(session_factory, readers, writers, seconds):
+    """Readers load a symbol's full history; writers replace a symbol's last bars, like a refresh."""
+    tail = make_bars(NUM_BARS).iloc[-5:]
+    stop = threading.Event()
+    latencies = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def worker(kind, seed):
+        rng = np.random.default_rng(seed)
+        local, failed = [], 0
+        while not stop.is_set():
+            symbol = f"B{int(rng.integers(NUM_SYMBOLS)):03d}"
+            start = time.perf_counter()
+            try:
+                with session_factory() as db:
+                    repository = MarketDataRepository(db)
+                    if kind == "read":
+                        repository.get_history(symbol)
+                    else:
+                        repository.replace_history_from(symbol, tail)
+                        repository.mark_history_updated(symbol, utcnow())
+                        db.commit()
+                local.append(time.perf_counter() - start)
+            except OperationalError:
+                failed += 1
+        with lock:
+            latencies[kind].extend(local)
+            errors[kind] += failed
+
+    threads = [threading.Thread(target=worker, args=("read", i)) for i in range(readers)]
+    threads += [threading.Thread(target=worker, args=("write", readers + i)) for i in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    result = {}
+    for kind, values in latencies.items():
+        values = np.array(values) if values else np.array([np.nan])
+        result[kind] = {
+            "ops_per_second": len(latencies[kind]) / seconds,
+            "p50_ms": float(np.nanpercentile(values, 50) * 1e3),
+            "p99_ms": float(np.nanpercentile(values, 99) * 1e3),
+            "errors": errors[kind],
+        }
+    return result
+
+
+def run(readers=8, writers=2, seconds=5.0, url=None):
+    results = {}
+    if url is not None:
+        engine = create_database_engine(url)
+        seed_database(engine)
+        results["tuned"] = run_workload(sessionmaker(bind=engine), readers, writers, seconds)
+        engine.dispose()
+        return results
+
+    with tempfile.TemporaryDirectory() as directory:
+        profiles = {
+            # What database.py used to build: default journal, pool and pragmas
+            "default": lambda path: create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}),
+            "tuned": lambda path: create_database_engine(f"sqlite:///{path}"),
+        }
+        for name, factory in profiles.items():
+            engine = factory(os.path.join(directory, f"{name}.db"))
+            seed_database(engine)
+            results[name] = run_workload(sessionmaker(bind=engine), readers, writers, seconds)
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g} s per profile")
+    print(f"{'profile':<10} {'op':<6} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for name, result in run(args.readers, args.writers, args.seconds, args.url).items():
+        for kind, r in result.items():
+            print(
+                f"{name:<10} {kind:<6} {r['ops_per_second']:>10.1f} {r['p50_ms']:>10.2f} "
+                f"{r['p99_ms']:>10.2f} {r['errors']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Time per price and accuracy of the binomial / trinomial lattices across step counts.
+
+Errors are measured on an American put against a 20,000-step extrapolated trinomial
+reference, and on the matching European put against Black-Scholes.
+
+    python -m backend.benchmarks.lattice [--repeat 5] [--steps 100 500 2000]
+"""
+import argparse
+import time
+
+from backend.app.pricer.black_scholes import black_scholes_batch
+from backend.app.pricer.lattice import lattice_batch
+from backend.app.pricer.model import LatticeMethod
+
+STEPS = (100, 500, 2_000)
+REFERENCE_STEPS = 20_000
+
+CONTRACT = {
+    "spot": 100.0,
+    "strike": 110.0,
+    "maturity": 1.0,
+    "rate": 0.05,
+    "dividend": 0.02,
+    "volatility": 0.25,
+    "is_call": False,
+}
+
+
+def _best_time(price, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = price()
+        timings.append(time.perf_counter() - start)
+    return min(timings), value
+
+
+def run(steps=STEPS, repeat=5):
+    reference = float(lattice_batch(
+        **CONTRACT, american=True, steps=REFERENCE_STEPS, method=LatticeMethod.TRINOMIAL, bumped_greeks=False
+    )["price"])
+    european = float(black_scholes_batch(**CONTRACT)["price"])
+
+    results = []
+    for method in LatticeMethod:
+        for richardson in (False, True):
+            for n in steps:
+                def price(american=True):
+                    return float(lattice_batch(
+                        **CONTRACT, american=american, steps=n, method=method, richardson=richardson, bumped_greeks=False
+                    )["price"])
+
+                seconds, value = _best_time(price, repeat)
+                greeks_seconds, _ = _best_time(lambda: lattice_batch(
+                    **CONTRACT, american=True, steps=n, method=method, richardson=richardson
+                ), repeat)
+                results.append({
+                    "method": method.value,
+                    "richardson": richardson,
+                    "steps": n,
+                    "seconds": seconds,
+                    "seconds_with_greeks": greeks_seconds,
+                    "american_error": abs(value - reference),
+                    "european_error": abs(price(american=False) - european),
+                })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--steps", type=int, nargs="+", default=list(STEPS))
+    args = parser.parse_args()
+
+    print(f"{'method':>10} {'richardson':>10} {'steps':>6} {'ms/price':>10} {'ms+greeks':>10} {'american err':>13} {'european err':>13}")
+    for r in run(args.steps, args.repeat):
+        print(
+            f"{r['method']:>10} {str(r['richardson']):>10} {r['steps']:>6} {r['seconds'] * 1e3:>10.2f} "
+            f"{r['seconds_with_greeks'] * 1e3:>10.2f} {r['american_error']:>13.2e} {r['european_error']:>13.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
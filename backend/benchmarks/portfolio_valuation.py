@@ -0,0 +1,132 @@
+"""
+Revaluation time of a synthetic portfolio, from the position query to the aggregated Greeks.
+
+    python -m backend.benchmarks.portfolio_valuation [--positions 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import sessionmaker
+
+from backend.app.database import Base, create_database_engine
+from backend.app.portfolios.model import Asset, Option, Portfolio, PortfolioPosition, Stock, ensure_portfolio_schema
+from backend.app.portfolios.service import PortfolioService, SpotCache
+from backend.app.stocks.model import PriceBar
+from backend.app.stocks.store import MarketDataStore
+
+NUM_UNDERLYINGS = 200
+OPTIONS_PER_UNDERLYING = 50
+
+
+def make_database(num_positions, seed=0, url="sqlite://"):
+    """Database (in-memory by default) with one portfolio of `num_positions`, about 90% option legs."""
+    rng = np.random.default_rng(seed)
+    engine = create_database_engine(url)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    ensure_portfolio_schema(engine)
+    Base.metadata.create_all(bind=engine, tables=[PriceBar.__table__])
+
+    today = date.today()
+    spots = rng.uniform(20.0, 500.0, NUM_UNDERLYINGS)
+    num_options = NUM_UNDERLYINGS * OPTIONS_PER_UNDERLYING
+    underlying_ids = np.repeat(np.arange(1, NUM_UNDERLYINGS + 1), OPTIONS_PER_UNDERLYING)
+
+    with session_factory() as db:
+        db.execute(insert(Asset), [
+            {"asset_id": i + 1, "asset_type": "stock", "ticker": f"S{i:04d}", "name": f"Stock {i}"}
+            for i in range(NUM_UNDERLYINGS)
+        ] + [
+            {"asset_id": NUM_UNDERLYINGS + i + 1, "asset_type": "option", "ticker": f"O{i:06d}", "name": f"Option {i}"}
+            for i in range(num_options)
+        ])
+        db.execute(insert(Stock), [
+            {"asset_id": i + 1, "current_price": float(spots[i]), "dividend_yield": 0.01}
+            for i in range(NUM_UNDERLYINGS)
+        ])
+        db.execute(insert(Option), [
+            {
+                "asset_id": NUM_UNDERLYINGS + i + 1,
+                "underlying_asset_id": int(underlying_ids[i]),
+                "strike_price": float(spots[underlying_ids[i] - 1] * rng.uniform(0.7, 1.3)),
+                "expiration_date": today + timedelta(days=int(rng.integers(1, 730))),
+                "option_type": "call" if rng.random() < 0.5 else "put",
+                "contract_size": 100,
+            }
+            for i in range(num_options)
+        ])
+        db.execute(insert(PriceBar), [
+            {"symbol": f"S{i:04d}", "date": today - timedelta(days=1), "close": float(spots[i])}
+            for i in range(NUM_UNDERLYINGS)
+        ])
+        db.add(Portfolio(portfolio_id=1, user_id=1, name="Benchmark book"))
+
+        is_option = rng.random(num_positions) < 0.9
+        asset_ids = np.where(
+            is_option,
+            rng.integers(NUM_UNDERLYINGS + 1, NUM_UNDERLYINGS + num_options + 1, num_positions),
+            rng.integers(1, NUM_UNDERLYINGS + 1, num_positions)
+        )
+        db.execute(insert(PortfolioPosition), [
+            {
+                "portfolio_id": 1,
+                "asset_id": int(asset_id),
+                "quantity": float(rng.integers(-50, 51) or 1),
+                "entry_price": float(rng.uniform(1.0, 50.0)),
+            }
+            for asset_id in asset_ids
+        ])
+        db.commit()
+    return session_factory
+
+
+def run(num_positions=10_000, repeat=5):
+    session_factory = make_database(num_positions)
+    store = MarketDataStore(fetcher=None, session_factory=session_factory)
+    service = PortfolioService(SpotCache(store), session_factory=session_factory)
+
+    timings = {"load": [], "value": []}
+    for _ in range(repeat):
+        service.spot_cache = SpotCache(store)
+        start = time.perf_counter()
+        service.load_book(1)
+        timings["load"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        result = service.value_portfolio(1)
+        timings["value"].append(time.perf_counter() - start)
+
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        service.value_portfolio(1)
+        warm.append(time.perf_counter() - start)
+
+    return {
+        "positions": result["count"],
+        "errors": result["errors"],
+        "load_seconds": min(timings["load"]),
+        "cold_seconds": min(timings["value"]),
+        "warm_seconds": min(warm),
+        "totals": result["totals"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--positions", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    r = run(args.positions, args.repeat)
+    print(f"positions:        {r['positions']} ({r['errors']} errors)")
+    print(f"position query:   {r['load_seconds'] * 1e3:.1f} ms")
+    print(f"revaluation:      {r['cold_seconds'] * 1e3:.1f} ms (spots from the store)")
+    print(f"revaluation:      {r['warm_seconds'] * 1e3:.1f} ms (cached spots)")
+    print("totals:           " + ", ".join(f"{k}={v:,.2f}" for k, v in r["totals"].items()))
+
+
+if __name__ == "__main__":
+    main()
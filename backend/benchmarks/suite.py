@@ -0,0 +1,386 @@
+"""
+Reproducible benchmark suite: single price latency, option sweep throughput, history
+processing per symbol, JSON encoding per payload size and route latency under load.
+
+    python -m backend.benchmarks.suite [--quick] [--only single_price routes]
+        [--output results.json] [--baseline baseline.json] [--threshold 0.1]
+
+Runs offline: market data comes from the recorded OHLCV / info files in
+backend/benchmarks/fixtures (the FixtureFetcher format), stored in a temporary SQLite
+database. The application reads its settings once, on first import, so the suite
+configures the environment before importing it; run it in a fresh interpreter.
+
+Results are written as JSON with --output. With --baseline, every latency / throughput
+metric is compared with the baseline's and the run exits with status 1 when one is
+worse by more than --threshold (a fraction). To benchmark real market data, record it
+into a fixtures directory first:
+
+    python -m backend.benchmarks.suite --record AAPL MSFT --fixtures path/to/fixtures
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+BENCHMARKS = ("single_price", "option_sweep", "history_processing", "serialization", "routes")
+
+# Optional modules a benchmark needs (installed by the dev dependency group); it is skipped without them
+REQUIREMENTS = {"routes": "httpx"}
+
+PROFILES = {
+    "full": {
+        "price_repeat": 2_000,
+        "repeat": 5,
+        "sweep_sizes": (100, 1_000, 10_000, 100_000),
+        # Every point of an American sweep is a lattice
+        "lattice_sweep_sizes": (100, 1_000),
+        "serialization_rows": (250, 1_260, 5_000),
+        "concurrency": 50,
+        "seconds": 3.0,
+    },
+    "quick": {
+        "price_repeat": 200,
+        "repeat": 3,
+        "sweep_sizes": (100, 10_000),
+        "lattice_sweep_sizes": (100,),
+        "serialization_rows": (250, 1_260),
+        "concurrency": 10,
+        "seconds": 1.0,
+    },
+}
+
+# Metric name suffixes and whether a larger value is better
+METRIC_DIRECTIONS = (("_per_second", True), ("_us", False), ("_ms", False), ("seconds", False))
+
+PRICE_REQUEST = {
+    "spot": 100.0,
+    "volatility": 0.2,
+    "riskFreeRate": 0.05,
+    "dividendYield": 0.01,
+    "strike": 100.0,
+    "maturity": 1.0,
+    "optionType": "CALL",
+    "optionFamily": "EUROPEAN",
+    "modelType": "Black Scholes",
+}
+
+
+def fixture_symbols(directory=FIXTURES_DIR):
+    return sorted(name[:-len(".csv")] for name in os.listdir(directory) if name.endswith(".csv"))
+
+
+def record_fixtures(symbols, directory=FIXTURES_DIR, fetcher=None):
+    """Record history and info of `symbols` from a live fetcher (yfinance by default) as fixtures."""
+    from backend.app.stocks.fetcher import YFinanceFetcher
+
+    fetcher = fetcher or YFinanceFetcher()
+    os.makedirs(directory, exist_ok=True)
+    for symbol in symbols:
+        fetcher.fetch_history(symbol).to_csv(os.path.join(directory, f"{symbol}.csv"), index_label="Date")
+        with open(os.path.join(directory, f"{symbol}.json"), "w") as f:
+            json.dump(fetcher.fetch_info(symbol), f, indent=2, default=str)
+
+
+def configure_environment(fixtures, directory):
+    """
+    Point the application at the fixtures and a scratch database. Fixture histories end
+    on a fixed date, so the stored history window is widened to keep every bar as time passes.
+    """
+    os.environ.update({
+        "HIRAM_DATABASE_URL": f"sqlite:///{os.path.join(directory, 'benchmark.db')}",
+        "HIRAM_MARKET_DATA_PROVIDER": "fixture",
+        "HIRAM_MARKET_DATA_FIXTURE_DIR": fixtures,
+        "HIRAM_MARKET_DATA_HISTORY_YEARS": "100",
+        "HIRAM_REFRESH_SCHEDULER_ENABLED": "false",
+        "HIRAM_METRICS_ENABLED": "false",
+        "HIRAM_PROFILING_ENABLED": "false",
+        "HIRAM_PROFILING_TOKEN": "",
+    })
+    from backend.app.config import get_settings
+
+    if get_settings().market_data_fixture_dir != fixtures:
+        raise RuntimeError("The application was configured before the suite; run it in a fresh interpreter")
+
+
+def _percentiles(timings, scale, unit):
+    values = np.asarray(timings) * scale
+    return {
+        f"p50_{unit}": float(np.percentile(values, 50)),
+        f"p99_{unit}": float(np.percentile(values, 99)),
+        f"mean_{unit}": float(values.mean()),
+    }
+
+
+def _best_time(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def _pricer_service():
+    from backend.app.pricer.router import kernel_registry
+    from backend.app.pricer.service import PricerService
+
+    kernel_registry.warm()
+    # Uncached, so every call reaches the kernels
+    return PricerService(kernels=kernel_registry)
+
+
+def bench_single_price(profile, symbols):
+    from backend.app.pricer.model import OptionPricingRequest
+
+    service = _pricer_service()
+    cases = {
+        "european_black_scholes": OptionPricingRequest(**PRICE_REQUEST),
+        "american_binomial": OptionPricingRequest(**{**PRICE_REQUEST, "optionFamily": "AMERICAN", "optionType": "PUT"}),
+        "american_trinomial": OptionPricingRequest(
+            **{**PRICE_REQUEST, "optionFamily": "AMERICAN", "optionType": "PUT", "latticeMethod": "trinomial"}
+        ),
+    }
+    results = {}
+    for name, request in cases.items():
+        service.calculate_price(request)
+        timings = []
+        for _ in range(profile["price_repeat"]):
+            start = time.perf_counter()
+            service.calculate_price(request)
+            timings.append(time.perf_counter() - start)
+        results[name] = _percentiles(timings, 1e6, "us")
+    return results
+
+
+def bench_option_sweep(profile, symbols):
+    from backend.app.pricer.model import OptionPricingRequest
+
+    service = _pricer_service()
+    families = {
+        "european": (OptionPricingRequest(**PRICE_REQUEST), profile["sweep_sizes"]),
+        "american": (
+            OptionPricingRequest(**{**PRICE_REQUEST, "optionFamily": "AMERICAN", "optionType": "PUT"}),
+            profile["lattice_sweep_sizes"],
+        ),
+    }
+    results = {}
+    for family, (request, sizes) in families.items():
+        for size in sizes:
+            spots = np.linspace(50.0, 150.0, size)
+            seconds = _best_time(lambda: service.generate_option_data(request, spots, "spot"), profile["repeat"])
+            results[f"{family}_{size}"] = {"seconds": seconds, "points_per_second": size / seconds}
+    return results
+
+
+def bench_history_processing(profile, symbols):
+    from backend.app.stocks.router import market_data_store
+    from backend.app.stocks.service import StocksService
+
+    service = StocksService(store=market_data_store)
+    results = {}
+    for symbol in symbols:
+        # The first read fetches the fixture into the empty database
+        bars = len(service.build_stock_data(symbol)["hist"]["Date"])
+        seconds = _best_time(lambda: service.build_stock_data(symbol), profile["repeat"])
+        results[symbol] = {"bars": bars, "seconds": seconds, "bars_per_second": bars / seconds}
+    return results
+
+
+def _history_frame(symbols, rows):
+    """A processed history of `rows` bars, the fixtures' bars repeated when they are too few."""
+    import pandas as pd
+
+    from backend.app.stocks.analytics import build_history_frame
+    from backend.app.stocks.router import market_data_store
+
+    frames = [market_data_store.get_history(symbol) for symbol in symbols]
+    bars = pd.concat(frames * (rows // sum(map(len, frames)) + 1)).iloc[:rows]
+    bars.index = pd.bdate_range(end=frames[0].index[-1], periods=rows, name="Date")
+    return build_history_frame(bars)[0]
+
+
+def bench_serialization(profile, symbols):
+    from backend.app.serialization import HistoryOrient, dumps, serialize_frame
+
+    results = {}
+    for rows in profile["serialization_rows"]:
+        frame = _history_frame(symbols, rows)
+        for orient in HistoryOrient:
+            size = len(dumps(serialize_frame(frame, orient)))
+            seconds = _best_time(lambda: dumps(serialize_frame(frame, orient)), profile["repeat"])
+            results[f"{orient.value}_{rows}"] = {
+                "bytes": size,
+                "seconds": seconds,
+                "megabytes_per_second": size / seconds / 1e6,
+            }
+    return results
+
+
+async def _bench_routes(profile, symbols):
+    import httpx
+
+    from backend.app.main import app
+    from backend.benchmarks.async_load import load
+
+    _pricer_service()
+    rng = np.random.default_rng(0)
+    # Distinct spots, so the pricing cache does not serve the whole run
+    prices = [{**PRICE_REQUEST, "spot": float(spot)} for spot in rng.uniform(50.0, 150.0, 10_000)]
+    routes = {
+        "stock_data": ("GET", f"/api/v1/stocks/{symbols[0]}/data", None),
+        "stocks_data": ("GET", f"/api/v1/stocks/data?symbols={','.join(symbols)}", None),
+        "option_price": ("POST", "/api/v1/pricer/options/price", prices),
+        "option_plot_data": ("POST", "/api/v1/pricer/options/plot-data", [{"min_value": 50.0, "max_value": 150.0}]),
+    }
+
+    results = {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        for method, path, payloads in routes.values():
+            # Loads the fixtures into the database before timing
+            response = await client.request(method, path, json=payloads[0] if payloads else None)
+            response.raise_for_status()
+    for name, (method, path, payloads) in routes.items():
+        results[name] = await load(app, path, profile["concurrency"], profile["seconds"], method, payloads)
+    return results
+
+
+def bench_routes(profile, symbols):
+    return asyncio.run(_bench_routes(profile, symbols))
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(benchmarks=BENCHMARKS, quick=False, fixtures=FIXTURES_DIR):
+    profile_name = "quick" if quick else "full"
+    profile = PROFILES[profile_name]
+    symbols = fixture_symbols(fixtures)
+    if not symbols:
+        raise ValueError(f"No fixtures in {fixtures}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        configure_environment(fixtures, directory)
+        from backend.app.database import engine
+        from backend.app.pricer.router import kernel_registry
+
+        results, skipped = {}, {}
+        try:
+            for name in benchmarks:
+                requirement = REQUIREMENTS.get(name)
+                if requirement is not None and importlib.util.find_spec(requirement) is None:
+                    skipped[name] = f"{requirement} is not installed (uv sync installs it with the dev group)"
+                    print(f"Skipping the {name} benchmark: {skipped[name]}", file=sys.stderr)
+                    continue
+                results[name] = globals()[f"bench_{name}"](profile, symbols)
+        finally:
+            engine.dispose()
+
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "profile": profile_name,
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "kernel_backend": kernel_registry.backend,
+            "fixtures": symbols,
+            "skipped": skipped,
+        },
+        "benchmarks": results,
+    }
+
+
+def _metrics(results):
+    for benchmark, cases in results["benchmarks"].items():
+        for case, values in cases.items():
+            for metric, value in values.items():
+                yield f"{benchmark}.{case}.{metric}", metric, value
+
+
+def _direction(metric):
+    for suffix, higher_is_better in METRIC_DIRECTIONS:
+        if metric.endswith(suffix):
+            return higher_is_better
+    return None
+
+
+def compare(results, baseline, threshold=0.1):
+    """Relative change of every latency / throughput metric against the baseline's, and whether it regressed."""
+    previous = {key: value for key, _, value in _metrics(baseline)}
+    rows = []
+    for key, metric, value in _metrics(results):
+        higher_is_better = _direction(metric)
+        before = previous.get(key)
+        if higher_is_better is None or not before:
+            continue
+        change = (value - before) / before
+        worse = -change if higher_is_better else change
+        rows.append({"metric": key, "baseline": before, "current": value, "change": change, "regression": worse > threshold})
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller sizes and shorter load runs")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative slowdown counted as a regression")
+    parser.add_argument("--record", nargs="+", metavar="SYMBOL", help="record fixtures from yfinance and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record, args.fixtures)
+        return
+
+    results = run([name for name in BENCHMARKS if name in args.only], args.quick, os.path.abspath(args.fixtures))
+    meta = results["meta"]
+    print(f"{meta['profile']} profile, {meta['kernel_backend']} kernels, Python {meta['python']}, {meta['cpus']} CPUs")
+    print(f"{'metric':<58} {'value':>14}")
+    for key, metric, value in _metrics(results):
+        print(f"{key:<58} {value:>14.6g}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("profile") != meta["profile"]:
+            print(f"Baseline was run with the {baseline['meta'].get('profile')} profile, this run with {meta['profile']}")
+        rows = compare(results, baseline, args.threshold)
+        print(f"\n{'metric':<58} {'baseline':>14} {'current':>14} {'change':>9}")
+        for row in rows:
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(f"{row['metric']:<58} {row['baseline']:>14.6g} {row['current']:>14.6g} {row['change']:>+9.1%}{flag}")
+        regressions = sum(row["regression"] for row in rows)
+        print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
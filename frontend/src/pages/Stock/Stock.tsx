@@ -43,7 +43,7 @@ interface OptionsData {
 
 interface StockResponse {
     price: number;
-    hist: any[];
+    hist: Record<string, any[]>;
     market_cap: number;
     pe_ratio: number;
     beta: number;
@@ -77,13 +77,13 @@ const fetchStockSymbols = async () => {
     }
 };
 
-// Function to transform backend data to frontend expected format
+// Function to transform backend data (columnar history, one array per field) to frontend expected format
 const transformStockData = (data) => {
-    return data.map(item => ({
-        date: new Date(item.Date).toISOString().split('T')[0], // Format date as YYYY-MM-DD
-        close: item.Close,
-        volume: item.Volume,
-        cumulativeReturn: item.cumulative_return
+    return data.Date.map((date, i) => ({
+        date: new Date(date).toISOString().split('T')[0], // Format date as YYYY-MM-DD
+        close: data.Close[i],
+        volume: data.Volume[i],
+        cumulativeReturn: data.cumulative_return[i]
     }));
 };
 
@@ -73,4 +73,6 @@ CREATE TABLE bonds (
 -- Create indices for better query performance
 CREATE INDEX idx_assets_type ON assets(asset_type);
 CREATE INDEX idx_options_underlying ON options(underlying_asset_id);
+CREATE INDEX idx_options_asset ON options(asset_id);
+CREATE INDEX idx_stocks_asset ON stocks(asset_id);
 CREATE INDEX idx_portfolio_positions ON portfolio_positions(portfolio_id, asset_id);